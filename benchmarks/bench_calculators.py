@@ -0,0 +1,30 @@
+"""Power and A/B calculator callbacks, bypassing the result cache."""
+import pytest
+
+from app import update_bayesian, update_calculation, update_chart, update_variant_comparison
+
+
+@pytest.mark.parametrize('mde_range', [[1, 10], [1, 50], [0, 100]], ids=['1-10', '1-50', '0-100'])
+def bench_update_chart(measure, mde_range):
+    measure(update_chart.uncached, 0.1, 0.09, 10_000, 2, mde_range, 95, 80, 100)
+
+
+@pytest.mark.parametrize('hypothesis', ['Two-sided', 'One-sided'])
+def bench_update_calculation(measure, hypothesis):
+    measure(update_calculation.uncached, 10_000, 10_000, 1_000, 1_080, hypothesis)
+
+
+@pytest.mark.parametrize('variants', [3, 10, 50])
+@pytest.mark.parametrize('pairs', ['control', 'all'])
+def bench_update_variant_comparison(measure, variants, pairs):
+    records = [{'variant': 'V{}'.format(i), 'users': 10_000, 'conversions': 1_000 + 5 * i}
+               for i in range(variants)]
+    measure(update_variant_comparison.uncached, None, None, None, None, [], [],
+            'Two-sided', pairs, 'holm', {'records': records}, [])
+
+
+@pytest.mark.parametrize('variants', [2, 10, 100, 500])
+def bench_update_bayesian(measure, variants):
+    records = [{'variant': 'V{}'.format(i), 'users': 10_000, 'conversions': 1_000 + 5 * i}
+               for i in range(variants)]
+    measure(update_bayesian.uncached, None, None, None, None, [], [], {'records': records}, 'bayesian', [])
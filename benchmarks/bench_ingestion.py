@@ -0,0 +1,98 @@
+"""Upload parsing (update_dropdown, select_upload, chunked uploads) over upload sizes and workbook sheets."""
+import base64
+import io
+import uuid
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import select_upload, update_dropdown
+from dataset_store import store
+from ingestion import finish_chunked_upload, write_chunk
+
+# Roughly 36 bytes per row in the CSV below
+BYTES_PER_ROW = 36
+
+
+def csv_upload(megabytes, seed=0):
+    """A ``dcc.Upload`` data URL of about ``megabytes`` MB of CSV."""
+    rng = np.random.default_rng(seed)
+    rows = megabytes * 1_000_000 // BYTES_PER_ROW
+    df = pd.DataFrame({
+        'revenue': rng.lognormal(3, 1, rows).round(2),
+        'sessions': rng.poisson(4, rows),
+        'country': rng.choice(['de', 'fr', 'us', 'uk', 'es'], rows),
+        'converted': rng.integers(0, 2, rows),
+    })
+    data = df.to_csv(index=False).encode()
+    return 'data:text/csv;base64,' + base64.b64encode(data).decode()
+
+
+def excel_upload(sheets, rows=20_000, seed=0):
+    """A ``dcc.Upload`` data URL of a workbook with ``sheets`` sheets of ``rows`` rows."""
+    rng = np.random.default_rng(seed)
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer) as writer:
+        for i in range(sheets):
+            pd.DataFrame({
+                'revenue': rng.lognormal(3, 1, rows).round(2),
+                'sessions': rng.poisson(4, rows),
+                'country': rng.choice(['de', 'fr', 'us', 'uk', 'es'], rows),
+            }).to_excel(writer, sheet_name='Sheet{}'.format(i), index=False)
+    return 'data:application/vnd.ms-excel;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+
+def no_progress(value):
+    pass
+
+
+def parse_uncached(contents, filename):
+    """update_dropdown, then drop the parsed datasets so the next round parses again."""
+    options, dataset_id, style, error = update_dropdown(no_progress, contents, filename)
+    for option in options:
+        store.delete(option['value'])
+    return options, dataset_id, style, error
+
+
+def complete_upload(data, filename):
+    """Send ``data`` as one chunk of a chunked upload and finish it."""
+    upload_id = uuid.uuid4().hex
+    write_chunk(upload_id, 0, io.BytesIO(data))
+    return finish_chunked_upload(upload_id, filename)
+
+
+def bench_update_dropdown(measure, upload_mb):
+    contents = csv_upload(upload_mb)
+    # Large uploads take seconds per call; a few rounds are enough
+    options, dataset_id, _, _ = measure(parse_uncached, [contents], ['upload.csv'],
+                                        rounds=3 if upload_mb >= 100 else None)
+    assert dataset_id is not None and options
+
+
+def bench_update_dropdown_cached(measure, upload_mb):
+    contents = csv_upload(upload_mb)
+    update_dropdown(no_progress, [contents], ['upload.csv'])
+    options, _, _, _ = measure(update_dropdown, no_progress, [contents], ['upload.csv'])
+    assert 'cached' in options[0]['label']
+
+
+@pytest.mark.parametrize('sheets', [1, 5])
+def bench_update_dropdown_excel(measure, sheets):
+    options, _, _, _ = measure(parse_uncached, [excel_upload(sheets)], ['upload.xlsx'], rounds=3)
+    assert len(options) == sheets
+
+
+def bench_select_upload(measure, upload_mb):
+    options, dataset_id, _, _ = update_dropdown(no_progress, [csv_upload(upload_mb)], ['upload.csv'])
+    column_options, _, _, _ = measure(select_upload, dataset_id)
+    assert column_options
+
+
+def bench_finish_chunked_upload_cached(measure, upload_mb):
+    contents = csv_upload(upload_mb)
+    update_dropdown(no_progress, [contents], ['upload.csv'])
+    # The same bytes as the dcc.Upload above, so only the fingerprint is computed
+    data = base64.b64decode(contents.split(',', 1)[1])
+    parts = measure(complete_upload, data, 'upload.csv')
+    assert parts[0]['cached']
@@ -0,0 +1,26 @@
+"""Outlier page plots (update_boxplot, zoom_boxplot) over row counts."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import update_boxplot, zoom_boxplot
+from dataset_store import store
+
+
+@pytest.fixture
+def dataset_id(rows):
+    rng = np.random.default_rng(0)
+    dataset_id = store.put(pd.DataFrame({'value': rng.lognormal(0, 1, rows)}))
+    yield dataset_id
+    store.delete(dataset_id)
+
+
+@pytest.mark.parametrize('plot_type', ['box', 'histogram', 'violin', 'points'])
+def bench_update_boxplot(measure, dataset_id, plot_type):
+    measure(update_boxplot, 'value', plot_type, dataset_id)
+
+
+def bench_zoom_boxplot(measure, dataset_id, rows):
+    update_boxplot('value', 'points', dataset_id)
+    zoom = {'xaxis.range[0]': rows * 0.4, 'xaxis.range[1]': rows * 0.6}
+    measure(zoom_boxplot, zoom, 'value', 'points', dataset_id)
@@ -0,0 +1,50 @@
+"""Time-series anomaly detection and its chart over row counts and detectors."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import update_timeseries_anomalies, update_timeseries_graph, zoom_timeseries_graph
+from dataset_store import store
+
+SERIES = 10
+
+
+def no_progress(value):
+    pass
+
+
+@pytest.fixture
+def dataset_id(rows):
+    rng = np.random.default_rng(0)
+    hours = np.arange(rows) % (rows // SERIES)
+    df = pd.DataFrame({
+        'timestamp': pd.Timestamp('2024-01-01') + pd.to_timedelta(hours, unit='h'),
+        'series': np.repeat(['s{}'.format(i) for i in range(SERIES)], rows // SERIES),
+        'value': 10 + 3 * np.sin(2 * np.pi * hours / 24) + rng.normal(0, 1, rows),
+    })
+    dataset_id = store.put(df)
+    yield dataset_id
+    store.delete(dataset_id)
+
+
+@pytest.mark.parametrize('detector', ['rolling_mad', 'ewma', 'stl'])
+def bench_update_timeseries_anomalies(measure, dataset_id, detector):
+    _, result_id, _, series = measure(update_timeseries_anomalies, no_progress, 1, dataset_id, 'value',
+                                      'timestamp', 'series', detector, 24, None)
+    assert result_id is not None and series is not None
+
+
+def bench_update_timeseries_graph(measure, dataset_id):
+    _, result_id, _, series = update_timeseries_anomalies(no_progress, 1, dataset_id, 'value', 'timestamp',
+                                                          'series', 'rolling_mad', 24, None)
+    measure(update_timeseries_graph, series, result_id, 'value')
+
+
+def bench_zoom_timeseries_graph(measure, dataset_id, rows):
+    _, result_id, _, series = update_timeseries_anomalies(no_progress, 1, dataset_id, 'value', 'timestamp',
+                                                          'series', 'rolling_mad', 24, None)
+    hours = rows // SERIES
+    start = pd.Timestamp('2024-01-01')
+    zoom = {'xaxis.range[0]': str(start + pd.Timedelta(hours=hours * 0.4)),
+            'xaxis.range[1]': str(start + pd.Timedelta(hours=hours * 0.6))}
+    measure(zoom_timeseries_graph, zoom, series, result_id)
@@ -0,0 +1,45 @@
+"""Figure payload size and build time of the outlier page plots vs row count.
+
+Compares ``px.box`` on the raw column (what update_boxplot used to send)
+with the pre-aggregated figures from ``plots.py``. Run from the repo root:
+
+    python benchmarks/boxplot_payload.py [max_rows]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from plots import distribution_figure  # noqa: E402
+
+
+def measure(build):
+    started = time.perf_counter()
+    payload = pio.to_json(build())
+    return len(payload), time.perf_counter() - started
+
+
+def main(max_rows=1_000_000):
+    rng = np.random.default_rng(0)
+    print('{:>10}  {:<10}  {:>14}  {:>10}'.format('rows', 'figure', 'payload bytes', 'seconds'))
+    rows = 1_000
+    while rows <= max_rows:
+        values = rng.lognormal(0, 1, rows)
+        df = pd.DataFrame({'value': values})
+        cases = [('px.box', lambda: px.box(df, y='value'))]
+        cases += [(plot_type, lambda plot_type=plot_type: distribution_figure(values, 'value', plot_type))
+                  for plot_type in ('box', 'histogram', 'violin')]
+        for name, build in cases:
+            nbytes, seconds = measure(build)
+            print('{:>10,}  {:<10}  {:>14,}  {:>10.4f}'.format(rows, name, nbytes, seconds))
+        rows *= 10
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
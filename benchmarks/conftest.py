@@ -0,0 +1,126 @@
+"""Shared fixtures for the callback benchmarks.
+
+The callbacks are called directly with synthetic inputs. Besides the
+latency measured by pytest-benchmark, every case records:
+
+* ``peak_bytes`` -- peak Python/NumPy allocations of one extra call, from
+  ``tracemalloc`` (Arrow buffers are not included)
+* ``payload_bytes`` -- size of the JSON the callback would send to the browser
+
+Both are compared with ``baseline.json`` and a case fails when it exceeds
+its baseline by more than ``--baseline-tolerance`` (plus ``SLACK_BYTES``, so
+small cases do not fail on allocator noise). Latency is compared with
+pytest-benchmark's own storage, e.g. from the repo root:
+
+    pytest benchmarks --benchmark-autosave
+    pytest benchmarks --benchmark-compare --benchmark-compare-fail=mean:20%
+
+and ``--update-baseline`` rewrites ``baseline.json`` from the current run.
+The stores, result cache, job cache and metrics live in a temp directory.
+"""
+import gc
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+
+import pytest
+
+_TMP = tempfile.mkdtemp(prefix='ssa_bench_')
+os.environ.setdefault('SSA_DATA_DIR', os.path.join(_TMP, 'datasets'))
+os.environ.setdefault('SSA_STATE_DIR', os.path.join(_TMP, 'state'))
+os.environ.setdefault('SSA_UPLOAD_DIR', os.path.join(_TMP, 'uploads'))
+os.environ.setdefault('SSA_CACHE_PATH', os.path.join(_TMP, 'cache.sqlite3'))
+os.environ.setdefault('SSA_JOBS_PATH', os.path.join(_TMP, 'jobs'))
+os.environ.setdefault('SSA_METRICS_PATH', os.path.join(_TMP, 'metrics.sqlite3'))
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+METRICS = ('peak_bytes', 'payload_bytes')
+SLACK_BYTES = 256 * 1024
+
+
+def _sizes(value):
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('ssa benchmarks')
+    group.addoption('--upload-mb', default='1,10,100',
+                    help='comma-separated CSV upload sizes in MB (e.g. 1,10,100,1000)')
+    group.addoption('--rows', default='10000,100000,1000000',
+                    help='comma-separated row counts for the plotting benchmarks')
+    group.addoption('--baseline-tolerance', type=float, default=0.2,
+                    help='allowed relative growth of peak and payload bytes over baseline.json')
+    group.addoption('--update-baseline', action='store_true',
+                    help='write the peak and payload bytes of this run to baseline.json')
+
+
+def pytest_generate_tests(metafunc):
+    for name, option in (('upload_mb', '--upload-mb'), ('rows', '--rows')):
+        if name in metafunc.fixturenames:
+            sizes = _sizes(metafunc.config.getoption(option))
+            metafunc.parametrize(name, sizes, ids=['{}{}'.format(s, 'mb' if name == 'upload_mb' else '')
+                                                   for s in sizes])
+
+
+def pytest_configure(config):
+    config._ssa_baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            config._ssa_baseline = json.load(f)
+    config._ssa_results = {}
+
+
+def pytest_sessionfinish(session):
+    config = session.config
+    if config.getoption('--update-baseline') and config._ssa_results:
+        baseline = dict(config._ssa_baseline, **config._ssa_results)
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump(dict(sorted(baseline.items())), f, indent=2)
+            f.write('\n')
+
+
+def payload_bytes(value):
+    """Bytes of ``value`` serialized the way Dash sends callback outputs."""
+    from plotly.io.json import to_json_plotly
+
+    return len(to_json_plotly(value).encode())
+
+
+def peak_bytes(func, *args):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.fixture
+def measure(benchmark, request):
+    """``measure(func, *args)``: benchmark ``func`` and check its bytes against the baseline."""
+    config = request.config
+
+    def run(func, *args, rounds=None):
+        if rounds is None:
+            result = benchmark(func, *args)
+        else:
+            result = benchmark.pedantic(func, args, rounds=rounds, iterations=1)
+        metrics = {'peak_bytes': peak_bytes(func, *args), 'payload_bytes': payload_bytes(result)}
+        benchmark.extra_info.update(metrics)
+        config._ssa_results[request.node.name] = metrics
+
+        baseline = config._ssa_baseline.get(request.node.name)
+        if baseline and not config.getoption('--update-baseline'):
+            tolerance = 1 + config.getoption('--baseline-tolerance')
+            limits = {m: int(baseline[m] * tolerance) + SLACK_BYTES for m in METRICS if m in baseline}
+            over = ['{} {:,} > {:,} (baseline {:,})'.format(m, metrics[m], limit, baseline[m])
+                    for m, limit in limits.items() if metrics[m] > limit]
+            assert not over, 'Regression: ' + '; '.join(over)
+        return result
+
+    return run
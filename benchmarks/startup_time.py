@@ -0,0 +1,88 @@
+"""Worker start-up cost: import time of ``app`` and first render of each page.
+
+Runs ``python -X importtime -c "import app"`` in a fresh interpreter (what a
+gunicorn worker pays before serving its first request), reports the total
+and the slowest modules by cumulative time, then times the first and the
+cached ``get_layout`` call for every page. Run from the repo root:
+
+    python benchmarks/startup_time.py [--top N] [--json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+LAYOUT_SCRIPT = '''
+import json, time
+import app
+from pages import PAGES, get_layout
+timings = {}
+for path in PAGES:
+    started = time.perf_counter()
+    get_layout(path)
+    first = time.perf_counter() - started
+    started = time.perf_counter()
+    get_layout(path)
+    timings[path] = [first, time.perf_counter() - started]
+print(json.dumps(timings))
+'''
+
+
+def import_times():
+    """``{module: (self_us, cumulative_us)}`` for a fresh ``import app``."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                            cwd=SRC, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def layout_times():
+    result = subprocess.run([sys.executable, '-c', LAYOUT_SCRIPT],
+                            cwd=SRC, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--top', type=int, default=15, help='slowest modules to list')
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    times = import_times()
+    wall = time.perf_counter() - started
+    slowest = sorted(times.items(), key=lambda item: item[1][1], reverse=True)[:args.top]
+    layouts = layout_times()
+
+    if args.json:
+        print(json.dumps({
+            'app_import_seconds': times['app'][1] / 1e6,
+            'interpreter_wall_seconds': wall,
+            'slowest_modules': {name: cumulative / 1e6 for name, (_, cumulative) in slowest},
+            'layout_seconds': {path: {'first': first, 'cached': cached}
+                               for path, (first, cached) in layouts.items()},
+        }, indent=2))
+        return
+
+    print('import app: {:.3f} s ({:.3f} s including interpreter start)'.format(times['app'][1] / 1e6, wall))
+    print()
+    print('{:<40}  {:>10}  {:>10}'.format('module', 'self ms', 'cumul. ms'))
+    for name, (self_us, cumulative_us) in slowest:
+        print('{:<40}  {:>10.1f}  {:>10.1f}'.format(name, self_us / 1e3, cumulative_us / 1e3))
+    print()
+    print('{:<40}  {:>10}  {:>10}'.format('page', 'first ms', 'cached ms'))
+    for path, (first, cached) in layouts.items():
+        print('{:<40}  {:>10.1f}  {:>10.3f}'.format(path, first * 1e3, cached * 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+"""Vectorized A/B test analysis for proportion metrics.
+
+``proportions_ztest`` gives the same z statistic and p-value as the
+statsmodels function of the same name (pooled variance), but works on whole
+arrays of comparisons at once. ``analyze_experiments`` runs it over a long
+table of experiments and variants and applies multiple-comparison correction.
+"""
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr, stdtr
+
+ALTERNATIVES = ('two-sided', 'larger', 'smaller')
+CORRECTIONS = ('none', 'bonferroni', 'holm', 'fdr_bh')
+
+
+def proportions_ztest(count1, nobs1, count2, nobs2, alternative='two-sided'):
+    """Two-sample z-test of ``count1/nobs1`` against ``count2/nobs2``.
+
+    ``alternative='larger'`` tests whether the first proportion is larger.
+    Returns ``(z, pvalue)`` arrays; comparisons with zero pooled variance are
+    NaN.
+    """
+    if alternative not in ALTERNATIVES:
+        raise ValueError('alternative must be one of {}'.format(ALTERNATIVES))
+    count1, nobs1, count2, nobs2 = (np.asarray(a, dtype=float) for a in (count1, nobs1, count2, nobs2))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pooled = (count1 + count2) / (nobs1 + nobs2)
+        std = np.sqrt(pooled * (1 - pooled) * (1 / nobs1 + 1 / nobs2))
+        z = (count1 / nobs1 - count2 / nobs2) / std
+    z = np.where(std > 0, z, np.nan)
+    if alternative == 'two-sided':
+        pvalue = 2 * ndtr(-np.abs(z))
+    elif alternative == 'larger':
+        pvalue = ndtr(-z)
+    else:
+        pvalue = ndtr(z)
+    return z, pvalue
+
+
+def adjust_pvalues(pvalues, method='holm', groups=None):
+    """Multiple-comparison adjusted p-values, computed per ``groups`` family.
+
+    ``method`` is one of ``'none'``, ``'bonferroni'``, ``'holm'`` or
+    ``'fdr_bh'`` (Benjamini-Hochberg). Without ``groups`` all p-values form a
+    single family. NaN p-values are left out of the family size.
+    """
+    if method not in CORRECTIONS:
+        raise ValueError('correction must be one of {}'.format(CORRECTIONS))
+    pvalues = np.asarray(pvalues, dtype=float)
+    if method == 'none' or pvalues.size == 0:
+        return pvalues.copy()
+    if groups is None:
+        group_codes = np.zeros(pvalues.size, dtype=np.int64)
+    else:
+        group_codes = pd.factorize(np.asarray(groups))[0]
+
+    valid = ~np.isnan(pvalues)
+    m = np.bincount(group_codes[valid], minlength=group_codes.max() + 1)[group_codes]
+    if method == 'bonferroni':
+        return np.where(valid, np.minimum(pvalues * m, 1.0), np.nan)
+
+    # Sort by family, then p-value (NaNs last), and rank within each family
+    order = np.lexsort((np.where(valid, pvalues, np.inf), group_codes))
+    sorted_groups = group_codes[order]
+    sorted_p = pvalues[order]
+    sorted_m = m[order]
+    starts = np.r_[0, np.flatnonzero(np.diff(sorted_groups)) + 1]
+    rank = np.arange(sorted_p.size) - np.repeat(starts, np.diff(np.r_[starts, sorted_p.size])) + 1
+
+    frame = pd.DataFrame({'group': sorted_groups})
+    if method == 'holm':
+        frame['p'] = (sorted_m - rank + 1) * sorted_p
+        adjusted = frame.groupby('group')['p'].cummax().to_numpy()
+    else:
+        # Step-up: running minimum from the largest p-value downwards
+        frame['p'] = sorted_m / rank * sorted_p
+        adjusted = frame[::-1].groupby('group')['p'].cummin()[::-1].to_numpy()
+
+    result = np.empty_like(pvalues)
+    result[order] = np.minimum(adjusted, 1.0)
+    result[~valid] = np.nan
+    return result
+
+
+def control_mask(df, experiment='experiment', variant='variant', control=None):
+    """Boolean array marking the control row of each experiment in ``df``.
+
+    The control is the variant named ``control``, the row flagged in an
+    ``is_control`` column, or else the first row of each experiment.
+    """
+    if control is not None:
+        return (df[variant].astype(str) == str(control)).to_numpy()
+    if 'is_control' in df.columns:
+        return df['is_control'].astype(bool).to_numpy()
+    return ~df.duplicated(experiment).to_numpy()
+
+
+def pair_with_control(table, experiment='experiment', variant='variant', users='users',
+                      conversions='conversions', control=None):
+    """One row per non-control variant with its experiment's control counts.
+
+    Columns are renamed to ``experiment``, ``variant``, ``users`` and
+    ``conversions``, next to ``control``, ``control_users`` and
+    ``control_conversions``.
+    """
+    df = pd.DataFrame(table)
+    missing = [c for c in (experiment, variant, users, conversions) if c not in df.columns]
+    if missing:
+        raise ValueError('Missing columns: {}'.format(', '.join(missing)))
+    is_control = control_mask(df, experiment, variant, control)
+    control_rows = df.loc[is_control, [experiment, variant, users, conversions]].drop_duplicates(experiment)
+    control_rows.columns = [experiment, 'control', 'control_users', 'control_conversions']
+    out = df.loc[~is_control, [experiment, variant, users, conversions]].merge(
+        control_rows, on=experiment, how='inner')
+    return out.rename(columns={experiment: 'experiment', variant: 'variant',
+                               users: 'users', conversions: 'conversions'})
+
+
+def analyze_experiments(table, experiment='experiment', variant='variant', users='users',
+                        conversions='conversions', control=None, alternative='two-sided',
+                        correction='holm', alpha=0.05, family='experiment'):
+    """Compare every variant against its experiment's control.
+
+    ``table`` has one row per experiment and variant; see ``control_mask``
+    for how the control is picked. ``family`` is ``'experiment'``
+    to correct within each experiment or ``'all'`` to correct across the
+    whole table.
+    """
+    if family not in ('experiment', 'all'):
+        raise ValueError("family must be 'experiment' or 'all'")
+    out = pair_with_control(table, experiment, variant, users, conversions, control)
+
+    n_t = out['users'].to_numpy(dtype=float)
+    c_t = out['conversions'].to_numpy(dtype=float)
+    n_c = out['control_users'].to_numpy(dtype=float)
+    c_c = out['control_conversions'].to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate_t = c_t / n_t
+        rate_c = c_c / n_c
+        lift = (rate_t - rate_c) / rate_c * 100
+    z, pvalue = proportions_ztest(c_t, n_t, c_c, n_c, alternative)
+    adjusted = adjust_pvalues(pvalue, correction,
+                              out['experiment'].to_numpy() if family == 'experiment' else None)
+
+    out['control_rate'] = rate_c
+    out['rate'] = rate_t
+    out['lift_pct'] = lift
+    out['z'] = z
+    out['p_value'] = pvalue
+    out['p_value_adjusted'] = adjusted
+    out['significant'] = adjusted < alpha
+    return out
+
+
+def pairwise_proportions_ztest(labels, counts, nobs, pairs='control', alternative='two-sided',
+                               correction='holm'):
+    """Compare N variants of one experiment in a single vectorized pass.
+
+    The first variant is the control. ``pairs='control'`` compares every
+    other variant against it, ``pairs='all'`` compares every pair ``(i, j)``
+    with ``i < j``. Each comparison tests the later variant against the
+    earlier one, so ``alternative='larger'`` asks whether it converts better.
+    """
+    labels = np.asarray(labels)
+    counts = np.asarray(counts, dtype=float)
+    nobs = np.asarray(nobs, dtype=float)
+    k = len(labels)
+    if pairs == 'control':
+        base = np.zeros(k - 1, dtype=np.int64)
+        other = np.arange(1, k)
+    elif pairs == 'all':
+        base, other = np.triu_indices(k, 1)
+    else:
+        raise ValueError("pairs must be 'control' or 'all'")
+
+    rates = counts / nobs
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lift = (rates[other] - rates[base]) / rates[base] * 100
+    z, pvalue = proportions_ztest(counts[other], nobs[other], counts[base], nobs[base], alternative)
+    return pd.DataFrame({
+        'baseline': labels[base],
+        'variant': labels[other],
+        'baseline_rate': rates[base],
+        'rate': rates[other],
+        'lift_pct': lift,
+        'z': z,
+        'p_value': pvalue,
+        'p_value_adjusted': adjust_pvalues(pvalue, correction),
+    })
+
+
+def welch_ttest(mean1, var1, n1, mean2, var2, n2, alternative='two-sided'):
+    """Welch's unequal-variance t-test of ``mean1`` against ``mean2``.
+
+    Takes summary statistics (sample variances, ddof=1) and broadcasts over
+    arrays. Returns ``(t, dof, pvalue)``.
+    """
+    if alternative not in ALTERNATIVES:
+        raise ValueError('alternative must be one of {}'.format(ALTERNATIVES))
+    mean1, var1, n1, mean2, var2, n2 = (np.asarray(a, dtype=float) for a in (mean1, var1, n1, mean2, var2, n2))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        se1 = var1 / n1
+        se2 = var2 / n2
+        t = (mean1 - mean2) / np.sqrt(se1 + se2)
+        dof = (se1 + se2) ** 2 / (se1 ** 2 / (n1 - 1) + se2 ** 2 / (n2 - 1))
+    if alternative == 'two-sided':
+        pvalue = 2 * stdtr(dof, -np.abs(t))
+    elif alternative == 'larger':
+        pvalue = stdtr(dof, -t)
+    else:
+        pvalue = stdtr(dof, t)
+    return t, dof, pvalue
+
+
+def compare_means(summary, control=None, alternative='two-sided', correction='holm'):
+    """Welch's t-test of every group in ``summary`` against the control.
+
+    ``summary`` is indexed by group with ``n``, ``mean`` and ``var`` columns,
+    as returned by ``moments.GroupMoments.summary`` or ``.cuped``. The
+    control defaults to the first group.
+    """
+    control = summary.index[0] if control is None else control
+    base = summary.loc[control]
+    others = summary.drop(index=control)
+    t, dof, pvalue = welch_ttest(others['mean'], others['var'], others['n'],
+                                 base['mean'], base['var'], base['n'], alternative)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lift = (others['mean'] - base['mean']) / base['mean'] * 100
+    return pd.DataFrame({
+        'baseline': control,
+        'variant': others.index,
+        'baseline_mean': base['mean'],
+        'mean': others['mean'].to_numpy(),
+        'lift_pct': lift.to_numpy(),
+        't': t,
+        'dof': dof,
+        'p_value': pvalue,
+        'p_value_adjusted': adjust_pvalues(pvalue, correction),
+    })
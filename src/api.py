@@ -0,0 +1,252 @@
+"""HTTP API served by the Flask ``server`` next to the Dash pages.
+
+Like the Dash callbacks, the routes import pandas and the analysis modules
+on first use to keep worker start-up light.
+"""
+import io
+
+from flask import Blueprint, Response, jsonify, request, send_file
+
+from dataset_store import state_store, store
+from metrics import observe_upload
+from result_cache import cache
+
+api = Blueprint('api', __name__, url_prefix='/api')
+
+
+@api.route('/uploads/<upload_id>', methods=['GET'])
+def upload_status(upload_id):
+    import ingestion
+
+    try:
+        return jsonify({'upload_id': upload_id, 'received': ingestion.received_bytes(upload_id)})
+    except KeyError:
+        return jsonify({'error': 'invalid upload id'}), 400
+
+
+@api.route('/uploads/<upload_id>', methods=['PUT'])
+def upload_chunk(upload_id):
+    import ingestion
+
+    offset = request.args.get('offset', 0, type=int)
+    try:
+        received = ingestion.write_chunk(upload_id, offset, request.stream)
+    except KeyError:
+        return jsonify({'error': 'invalid upload id'}), 400
+    except ValueError as e:
+        # Tell the client where to resume from
+        return jsonify({'error': str(e), 'received': ingestion.received_bytes(upload_id)}), 409
+    return jsonify({'upload_id': upload_id, 'received': received})
+
+
+@api.route('/uploads/<upload_id>/complete', methods=['POST'])
+def upload_complete(upload_id):
+    import ingestion
+
+    filename = request.args.get('filename', '')
+    try:
+        parts = ingestion.finish_chunked_upload(upload_id, filename)
+    except KeyError:
+        return jsonify({'error': 'unknown upload id'}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+    for info in parts:
+        if not info['cached']:
+            observe_upload(info)
+    # The first CSV or sheet at the top level, as before workbooks were split
+    parts = [{k: v for k, v in info.items() if k != 'column_stats'} for info in parts]
+    return jsonify(dict(parts[0], datasets=parts))
+
+
+@api.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(cache.stats())
+
+
+@api.route('/ab-tests/batch', methods=['POST'])
+def ab_tests_batch():
+    """Analyze many experiments in one request.
+
+    Accepts a CSV body or JSON ``{"experiments": [...], ...options}`` with one
+    record per experiment and variant. Options can also be query parameters;
+    ``format=csv`` returns CSV instead of JSON. ``method=bayesian`` reports
+    Beta-Binomial posteriors (see bayesian.py) instead of z-tests.
+    """
+    import pandas as pd
+    import ab_testing
+    import bayesian
+
+    body = {}
+    try:
+        if request.mimetype not in ('text/csv', 'application/csv'):
+            body = request.get_json(force=True) or {}
+        table = _read_table(body)
+        options = {**body, **request.args.to_dict()}
+        method = options.get('method', 'frequentist')
+        if method == 'bayesian':
+            result = bayesian.analyze_experiments(
+                table,
+                control=options.get('control'),
+                prior=(float(options.get('prior_alpha', 1)), float(options.get('prior_beta', 1))),
+                credible=float(options.get('credible', bayesian.CREDIBLE)),
+                draws=int(options.get('draws', bayesian.DRAWS)),
+                seed=int(options.get('seed', 0)),
+            )
+        elif method == 'frequentist':
+            result = ab_testing.analyze_experiments(
+                table,
+                control=options.get('control'),
+                alternative=options.get('alternative', 'two-sided'),
+                correction=options.get('correction', 'holm'),
+                alpha=float(options.get('alpha', 0.05)),
+                family=options.get('family', 'experiment'),
+            )
+        else:
+            raise ValueError("method must be 'frequentist' or 'bayesian'")
+    except (ValueError, TypeError, pd.errors.ParserError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    if options.get('format') == 'csv':
+        return Response(result.to_csv(index=False), mimetype='text/csv')
+    # NaN is not valid JSON, send null instead
+    return Response(result.to_json(orient='records'), mimetype='application/json')
+
+
+def _read_table(body, key='experiments'):
+    """Records from a CSV body or from ``body[key]``."""
+    import pandas as pd
+
+    if request.mimetype in ('text/csv', 'application/csv'):
+        return pd.read_csv(io.BytesIO(request.get_data()))
+    return pd.DataFrame(body.get(key, []))
+
+
+def _state_conflict(state_id, kind):
+    """Error response when ``state_id`` names a dataset or state of another kind, else None."""
+    if store.exists(state_id):
+        return jsonify({'error': '{} is a dataset id'.format(state_id)}), 409
+    existing = state_store.get_meta(state_id).get('kind', kind)
+    if existing != kind:
+        return jsonify({'error': '{} is a {} id'.format(state_id, existing)}), 409
+    return None
+
+
+@api.route('/sequential/<monitor_id>', methods=['GET', 'POST'])
+def sequential_monitor(monitor_id):
+    """Always-valid results of a set of live experiments.
+
+    POST adds a batch of per-variant count deltas (CSV or JSON as for
+    ``/ab-tests/batch``) to the running state stored under ``monitor_id``;
+    GET returns the current results without changing them.
+    """
+    import pandas as pd
+    from sequential import TAU, SequentialMonitor
+
+    try:
+        state_store.path(monitor_id)
+    except KeyError:
+        return jsonify({'error': 'invalid monitor id'}), 400
+
+    body = {}
+    # Held across read and write so concurrent batches are not lost
+    with state_store.lock(monitor_id):
+        conflict = _state_conflict(monitor_id, 'sequential')
+        if conflict:
+            return conflict
+        state = state_store.get(monitor_id, fresh=True)
+        if request.method == 'GET' and state is None:
+            return jsonify({'error': 'unknown monitor id'}), 404
+        try:
+            if request.method == 'POST' and request.mimetype not in ('text/csv', 'application/csv'):
+                body = request.get_json(force=True) or {}
+            options = {**body, **request.args.to_dict()}
+            # tau is fixed when the monitor is created
+            tau = state_store.get_meta(monitor_id).get('tau', options.get('tau', TAU))
+            monitor = SequentialMonitor(state, tau=float(tau))
+            if request.method == 'POST':
+                monitor.update(_read_table(body), control=options.get('control'))
+                state_store.put(monitor.to_frame(), dataset_id=monitor_id,
+                                meta={'kind': 'sequential', 'tau': monitor.tau})
+            result = monitor.results(alpha=float(options.get('alpha', 0.05)))
+        except (ValueError, TypeError, pd.errors.ParserError) as e:
+            return jsonify({'error': str(e)}), 400
+
+    if options.get('format') == 'csv':
+        return Response(result.to_csv(index=False), mimetype='text/csv')
+    return Response(result.to_json(orient='records'), mimetype='application/json')
+
+
+@api.route('/timeseries/<detector_id>', methods=['POST'])
+def timeseries_detector(detector_id):
+    """Scores of rows appended to live time series.
+
+    The body holds the new rows, as CSV or as JSON ``{"rows": [...]}``, and
+    the options name the ``value`` column and optionally the ``timestamp``
+    and ``series`` columns. The first batch fixes the detector and its
+    parameters (``detector``, ``threshold``, ``window``, ``alpha``,
+    ``period``); later batches are scored against the per-series state
+    kept under ``detector_id``.
+    """
+    import pandas as pd
+    from timeseries import OnlineDetector
+
+    try:
+        state_store.path(detector_id)
+    except KeyError:
+        return jsonify({'error': 'invalid detector id'}), 400
+
+    body = {}
+    with state_store.lock(detector_id):
+        conflict = _state_conflict(detector_id, 'timeseries')
+        if conflict:
+            return conflict
+        state = state_store.get(detector_id, fresh=True)
+        try:
+            if request.mimetype not in ('text/csv', 'application/csv'):
+                body = request.get_json(force=True) or {}
+            options = {**body, **request.args.to_dict()}
+            params = state_store.get_meta(detector_id).get('params') if state is not None else None
+            if params is None:
+                params = {'detector': options.get('detector', 'rolling_mad')}
+                for name, cast in (('threshold', float), ('window', int), ('alpha', float), ('period', int)):
+                    if options.get(name) is not None:
+                        params[name] = cast(options[name])
+            if 'value' not in options:
+                raise ValueError('value (the column to score) is required')
+            detector = OnlineDetector(state=state, **params)
+            result = detector.update(_read_table(body, 'rows'), options['value'],
+                                     options.get('timestamp'), options.get('series'))
+            state_store.put(detector.to_frame(), dataset_id=detector_id,
+                            meta={'kind': 'timeseries', 'params': params})
+        except (ValueError, TypeError, pd.errors.ParserError) as e:
+            return jsonify({'error': str(e)}), 400
+
+    if options.get('format') == 'csv':
+        return Response(result.to_csv(index=False), mimetype='text/csv')
+    return Response(result.to_json(orient='records', date_format='iso'), mimetype='application/json')
+
+
+@api.route('/datasets/<dataset_id>/download', methods=['GET'])
+def download_dataset(dataset_id):
+    """Serve a stored dataset straight from its Parquet file.
+
+    ``format=csv`` converts it record batch by record batch while streaming.
+    """
+    import pyarrow.parquet as pq
+
+    if not store.exists(dataset_id):
+        return jsonify({'error': 'unknown dataset id'}), 404
+    path = store.path(dataset_id)
+    name = store.get_meta(dataset_id).get('filename') or dataset_id
+    name = name.rsplit('.', 1)[0]
+    if request.args.get('format', 'csv') == 'parquet':
+        return send_file(path, as_attachment=True, download_name=name + '.parquet')
+
+    def generate():
+        header = True
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=100_000):
+            yield batch.to_pandas().to_csv(index=False, header=header)
+            header = False
+
+    return Response(generate(), mimetype='text/csv',
+                    headers={'Content-Disposition': 'attachment; filename="{}.csv"'.format(name)})
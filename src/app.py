@@ -1,19 +1,50 @@
+import os
+
 import dash
-import pandas as pd
-import numpy as np
-from dash import Dash, dcc, html, Output, Input, dash_table, State, callback
+from dash import dcc, html, Output, Input, dash_table, State, ClientsideFunction, ALL, Patch
 import dash_bootstrap_components as dbc
+from dash.exceptions import PreventUpdate
+from flask_compress import Compress
 import plotly.graph_objs as go
-import scipy.stats as stats
-from statsmodels.stats.proportion import proportions_ztest
-
-import base64
-import datetime
-import io
-import plotly.express as px
 
-app = dash.Dash(external_stylesheets=[dbc.themes.BOOTSTRAP,dbc.icons.BOOTSTRAP], suppress_callback_exceptions=True)
+from api import api
+from config import CLIENTSIDE_CALCULATORS, MDE_STEP
+from dataset_store import store
+from jobs import Progress, create_manager
+from metrics import callback_error, instrument_app, observe_upload
+from pages import get_layout
+from result_cache import cache
+
+# pandas, scipy, statsmodels and the analysis modules built on them are
+# imported inside the callbacks that need them, so a cold worker can serve
+# the first page without loading them
+
+# Callbacks with background=True run as jobs outside the web workers, see jobs.py
+app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP,dbc.icons.BOOTSTRAP], suppress_callback_exceptions=True,
+                background_callback_manager=create_manager())
 server = app.server
+server.register_blueprint(api)
+# Brotli where the browser accepts it, gzip otherwise. Set up here rather
+# than with Dash(compress=True), which forces gzip only.
+server.config.update(COMPRESS_ALGORITHM=['br', 'gzip'], COMPRESS_ALGORITHM_STREAMING=['br'],
+                     COMPRESS_BR_LEVEL=4, COMPRESS_LEVEL=6)
+Compress(server)
+# Every callback registered below is timed, see metrics.py (/metrics)
+instrument_app(app)
+
+
+def calculator_callback(*args, **kwargs):
+    """Register a calculator callback on the server or, in clientside mode,
+    as the function of the same name in assets/clientside.js."""
+    def decorator(func):
+        if CLIENTSIDE_CALCULATORS:
+            app.clientside_callback(
+                ClientsideFunction('calculators', func.__name__),
+                *args, State('calculator-config', 'data'), **kwargs)
+            return func
+        return app.callback(*args, **kwargs)(func)
+    return decorator
+
 
 # the style arguments for the sidebar. We use position:fixed and a fixed width
 SIDEBAR_STYLE = {
@@ -46,6 +77,7 @@ sidebar = html.Div(
                 dbc.NavLink("Home", href="/", active="exact"),
                 dbc.NavLink("Power Analysis Calculator", href="/power-analysis-calculator-page", active="exact"),
                 dbc.NavLink("A/B Testing Calculator", href="/ab-testing-calculator-page", active="exact"),
+                dbc.NavLink("A/B Testing (Continuous)", href="/continuous-ab-testing-page", active="exact"),
                 dbc.NavLink("Outlier Detection", href="/outlier-detection",active="exact"),
                 dbc.NavLink("Coming Soon!", href="/coming-soon", active="exact")
             ],
@@ -70,373 +102,30 @@ sidebar = html.Div(
 
 content = html.Div(id="page-content", style=CONTENT_STYLE)
 
-app.layout = html.Div([dcc.Location(id="url"), sidebar, content])
-
-@app.callback(Output("page-content", "children"), [Input("url", "pathname")])
-def render_page_content(pathname):
-    if pathname == "/":
-        return dbc.Container([
-          html.H1(children='Welcome!'),
-        	html.P("Here you can find a simple self-service analytics tools."),
-          html.P("The tools include:"),
-          html.P("1. Power analysis calculator for sample size and experiment duration estimation."),
-					html.P("2. Post-experiment analysis calculator for A/B testing experiment analysis. On current version, still only for proportion metric, such as conversion rate."),
-          html.P("3. Coming soon!"),
-
-        # dbc.Button(' Ahmad Nur Aziz',className="bi bi-linkedin",href="https://www.linkedin.com/in/ahmadnuraziz/")])
-    ])
-    elif pathname == "/power-analysis-calculator-page":
-        return dbc.Container([
-    dbc.Row([
-        dbc.Col(html.H1("Power Analysis Calculator",className='text-primary my-4 text-center'), width=10)
-    ],  justify="center"),
-
-    dbc.Row([
-        dbc.Col([
-            dbc.Card([
-            dbc.CardHeader("Input Parameters", className="text-center"),
-            dbc.CardBody([
-            dbc.Row([
-                html.Div([
-                    html.Label('Metric Type'),
-                    dcc.Dropdown(
-                        id='metric_type',
-                        multi=False,
-                        # value = 'Proportion',
-                        options=[
-                            {'label': 'Proportion',
-                             'value': 'proportion'},
-                            {'label': 'Continuous', 'value': 'continuous'}]
-                    )
-                ])
-            ], className="mb-3", style={'width': '60%'}),
-
-            dbc.Row([
-                html.Div([
-                    html.Label('Metric Mean'),
-                    dbc.Input(type="number", id="metric_mean",min=0)]),
-
-                html.Div(id='metric_type_note')
-            ], className="mb-3", style={'width': '60%'}),
-
-            dbc.Row([
-                html.Div([
-                    html.Label('Metric Variance'),
-                    dbc.Input(type="number", id="metric_variance",min=0)])
-            ], className="mb-3", style={'width': '60%'}),
-
-            dbc.Row([
-                html.Div([
-                    html.Label('Daily Traffic'),
-                    dbc.Input(type="number", id="daily_traffic",min=0)])
-            ], className="mb-3", style={'width': '60%'}),
-
-            dbc.Row([
-                dbc.Col([
-                    html.Label( 'Percentage Population'),
-                    dbc.InputGroup([
-                        dbc.Input(type="number",
-                                  value=100,
-                                  min=0,
-                                  max=100,  step=1, id="percentage_population"),
-                        dbc.InputGroupText("%")
-                    ])
-                ]),
-
-                dbc.Col([
-                    html.Br(),
-                    html.I(
-                        id="info-population", className="fas fa-info-circle"),
-
-                    dbc.Tooltip(
-                        "The percentage population",
-                        target="info-population",
-                        placement="right"
-                    )
-                ])
-            ], className="mb-3", style={'width': '70%'}),
-
-            dbc.Row([
-                dbc.Col([
-                    html.Label('Number of Variants'),
-                    dbc.Input(type="number",value=2, id="n_variants",min=1)]),
-
-                dbc.Col([
-                    html.Br(),
-                    html.I(
-                        id="info-variants", className="fas fa-info-circle"),
-
-                    dbc.Tooltip(
-                        "Including control variant",
-                        target="info-variants",
-                        placement="right"
-                    )
-                ])
-            ], className="mb-3", style={'width': '60%'}),
-
-            dbc.Row([
-                dbc.Col([
-                    html.Label(
-                        'Statistical Significance'),
-                    dbc.InputGroup([
-                        dbc.Input(type="number",
-                                  value=95,
-                                  min=0,
-                                  max=100,  step=1, id="statistical_significance"),
-                        dbc.InputGroupText("%")
-                    ])
-                ]),
-
-                dbc.Col([
-                    html.Br(),
-                    html.I(
-                        id="info-statistical-significance", className="fas fa-info-circle"),
-
-                    dbc.Tooltip(
-                        "The default value is 95%",
-                        target="info-statistical-significance",
-                        placement="right"
-                    )
-                ])
-            ], className="mb-3", style={'width': '70%'}),
-
-            dbc.Row([
-                dbc.Col([
-                    html.Label(
-                        'Statistical Power'),
-                    dbc.InputGroup([
-                        dbc.Input(type="number",
-                                  value=80,
-                                  min=0,
-                                  max=100,  step=1, id="statistical_power"),
-                        dbc.InputGroupText(
-                            "%")
-                    ])
-                ]),
-
-                dbc.Col([
-                    html.Br(),
-                    html.I(
-                        id="info-statistical-power", className="fas fa-info-circle"),
-
-                    dbc.Tooltip(
-                        "The default value is 80%",
-                        target="info-statistical-power",
-                        placement="right"
-                    )
-                ])
-            ], className="mb-3", style={'width': '70%'}),
 
-            dbc.Row([
-                dbc.Col([
-                    html.Label(
-                        'Minimum Detectable Effect'),
-                    html.Br(),
-                    dcc.RangeSlider(
-                        id='mde_slider',
-                        min=0,  # Minimum value of the slider
-                        max=100,  # Maximum value of the slider
-                        # value=5,  # Default value of the slider
-                        value=[1, 10],
-                        step=1,  # Step size
-                        marks={
-                            i: {'label': str(i) + '%'} for i in range(0, 101, 10)
-                        },
-                        tooltip={
-                            "placement": "bottom", "always_visible": True},
-                    )
-                ], width={"size": 8})
-            ])
-					])
-        ])
-			]), # Row 2, column 1
-
-      dbc.Col([
-        dbc.Card([
-            dbc.CardHeader("Output", className="text-center py-2"),
-            dbc.CardBody([
-            dcc.Graph(id='duration_chart',style={'margin-bottom': '15px'}),
+def calculator_config():
+    import plotly.io as pio
+    from chart_template import template_name
+    return {
+        "mde_step": MDE_STEP,
+        "template": pio.templates[template_name()].to_plotly_json(),
+    }
 
-            dcc.Graph(id='sample_size_chart',style={'margin-top': '15px'})
-					])])
-				])  # Row 2, column 1
-    	])  # Row 2
-		])  # container
-    
-    elif pathname == "/ab-testing-calculator-page":
-        return dbc.Container([
-    dbc.Row([
-        dbc.Col(html.H1("A/B Testing Calculator",className='text-primary my-4 text-center'), width=10)
-    ],  justify="center"),
-
-    dbc.Row([
-    dbc.Col([
-        dbc.Card([
-            dbc.CardBody([
-              dbc.Row([
-                    html.Div([
-                        dbc.Row([
-                            dbc.Col([
-                                html.Div(html.H1("A", className="mt-3"), className="text-center")  # Align "A" with inputs
-                            ], width=1, className="d-flex align-items-center"),  # Centering "A"
-
-                            dbc.Col([
-                                html.Label('Users'),
-                                dbc.Input(type="number", id="users_varA", min=0, value=1000),
-                            ], width=5),  # Adjusted to 5 for equal spacing
-                            dbc.Col([
-                                html.Label('Conversions'),
-                                dbc.Input(type="number", id="conversions_varA", min=0, value=100),
-                            ], width=5)  # Adjusted to 5 for equal spacing
-                        ])
-                    ], className="mb-3")
-                ]), #row for group A
-
-              dbc.Row([
-                    html.Div([
-                        dbc.Row([
-                            dbc.Col([
-                                html.Div(html.H1("B", className="mt-3"), className="text-center")  # Align "B" with inputs
-                            ], width=1, className="d-flex align-items-center"),  # Centering "B"
-
-                            dbc.Col([
-                                html.Label('Users'),
-                                dbc.Input(type="number", id="users_varB", min=0, value=1000),
-                            ], width=5),  # Adjusted to 5 for equal spacing
-                            dbc.Col([
-                                html.Label('Conversions'),
-                                dbc.Input(type="number", id="conversions_varB", min=0, value=90),
-                            ], width=5)  # Adjusted to 5 for equal spacing
-                        ])
-                    ], className="mb-3")
-                ]), #row for group B
-
-              dbc.Row([
-                    dbc.Col([
-                      dcc.RadioItems(options=[
-                          {'label': 'One-sided', 'value': 'One-sided'},
-                          {'label': 'Two-sided', 'value': 'Two-sided'}
-                          ],
-                          id='hypothesis',
-                          value='Two-sided',  # Default selected value
-                          inline=True,
-                          labelStyle={'margin-right': '20px'}  # Increase spacing between the options
-                    )
-                  ])
-              ]), #Hypothesis
-
-              # html.Br(),
-
-              # dbc.Row([
-              #       dbc.Col([
-              #         dbc.Button("Calculate", id="calculate_button", className="btn btn-primary", style={"color": "white"})
-              #       ])
-              # ]), # Button row
 
-            ])
-        ])
-    ]),
+app.layout = html.Div([
+    dcc.Location(id="url"),
+    # ID of the current upload in the server-side dataset store
+    dcc.Store(id="dataset-id", storage_type="session"),
+    # Settings the clientside calculators need from the server
+    dcc.Store(id="calculator-config", data=calculator_config() if CLIENTSIDE_CALCULATORS else None),
+    sidebar,
+    content
+])
 
-    dbc.Col([
-            dbc.Row(id='results-row', children=[
-            # This row will be populated by the callback
-          ])
-        ])
-      ])
-    ]) #container
-
-    elif pathname == "/outlier-detection":
-        return dbc.Container([
-  dbc.Row([
-  	dbc.Col(html.H1("Outlier Detection",className='text-primary my-4 text-center'), width=10)
-  ], justify="center"),
-
-	#Body Input
-  dbc.Row([
-		dbc.Col(
-      dbc.Card([
-        html.Div(html.H4("Input Data", className="mt-3"), className="text-center"),  # Align "A" with inputs
-      	dbc.CardBody([
-          dbc.Row([
-          html.Div([
-          	html.Label('Data Type'),
-             
-            dcc.Dropdown(
-            id='data_type',
-							multi=False,
-              value = 'cross_sectional',
-							options=[
-                {'label': 'Cross-sectional','value': 'cross_sectional'},
-                {'label': 'Time-series (coming soon)', 'value': 'time_series'}]
-              )
-          ],style={'width': '30%'}),
-          
-          #upload button
-					dcc.Upload(
-						id='upload-data',
-						children=html.Div([
-							# html.Button('Upload File')
-              dbc.Button("Upload File", color="light", className="me-1")
-							]),
-							
-							style={
-								'width': '100%',
-								'height': '60px',
-								'lineHeight': '60px',
-								# 'textAlign': 'center',
-								'margin': '10px'
-							},
-						)      
-					])
-				]),
-        
-				dbc.CardBody([
-				dbc.Row([
-          dbc.Col(
-    			# Div to display the DataFrame's head
-          html.Div(id='df-head')
-					)
-				])]),
-            
-				dbc.CardBody([
-				dbc.Row([
-          dbc.Col(
-          html.Div([
-          # Div to display the DataFrame's column
-            html.Label('Choose a column'),
-          	dcc.Dropdown(id='column-names-dropdown')
-					])
-          )
-					], style={'width':'30%'})
-      	]),
-        
-				dbc.CardBody([
-					dbc.Row(
-          	dbc.Col(
-          	# Placeholder for the boxplot
-    				dcc.Graph(id='boxplot')
-						)
-					),
-          
-					dbc.Row(
-						dbc.Col([
-          	dbc.Button("Outlier Removal", id="outlier_removal_button", color="dark", className="me-1")
-          	])
-        	), # Button row
-      	]),
-           
-			]))
-    ]), #body
-    
-		# dbc.Row(
-    #   dbc.Col(
-    #   	dbc.Card([
-		# 			html.Div(html.H3("Output", className="mt-3"), className="text-center"),  # Align "A" with inputs
-		# 	])
-		# 	)
-		# )
-  ]) #container
-  
+@app.callback(Output("page-content", "children"), [Input("url", "pathname")])
+def render_page_content(pathname):
+    # Page modules are imported on first visit and each layout is built once
+    return get_layout(pathname)
 
 @app.callback(
     [
@@ -459,7 +148,7 @@ def update_metric_note(metric_type):
     return note, step
 
 
-@app.callback(
+@calculator_callback(
     [Output('duration_chart', 'figure'),
      Output('sample_size_chart', 'figure')],
     [
@@ -473,98 +162,162 @@ def update_metric_note(metric_type):
       Input('percentage_population', 'value'),
     ]
 )
+@cache.memoize()
 def update_chart(mean, variance, traffic, n_variant, mde_range, statistical_significance, statistical_power,percentage_population):
+    from chart_template import curve_patch
+    from power_analysis import mde_grid, power_table
+
     if not all(v is not None for v in [mean, variance, traffic, n_variant]) or not mde_range:
         # If not all inputs are filled, return an empty chart
-        return go.Figure(), go.Figure()
+        return curve_patch([], []), curve_patch([], [])
 
     alpha = 1 - statistical_significance/100
-    beta = 1 - statistical_power/100
-
-    z_alpha = stats.norm.ppf(1 - alpha/2)
-    z_beta = stats.norm.ppf(1 - beta)
-    
+    power = statistical_power/100
     population = percentage_population/100
 
-    duration = [population*int(n_variant*(2*(z_alpha+z_beta)**2 / (((mde*mean/100)**2)/variance))/traffic)
-                for mde in range(mde_range[0], mde_range[1] + 1)]
-    
-    sample_size = [int((2*(z_alpha+z_beta)**2 / (((mde*mean/100)**2)/variance)))
-                   for mde in range(mde_range[0], mde_range[1] + 1)]
-    
-    x_values = list(range(mde_range[0], mde_range[1] + 1))
+    # Whole MDE grid in one vectorized pass, see power_analysis.py
+    result = power_table(mean, variance, traffic, n_variant,
+                         mde_grid(mde_range[0], mde_range[1], MDE_STEP),
+                         population=population, alpha=alpha, power=power)
+    x_values = result['mde']
+    duration = result['duration']
+    sample_size = result['sample_size']
+    mode = 'lines+markers' if len(x_values) <= 101 else 'lines'
+
+    # Only the trace data; titles and fonts are in the page's figures
+    return curve_patch(x_values, duration, mode), curve_patch(x_values, sample_size, mode)
 
-    # Create a figure and update it with the X and Y values
-    fig1 = go.Figure(data=go.Scatter(
-        x=x_values, y=duration, mode='lines+markers'))
+# Callback for the inverse question: which MDE the available traffic can detect
+@app.callback(
+    [Output('mde_traffic_chart', 'figure'),
+     Output('mde_alpha_power_chart', 'figure')],
+    [Input('metric_type', 'value'),
+     Input('metric_mean', 'value'),
+     Input('metric_variance', 'value'),
+     Input('daily_traffic', 'value'),
+     Input('n_variants', 'value'),
+     Input('statistical_significance', 'value'),
+     Input('statistical_power', 'value'),
+     Input('percentage_population', 'value'),
+     Input('max_duration', 'value')]
+)
+@cache.memoize()
+def update_mde_charts(metric_type, mean, variance, traffic, n_variant, statistical_significance,
+                      statistical_power, percentage_population, max_duration):
+    import numpy as np
+    from power_solver import detectable_mde, mde_surface, users_per_variant
+
+    if not all(v is not None for v in [mean, traffic, n_variant, max_duration]) or not mean or not traffic or \
+            (metric_type != 'proportion' and variance is None):
+        return go.Figure(), go.Figure()
 
+    alpha = 1 - statistical_significance/100
+    power = statistical_power/100
+    population = percentage_population/100
+    # Proportions are solved with the rate-dependent variance
+    variance = None if metric_type == 'proportion' else variance
+    contour_style = dict(colorscale='Viridis', reversescale=True,
+                         contours={'coloring': 'heatmap', 'showlabels': True, 'labelfont': {'color': 'white'}},
+                         colorbar={'title': 'MDE (%)'})
+
+    days = np.arange(1, max(int(max_duration), 2) + 1)
+    traffics = np.unique(np.geomspace(max(traffic / 4, 1), traffic * 4, 40).round())
+    fig1 = go.Figure(go.Contour(
+        x=traffics, y=days, z=mde_surface(days, traffics, mean, variance, n_variant, population, alpha, power),
+        hovertemplate='%{x:,.0f} users/day<br>%{y} days<br>MDE=%{z:.2f}%<extra></extra>',
+        **contour_style))
+    fig1.add_vline(x=traffic, line_dash='dot', line_color='white')
     fig1.update_layout(
-        title={
-            'text': 'Required Experiment Duration',
-            'y': 0.9,
-            'x': 0.5,
-            'xanchor': 'center',
-            'yanchor': 'top',
-            'font': dict(
-                    family="Verdana",
-                    size=16,
-                    color="black"
-            )
-        },
-        xaxis_title={
-            'text': 'MDE (%)',
-            'font': dict(
-                family="Verdana",
-                size=12,
-                color="black"
-            ),
-        },
-        yaxis_title={
-            'text': 'Duration in Days',
-            'font': dict(
-                family="Verdana",
-                size=12,
-                color="black"
-            ),
-        }
+        title={'text': 'Detectable MDE by Duration and Daily Traffic', 'x': 0.5, 'xanchor': 'center'},
+        xaxis={'title': 'Daily Traffic', 'type': 'log'},
+        yaxis={'title': 'Duration in Days'},
+    )
+
+    significance = np.linspace(0.80, 0.99, 20)
+    powers = np.linspace(0.5, 0.95, 19)
+    n = users_per_variant(days[-1], traffic, n_variant, population)
+    fig2 = go.Figure(go.Contour(
+        x=powers * 100, y=significance * 100,
+        z=detectable_mde(n, mean, variance, 1 - significance[:, None], powers[None, :]),
+        hovertemplate='power=%{x:.0f}%<br>significance=%{y:.0f}%<br>MDE=%{z:.2f}%<extra></extra>',
+        **contour_style))
+    fig2.update_layout(
+        title={'text': 'Detectable MDE in {} Days by Significance and Power'.format(days[-1]),
+               'x': 0.5, 'xanchor': 'center'},
+        xaxis={'title': 'Statistical Power (%)'},
+        yaxis={'title': 'Statistical Significance (%)'},
     )
+    return fig1, fig2
 
-    fig2 = go.Figure(data=go.Scatter(
-        x=x_values, y=sample_size, mode='lines+markers'))
+# Power over MDE x sample size, cached on the inputs alone; the button's
+# click count would make every run a cache miss
+@cache.memoize()
+def power_curve_figures(metric_type, mean, variance, n_variant, mde_range, statistical_significance, method):
+    import numpy as np
+    from power_analysis import sample_size
+    from power_simulation import power_surface
+
+    if not all(v is not None for v in [mean, n_variant]) or not mde_range or \
+            (metric_type != 'proportion' and variance is None):
+        return go.Figure(), go.Figure()
+
+    alpha = 1 - statistical_significance/100
+    metric = 'proportion' if metric_type == 'proportion' else 'continuous'
+    if metric == 'proportion':
+        variance = mean * (1 - mean)
+
+    # Sample sizes spanning what the formula asks for across the MDE range
+    mde = np.linspace(max(mde_range[0], 0.5), max(mde_range[1], 1), 15)
+    n_formula = sample_size(mde[[-1, 0]], mean, variance, alpha / max(n_variant - 1, 1))
+    sizes = np.unique(np.geomspace(max(n_formula[0] / 4, 10), max(n_formula[1] * 2, 100), 25).astype(int))
+    result = power_surface(mean, mde, sizes, variance, metric, n_variants=n_variant,
+                           alpha=alpha, method=method)
+
+    fig1 = go.Figure(go.Heatmap(
+        x=result['sample_size'], y=result['mde'], z=result['power'], zmin=0, zmax=1,
+        colorscale='Viridis', colorbar={'title': 'Power'},
+        hovertemplate='n=%{x}<br>MDE=%{y:.2f}%<br>power=%{z:.3f}<extra></extra>'))
+    fig1.update_layout(
+        title={'text': 'Power by MDE and Sample Size', 'x': 0.5, 'xanchor': 'center'},
+        xaxis={'title': 'Sample Size per Variant', 'type': 'log'},
+        yaxis={'title': 'MDE (%)'},
+    )
 
+    fig2 = go.Figure([
+        go.Scatter(x=result['sample_size'], y=result['power'][i], mode='lines',
+                   name='MDE {:.1f}%'.format(result['mde'][i]))
+        for i in range(0, len(result['mde']), 3)
+    ])
+    fig2.add_hline(y=0.8, line_dash='dot', line_color='gray')
     fig2.update_layout(
-        title={
-            'text': 'Required Sample Size',
-            'y': 0.9,
-            'x': 0.5,
-            'xanchor': 'center',
-            'yanchor': 'top',
-            'font': dict(
-                    family="Verdana",
-                    size=16,
-                    color="black"
-            ),
-        },
-        xaxis_title={
-            'text': 'MDE (%)',
-            'font': dict(
-                family="Verdana",
-                size=12,
-                color="black"
-            ),
-        },
-        yaxis_title={
-            'text': 'Number of Sample Size',
-            'font': dict(
-                family="Verdana",
-                size=12,
-                color="black"
-            ),
-        }
+        title={'text': 'Power Curves', 'x': 0.5, 'xanchor': 'center'},
+        xaxis={'title': 'Sample Size per Variant', 'type': 'log'},
+        yaxis={'title': 'Power', 'range': [0, 1]},
     )
     return fig1, fig2
 
+# Callback to simulate (or compute exactly) power over MDE x sample size
 @app.callback(
+    [Output('power_surface_chart', 'figure'),
+     Output('power_curve_chart', 'figure')],
+    [Input('power_curves_button', 'n_clicks')],
+    [State('metric_type', 'value'),
+     State('metric_mean', 'value'),
+     State('metric_variance', 'value'),
+     State('n_variants', 'value'),
+     State('mde_slider', 'value'),
+     State('statistical_significance', 'value'),
+     State('power_method', 'value')],
+    background=True,
+    running=[(Output('power_curves_button', 'disabled'), True, False),
+             (Output('power_curves_cancel_button', 'style'), {'display': 'inline-block'}, {'display': 'none'})],
+    cancel=[Input('power_curves_cancel_button', 'n_clicks')],
+    prevent_initial_call=True
+)
+def update_power_curves(n_clicks, metric_type, mean, variance, n_variant, mde_range, statistical_significance, method):
+    return power_curve_figures(metric_type, mean, variance, n_variant, mde_range, statistical_significance, method)
+
+@calculator_callback(
     Output('results-row', 'children'),
     [Input('users_varA', 'value'),
      Input('users_varB', 'value'),
@@ -572,20 +325,21 @@ def update_chart(mean, variance, traffic, n_variant, mde_range, statistical_sign
      Input('conversions_varB', 'value'),
      Input('hypothesis','value')]
 )
-
+@cache.memoize()
 def update_calculation(users_varA, users_varB, conversions_varA, conversions_varB, hypothesis ):
+    from ab_testing import pairwise_proportions_ztest
+
     # Calculate conversion rates and statistics as before
     conversion_rate_A = conversions_varA / users_varA
     conversion_rate_B = conversions_varB / users_varB
     percentage_difference = ((conversion_rate_B - conversion_rate_A) / conversion_rate_A) * 100
     
-    count = np.array([conversions_varA, conversions_varB])
-    nobs = np.array([users_varA, users_varB])
-
-    if hypothesis == 'Two-sided':
-      stat, pval = proportions_ztest(count, nobs)
-    else:
-      stat, pval = proportions_ztest(count, nobs, alternative='larger')
+    # B against A, the same direction as the variant table: one-sided asks
+    # whether B converts better
+    result = pairwise_proportions_ztest(
+        ['A', 'B'], [conversions_varA, conversions_varB], [users_varA, users_varB],
+        alternative='two-sided' if hypothesis == 'Two-sided' else 'larger')
+    pval = result['p_value'].iloc[0]
 
     alpha = 0.05
     significant = "Yes" if pval < alpha else "No"
@@ -632,76 +386,768 @@ def update_calculation(users_varA, users_varB, conversions_varA, conversions_var
 
     return output_calculation
 
-df = pd.DataFrame()
+def variant_label(i):
+    return chr(ord('A') + i) if i < 26 else 'V{}'.format(i + 1)
+
+
+def variant_rows(users_varA, users_varB, conversions_varA, conversions_varB,
+                 extra_users, extra_conversions, variant_table, extra_ids):
+    """(label, users, conversions) of every filled-in variant, control first."""
+    if variant_table:
+        rows = [(r['variant'], r['users'], r['conversions']) for r in variant_table['records']]
+    else:
+        rows = [('A', users_varA, conversions_varA), ('B', users_varB, conversions_varB)]
+        rows += [(i['index'], u, c) for i, u, c in zip(extra_ids, extra_users, extra_conversions)]
+    return [r for r in rows if r[1] and r[2] is not None]
+
 
-# Callback to parse uploaded file and update dropdown
+# Callback to add an input row for one more variant
 @app.callback(
-    [Output('column-names-dropdown', 'options'),
-     Output('df-head', 'children')],
+    Output('extra-variants', 'children'),
+    [Input('add_variant_button', 'n_clicks')],
+    prevent_initial_call=True
+)
+def add_variant(n_clicks):
+    # A and B are fixed, so the first added variant is C
+    label = variant_label(n_clicks + 1)
+    rows = Patch()
+    rows.append(dbc.Row([
+        html.Div([
+            dbc.Row([
+                dbc.Col([
+                    html.Div(html.H1(label, className="mt-3"), className="text-center")
+                ], width=1, className="d-flex align-items-center"),
+
+                dbc.Col([
+                    html.Label('Users'),
+                    dbc.Input(type="number", id={'type': 'variant_users', 'index': label}, min=0),
+                ], width=5),
+                dbc.Col([
+                    html.Label('Conversions'),
+                    dbc.Input(type="number", id={'type': 'variant_conversions', 'index': label}, min=0),
+                ], width=5)
+            ])
+        ], className="mb-3")
+    ]))
+    return rows
+
+
+# Callback to load variants from an uploaded table (variant, users, conversions)
+@app.callback(
+    Output('variant-table', 'data'),
+    [Input('variants-upload', 'contents'),
+     Input('variants-upload', 'filename')],
+    prevent_initial_call=True
+)
+def load_variant_table(contents, filename):
+    from ingestion import ingest_upload
+
+    try:
+        df, _ = ingest_upload(contents, filename)
+    except Exception as e:
+        callback_error('load_variant_table', e)
+        return {'error': 'There was an error processing this file.'}
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    missing = [c for c in ('variant', 'users', 'conversions') if c not in df.columns]
+    if missing:
+        return {'error': 'Missing columns: {}'.format(', '.join(missing))}
+    df = df[['variant', 'users', 'conversions']].astype({'variant': str})
+    return {'records': df.to_dict('records')}
+
+
+# Callback to compare all variants at once
+@app.callback(
+    Output('variant-comparison', 'children'),
+    [Input('users_varA', 'value'),
+     Input('users_varB', 'value'),
+     Input('conversions_varA', 'value'),
+     Input('conversions_varB', 'value'),
+     Input({'type': 'variant_users', 'index': ALL}, 'value'),
+     Input({'type': 'variant_conversions', 'index': ALL}, 'value'),
+     Input('hypothesis', 'value'),
+     Input('comparison_pairs', 'value'),
+     Input('correction', 'value'),
+     Input('variant-table', 'data')],
+    [State({'type': 'variant_users', 'index': ALL}, 'id')]
+)
+@cache.memoize()
+def update_variant_comparison(users_varA, users_varB, conversions_varA, conversions_varB,
+                              extra_users, extra_conversions, hypothesis, pairs, correction,
+                              variant_table, extra_ids):
+    import numpy as np
+    from ab_testing import pairwise_proportions_ztest
+
+    if variant_table and 'error' in variant_table:
+        return html.P(variant_table['error'], className='text-danger')
+    rows = variant_rows(users_varA, users_varB, conversions_varA, conversions_varB,
+                        extra_users, extra_conversions, variant_table, extra_ids)
+    if len(rows) < 3:
+        return None
+
+    labels, conversions, users = zip(*[(v, c, u) for v, u, c in rows])
+    result = pairwise_proportions_ztest(
+        labels, conversions, users, pairs=pairs,
+        alternative='two-sided' if hypothesis == 'Two-sided' else 'larger',
+        correction=correction)
+    result['significant'] = np.where(result['p_value_adjusted'] < 0.05, 'Yes', 'No')
+
+    columns = [
+        {'name': 'Baseline', 'id': 'baseline'},
+        {'name': 'Variant', 'id': 'variant'},
+        {'name': 'Baseline Rate', 'id': 'baseline_rate', 'type': 'numeric', 'format': {'specifier': '.2%'}},
+        {'name': 'Rate', 'id': 'rate', 'type': 'numeric', 'format': {'specifier': '.2%'}},
+        {'name': 'Lift (%)', 'id': 'lift_pct', 'type': 'numeric', 'format': {'specifier': '.1f'}},
+        {'name': 'p value', 'id': 'p_value', 'type': 'numeric', 'format': {'specifier': '.4f'}},
+        {'name': 'Adjusted p value', 'id': 'p_value_adjusted', 'type': 'numeric', 'format': {'specifier': '.4f'}},
+        {'name': 'Significant', 'id': 'significant'},
+    ]
+    return dbc.Card([
+        dbc.CardHeader("All Variants", className="text-center"),
+        dbc.CardBody([
+            dash_table.DataTable(
+                columns=columns,
+                data=result.to_dict('records'),
+                sort_action='native',
+                page_size=20,
+                style_table={'overflowX': 'auto'},
+                style_cell={'textAlign': 'left'},
+            )
+        ])
+    ])
+
+# Callback for the Bayesian analysis of all variants against A
+@app.callback(
+    Output('bayesian-results', 'children'),
+    [Input('users_varA', 'value'),
+     Input('users_varB', 'value'),
+     Input('conversions_varA', 'value'),
+     Input('conversions_varB', 'value'),
+     Input({'type': 'variant_users', 'index': ALL}, 'value'),
+     Input({'type': 'variant_conversions', 'index': ALL}, 'value'),
+     Input('variant-table', 'data'),
+     Input('analysis_mode', 'value')],
+    [State({'type': 'variant_users', 'index': ALL}, 'id')]
+)
+@cache.memoize()
+def update_bayesian(users_varA, users_varB, conversions_varA, conversions_varB,
+                    extra_users, extra_conversions, variant_table, analysis_mode, extra_ids):
+    from bayesian import compare_variants
+
+    if analysis_mode != 'bayesian' or (variant_table and 'error' in variant_table):
+        return None
+    rows = variant_rows(users_varA, users_varB, conversions_varA, conversions_varB,
+                        extra_users, extra_conversions, variant_table, extra_ids)
+    if len(rows) < 2:
+        return None
+
+    labels, users, conversions = zip(*rows)
+    try:
+        # Beta(1, 1) priors; closed-form probabilities and losses, sampled lift interval
+        result = compare_variants(labels, conversions, users)
+    except ValueError as e:
+        return html.P(str(e), className='text-danger')
+
+    percent = {'type': 'numeric', 'format': {'specifier': '.2%'}}
+    columns = [
+        {'name': 'Variant', 'id': 'variant'},
+        dict({'name': 'Rate', 'id': 'rate'}, **percent),
+        dict({'name': 'P(beat {})'.format(labels[0]), 'id': 'prob_beat_control'}, **percent),
+        {'name': 'Expected loss', 'id': 'expected_loss', 'type': 'numeric', 'format': {'specifier': '.3%'}},
+        {'name': 'Lift (%)', 'id': 'lift_pct', 'type': 'numeric', 'format': {'specifier': '.1f'}},
+        {'name': 'Lift 95% CI low (%)', 'id': 'lift_ci_low', 'type': 'numeric', 'format': {'specifier': '.1f'}},
+        {'name': 'Lift 95% CI high (%)', 'id': 'lift_ci_high', 'type': 'numeric', 'format': {'specifier': '.1f'}},
+    ]
+    return dbc.Card([
+        dbc.CardHeader("Bayesian Analysis", className="text-center"),
+        dbc.CardBody([
+            dash_table.DataTable(
+                columns=columns,
+                data=result.to_dict('records'),
+                sort_action='native',
+                page_size=20,
+                style_table={'overflowX': 'auto'},
+                style_cell={'textAlign': 'left'},
+            ),
+            html.P('Expected loss is the conversion rate given up, on average, by shipping the '
+                   'variant if it is in fact worse than {}.'.format(labels[0]),
+                   className='text-muted small mt-2'),
+        ])
+    ])
+
+
+@app.callback(
+    [Output('continuous-summary-inputs', 'style'),
+     Output('continuous-raw-inputs', 'style')],
+    [Input('continuous_input', 'value')]
+)
+def toggle_continuous_inputs(mode):
+    if mode == 'raw':
+        return {'display': 'none'}, {}
+    return {}, {'display': 'none'}
+
+
+# Callback to keep an uploaded raw file on disk and offer its columns; the
+# file is only read in chunks when the analysis runs
+@app.callback(
+    [Output('continuous-upload-file', 'data'),
+     Output('continuous-upload-name', 'children'),
+     Output('continuous_group_column', 'options'),
+     Output('continuous_metric_column', 'options'),
+     Output('continuous_covariate_column', 'options')],
+    [Input('continuous-upload', 'contents'),
+     Input('continuous-upload', 'filename')],
+    prevent_initial_call=True
+)
+def store_continuous_upload(contents, filename):
+    from ingestion import remove_stale_uploads, save_upload, upload_columns
+
+    remove_stale_uploads()
+    try:
+        path, nbytes = save_upload(contents, filename)
+        columns = upload_columns(path, filename)
+    except Exception as e:
+        callback_error('store_continuous_upload', e)
+        return None, 'There was an error processing this file.', [], [], []
+    options = [{'label': str(col), 'value': col} for col in columns]
+    upload = {'name': os.path.basename(path), 'filename': filename}
+    return upload, '{} ({:,} bytes)'.format(filename, nbytes), options, options, options
+
+
+@app.callback(
+    Output('continuous-results', 'children'),
+    [Input('continuous_input', 'value'),
+     Input('users_contA', 'value'),
+     Input('mean_contA', 'value'),
+     Input('std_contA', 'value'),
+     Input('users_contB', 'value'),
+     Input('mean_contB', 'value'),
+     Input('std_contB', 'value'),
+     Input('continuous-upload-file', 'data'),
+     Input('continuous_group_column', 'value'),
+     Input('continuous_metric_column', 'value'),
+     Input('continuous_covariate_column', 'value'),
+     Input('continuous_hypothesis', 'value')]
+)
+@cache.memoize()
+def update_continuous_calculation(mode, users_A, mean_A, std_A, users_B, mean_B, std_B,
+                                  upload, group_column, metric_column, covariate_column, hypothesis):
+    import pandas as pd
+    from ab_testing import compare_means
+    from ingestion import iter_upload_chunks, upload_path
+    from moments import GroupMoments
+
+    alternative = 'two-sided' if hypothesis == 'Two-sided' else 'larger'
+    cuped = None
+    if mode == 'raw':
+        if not upload or group_column is None or metric_column is None:
+            return None
+        columns = [group_column, metric_column] + ([covariate_column] if covariate_column is not None else [])
+        moments = GroupMoments()
+        try:
+            for chunk in iter_upload_chunks(upload_path(upload['name']), upload['filename'], usecols=columns):
+                moments.update(chunk[group_column].astype(str), pd.to_numeric(chunk[metric_column], errors='coerce'),
+                               None if covariate_column is None else pd.to_numeric(chunk[covariate_column], errors='coerce'))
+        except (OSError, KeyError, ValueError) as e:
+            callback_error('update_continuous_calculation', e)
+            return html.P('There was an error processing this file.', className='text-danger')
+        summary = moments.summary().sort_index()
+        if covariate_column is not None:
+            cuped, theta = moments.cuped()
+            cuped = cuped.sort_index()
+    else:
+        if not all(v is not None for v in [users_A, mean_A, std_A, users_B, mean_B, std_B]):
+            return None
+        summary = pd.DataFrame({'n': [users_A, users_B], 'mean': [mean_A, mean_B],
+                                'var': [std_A ** 2, std_B ** 2]}, index=['A', 'B'])
+    if len(summary) < 2:
+        return html.P('At least two variants are needed.', className='text-danger')
+
+    result = compare_means(summary, alternative=alternative)
+    columns = [
+        {'name': 'Baseline', 'id': 'baseline'},
+        {'name': 'Variant', 'id': 'variant'},
+        {'name': 'Baseline Mean', 'id': 'baseline_mean', 'type': 'numeric', 'format': {'specifier': '.4f'}},
+        {'name': 'Mean', 'id': 'mean', 'type': 'numeric', 'format': {'specifier': '.4f'}},
+        {'name': 'Lift (%)', 'id': 'lift_pct', 'type': 'numeric', 'format': {'specifier': '.1f'}},
+        {'name': 'p value', 'id': 'p_value', 'type': 'numeric', 'format': {'specifier': '.4f'}},
+    ]
+    if len(result) > 1:
+        columns.append({'name': 'Adjusted p value', 'id': 'p_value_adjusted', 'type': 'numeric', 'format': {'specifier': '.4f'}})
+    if cuped is not None:
+        adjusted = compare_means(cuped, alternative=alternative)
+        result['cuped_lift_pct'] = adjusted['lift_pct']
+        result['cuped_p_value'] = adjusted['p_value_adjusted'] if len(result) > 1 else adjusted['p_value']
+        columns += [
+            {'name': 'CUPED Lift (%)', 'id': 'cuped_lift_pct', 'type': 'numeric', 'format': {'specifier': '.1f'}},
+            {'name': 'CUPED p value', 'id': 'cuped_p_value', 'type': 'numeric', 'format': {'specifier': '.4f'}},
+        ]
+
+    return dbc.Card([
+        dbc.CardHeader("Welch's t-test", className="text-center"),
+        dbc.CardBody([
+            dash_table.DataTable(
+                columns=columns,
+                data=result.to_dict('records'),
+                sort_action='native',
+                page_size=20,
+                style_table={'overflowX': 'auto'},
+                style_cell={'textAlign': 'left'},
+            ),
+            html.P('CUPED theta: {:.4f}'.format(theta), className='text-muted small mt-2') if cuped is not None else None,
+        ])
+    ])
+
+# Callback to parse the uploaded files; every CSV and sheet becomes a dataset
+@app.callback(
+    [Output('upload-picker', 'options'),
+     Output('upload-picker', 'value'),
+     Output('upload-picker-row', 'style'),
+     Output('df-head', 'children', allow_duplicate=True)],
     [Input('upload-data', 'contents'),
     Input('upload-data', 'filename')],
+    background=True,
+    running=[(Output('upload-status', 'style'), {'display': 'block'}, {'display': 'none'})],
+    progress=[Output('upload-progress', 'value'), Output('upload-progress', 'max'), Output('upload-progress', 'label')],
+    cancel=[Input('upload_cancel_button', 'n_clicks')],
     prevent_initial_call=True
 )
 
-def update_dropdown(contents, filename):
-    global df
-    content_type, content_string = contents.split(',')
+def update_dropdown(set_progress, contents, filename):
+    from ingestion import ingest_uploads
 
-    decoded = base64.b64decode(content_string)
+    # One file unless the upload allows several
+    contents = [contents] if isinstance(contents, str) else contents
+    filenames = [filename] if isinstance(filename, str) else filename
+    progress = Progress(set_progress, 1)
     try:
-        if 'csv' in filename:
-          # Assume that the user uploaded a CSV file
-          df = pd.read_csv(
-              io.StringIO(decoded.decode('utf-8')))
-        elif 'xls' in filename:
-          # Assume that the user uploaded an excel file
-          df = pd.read_excel(io.BytesIO(decoded))
+        # Files seen before are found by content hash and not parsed again;
+        # the rest are decoded into temp files and every CSV and sheet is
+        # parsed in a process pool straight into the dataset store, see
+        # ingestion.py
+        progress('Parsing {}'.format(', '.join(filenames)))
+        parts = ingest_uploads(contents, filenames)
     except Exception as e:
-        print(e)
-        return html.Div([
+        callback_error('update_dropdown', e)
+        return [], None, {'display': 'none'}, html.Div([
           'There was an error processing this file.'
         ])
-    
-		# Filter only numerical columns
-    numerical_cols = df.select_dtypes(include=['number']).columns
+    for info in parts:
+        if not info['cached']:
+            observe_upload(info)
+
+    options = [{'label': '{}{} ({:,} rows{})'.format(
+                    info['filename'], ' / {}'.format(info['sheet']) if info.get('sheet') is not None else '',
+                    info['rows'], ', cached' if info['cached'] else ''),
+                'value': info['dataset_id']} for info in parts]
+    style = {'display': 'block'} if len(parts) > 1 else {'display': 'none'}
+    return options, parts[0]['dataset_id'] if parts else None, style, dash.no_update
+
+# Callback to open one parsed file or sheet: column dropdowns and preview
+@app.callback(
+    [Output('column-names-dropdown', 'options'),
+     Output('df-head', 'children'),
+     Output('dataset-id', 'data'),
+     Output('segment_column', 'options')],
+    [Input('upload-picker', 'value')],
+    prevent_initial_call=True
+)
+def select_upload(dataset_id):
+    from preview import COLUMNS_PER_PAGE
+    from query import group_columns
+
+    if not store.exists(dataset_id):
+        return [], None, None, []
+    info = store.get_meta(dataset_id)
+    stats = info.get('column_stats', [])
+    segment_options = [{'label': col, 'value': col} for col in group_columns(stats)]
 
     # Dropdown options from numerical columns
-    dropdown_options = [{'label': col, 'value': col} for col in numerical_cols]
+    dropdown_options = [{'label': s['column'], 'value': s['column']} for s in stats if s['min'] is not None]
 
-    # Generate a DataTable from DataFrame's head
+    # Paged preview: rows and columns are fetched per page, see preview.py
     df_head_table = html.Div([
       html.Label('Preview Data'),
-       
+      html.P('{:,} rows, {:,} columns, parsed in {:.2f} s'.format(
+          info['rows'], info['columns'], info['decode_seconds'] + info['parse_seconds']),
+          className='text-muted small'),
+      dbc.Pagination(id='preview-column-page', max_value=max(-(-len(stats) // COLUMNS_PER_PAGE), 1),
+                     active_page=1, fully_expanded=False, size='sm'),
+
+      dash_table.DataTable(
+        id='column-stats-table',
+        style_table={'overflowX': 'auto'},
+        style_cell={'textAlign': 'left'},
+      ),
+      html.Br(),
       dash_table.DataTable(
-    		columns=[{"name": i, "id": i} for i in df.columns],
-      	data=df.head().to_dict('records'),
+        id='preview-table',
+        page_action='custom',
+        page_current=0,
+        page_size=10,
+        sort_action='custom',
+        sort_mode='multi',
+        sort_by=[],
+        filter_action='custom',
+        filter_query='',
       	style_table={'overflowX': 'auto'},  # Horizontal scroll
       	style_cell={'textAlign': 'left'},
     	)]
     )
 
-    return dropdown_options, df_head_table
+    return dropdown_options, df_head_table, dataset_id, segment_options
+
+# Callback to show the columns (and their stats) of one column page
+@app.callback(
+    [Output('preview-table', 'columns'),
+     Output('column-stats-table', 'columns'),
+     Output('column-stats-table', 'data')],
+    [Input('preview-column-page', 'active_page')],
+    [State('dataset-id', 'data')]
+)
+def update_preview_columns(active_page, dataset_id):
+    from preview import column_window
+
+    stats = store.get_meta(dataset_id).get('column_stats', []) if dataset_id else []
+    visible = column_window(stats, active_page)
+    numeric = {'type': 'numeric', 'format': {'specifier': ',.4~f'}}
+    preview_columns = [dict({'name': s['column'], 'id': s['column']}, **(numeric if s['min'] is not None else {}))
+                       for s in visible]
+    stats_columns = [{'name': 'column', 'id': 'column'}, {'name': 'dtype', 'id': 'dtype'},
+                     dict({'name': 'null %', 'id': 'null_pct'}, **numeric),
+                     dict({'name': 'min', 'id': 'min'}, **numeric),
+                     dict({'name': 'max', 'id': 'max'}, **numeric),
+                     dict({'name': 'distinct (approx.)', 'id': 'distinct'}, **numeric)]
+    return preview_columns, stats_columns, visible
+
+
+# Callback to fetch one page of the preview, sorted and filtered on the server
+@app.callback(
+    [Output('preview-table', 'data'),
+     Output('preview-table', 'page_count')],
+    [Input('preview-table', 'page_current'),
+     Input('preview-table', 'page_size'),
+     Input('preview-table', 'sort_by'),
+     Input('preview-table', 'filter_query'),
+     Input('preview-table', 'columns')],
+    [State('dataset-id', 'data')]
+)
+def update_preview_page(page_current, page_size, sort_by, filter_query, columns, dataset_id):
+    from preview import page
+
+    if not columns or not store.exists(dataset_id):
+        return [], 1
+    visible = [c['id'] for c in columns]
+    sort_by = [s for s in sort_by or [] if s['column_id'] in visible]
+    try:
+        return page(store.path(dataset_id), visible, page_current, page_size, sort_by, filter_query)
+    except (ValueError, TypeError) as e:
+        callback_error('update_preview_page', e)
+        return [], 1
 
 # Callback to generate and display the boxplot for the selected column
 @app.callback(
     Output('boxplot', 'figure'),
-    [Input('column-names-dropdown', 'value')],
+    [Input('column-names-dropdown', 'value'),
+     Input('plot_type', 'value')],
+    [State('dataset-id', 'data')],
+    background=True,
+    running=[(Output('boxplot', 'style'), {'opacity': 0.5}, {'opacity': 1})],
     prevent_initial_call=True
 )
 
-def update_boxplot(selected_column):
-    global df
-    if selected_column is not None and not df.empty:
-        fig = px.box(df, y=selected_column)
-        
+def update_boxplot(selected_column, plot_type, dataset_id):
+    from downsample import points
+    from plots import distribution_figure, points_figure
+
+    df = store.get(dataset_id, columns=[selected_column]) if selected_column is not None else None
+    if df is not None and not df.empty:
+        # Summarized on the server so the figure size does not grow with the row count
+        if plot_type == 'points':
+            fig = points_figure(points(dataset_id, selected_column), selected_column)
+        else:
+            fig = distribution_figure(df[selected_column].to_numpy(), selected_column, plot_type)
+
+        titles = {'box': 'Boxplot', 'histogram': 'Histogram', 'violin': 'Violin plot', 'points': 'Points'}
         # Add a title to the plot
         fig.update_layout(
-            title=f'Boxplot of {selected_column}',
+            title=f'{titles.get(plot_type, "Boxplot")} of {selected_column}',
             title_x=0.5,  # Center the title
-            yaxis_title=selected_column,  # Add a title for the Y-axis
         )
         return fig
     return {}
 
+# Callback to redraw the points plot at the resolution of the zoomed range
+@app.callback(
+    Output('boxplot', 'figure', allow_duplicate=True),
+    [Input('boxplot', 'relayoutData')],
+    [State('column-names-dropdown', 'value'),
+     State('plot_type', 'value'),
+     State('dataset-id', 'data')],
+    prevent_initial_call=True
+)
+def zoom_boxplot(relayout_data, selected_column, plot_type, dataset_id):
+    from downsample import ROW_COLUMN, points, zoom_range
+    from plots import zoom_patch
+
+    changed, x_range = zoom_range(relayout_data)
+    if not changed or plot_type != 'points' or selected_column is None or not store.exists(dataset_id):
+        raise PreventUpdate
+    return zoom_patch(points(dataset_id, selected_column, x_range=x_range), ROW_COLUMN, [selected_column])
+
+# Callback to add a filter row for the segment summary
+@app.callback(
+    Output('filter-rows', 'children'),
+    [Input('add_filter_button', 'n_clicks')],
+    [State('dataset-id', 'data')],
+    prevent_initial_call=True
+)
+def add_filter(n_clicks, dataset_id):
+    from query import FILTER_OPS, open_dataset
+
+    columns = open_dataset(store.path(dataset_id)).schema.names if store.exists(dataset_id) else []
+    rows = Patch()
+    rows.append(dbc.Row([
+        dbc.Col(dcc.Dropdown(id={'type': 'filter_column', 'index': n_clicks},
+                             options=[{'label': c, 'value': c} for c in columns],
+                             placeholder='Column'), width=5),
+        dbc.Col(dcc.Dropdown(id={'type': 'filter_op', 'index': n_clicks},
+                             options=[{'label': op, 'value': op} for op in FILTER_OPS],
+                             value='==', clearable=False), width=3),
+        dbc.Col(dbc.Input(id={'type': 'filter_value', 'index': n_clicks}, placeholder='Value',
+                          debounce=True), width=4),
+    ], className="mb-2"))
+    return rows
+
+
+# Callback to summarize the selected column per segment
+@app.callback(
+    [Output('segment-summary', 'children'),
+     Output('segment-boxplot', 'figure')],
+    [Input('column-names-dropdown', 'value'),
+     Input('segment_column', 'value'),
+     Input({'type': 'filter_column', 'index': ALL}, 'value'),
+     Input({'type': 'filter_op', 'index': ALL}, 'value'),
+     Input({'type': 'filter_value', 'index': ALL}, 'value')],
+    [State('dataset-id', 'data')],
+    prevent_initial_call=True
+)
+@cache.memoize()
+def update_segments(selected_column, segment_column, filter_columns, filter_ops, filter_values, dataset_id):
+    from plots import segment_box_traces
+    from query import segment_summary
+
+    if selected_column is None or not store.exists(dataset_id):
+        return None, {}
+    filters = [{'column': c, 'op': op, 'value': v}
+               for c, op, v in zip(filter_columns, filter_ops, filter_values)
+               if c is not None and (v not in (None, '') or op in ('is null', 'not null'))]
+    try:
+        summary = segment_summary(store.path(dataset_id), selected_column, segment_column, filters)
+    except (ValueError, TypeError) as e:
+        return html.P(str(e), className='text-danger'), {}
+
+    summary_table = dash_table.DataTable(
+        columns=[{'name': 'segment', 'id': 'segment'}] +
+                [{'name': c, 'id': c, 'type': 'numeric', 'format': {'specifier': ',.4~f'}}
+                 for c in summary.columns[1:]],
+        data=summary.to_dict('records'),
+        sort_action='native',
+        style_table={'overflowX': 'auto'},
+        style_cell={'textAlign': 'left'},
+    )
+    fig = go.Figure(segment_box_traces(summary, selected_column))
+    fig.update_layout(
+        title=f'{selected_column} by {segment_column}' if segment_column else selected_column,
+        title_x=0.5,
+        yaxis_title=selected_column,
+    )
+    return summary_table, fig
+
+# Callback to remove outliers from every numeric column of the upload
+@app.callback(
+    Output('outlier-result', 'children'),
+    [Input('outlier_removal_button', 'n_clicks')],
+    [State('dataset-id', 'data'),
+     State('outlier_method', 'value')],
+    background=True,
+    running=[(Output('outlier_removal_button', 'disabled'), True, False),
+             (Output('outlier-status', 'style'), {'display': 'block'}, {'display': 'none'})],
+    progress=[Output('outlier-progress', 'value'), Output('outlier-progress', 'max'), Output('outlier-progress', 'label')],
+    cancel=[Input('outlier_cancel_button', 'n_clicks')],
+    prevent_initial_call=True
+)
+def update_outlier_removal(set_progress, n_clicks, dataset_id, method):
+    from outliers import remove_outliers
+
+    progress = Progress(set_progress, 3)
+    progress('Loading data')
+    df = store.get(dataset_id)
+    if df is None or df.empty:
+        return html.P('Upload a file first.', className='text-danger')
+
+    progress('Detecting outliers')
+    filtered, counts = remove_outliers(df, method=method)
+    progress('Saving')
+    filename = store.get_meta(dataset_id).get('filename', 'data')
+    filtered_id = store.put(filtered, meta={
+        'filename': '{}_without_outliers.{}'.format(filename.rsplit('.', 1)[0], 'parquet'),
+        'source': dataset_id,
+        'outlier_method': method,
+    })
+
+    counts_table = dash_table.DataTable(
+        columns=[{'name': 'Column', 'id': 'column'}, {'name': 'Outliers', 'id': 'outliers'}],
+        data=[{'column': col, 'outliers': n} for col, n in counts.items()],
+        style_table={'overflowX': 'auto'},
+        style_cell={'textAlign': 'left'},
+    )
+    return html.Div([
+        html.P('Removed {:,} of {:,} rows.'.format(len(df) - len(filtered), len(df))),
+        counts_table,
+        html.Br(),
+        dbc.Button("Download CSV", href='/api/datasets/{}/download?format=csv'.format(filtered_id),
+                   external_link=True, color="light", className="me-1"),
+        dbc.Button("Download Parquet", href='/api/datasets/{}/download?format=parquet'.format(filtered_id),
+                   external_link=True, color="light", className="me-1"),
+    ])
+
+# Callback to show the time-series section for time-series data
+@app.callback(
+    Output('timeseries-section', 'style'),
+    [Input('data_type', 'value')]
+)
+def toggle_timeseries_section(data_type):
+    return {'display': 'block'} if data_type == 'time_series' else {'display': 'none'}
+
+# Callback to offer the upload's columns as timestamp and series columns
+@app.callback(
+    [Output('ts_timestamp_column', 'options'),
+     Output('ts_series_column', 'options')],
+    [Input('dataset-id', 'data')]
+)
+def update_timeseries_columns(dataset_id):
+    stats = store.get_meta(dataset_id).get('column_stats', []) if dataset_id else []
+    options = [{'label': s['column'], 'value': s['column']} for s in stats]
+    return options, options
+
+# Callback to score the chosen column over time with a time-series detector
+@app.callback(
+    [Output('ts-result', 'children'),
+     Output('ts-result-id', 'data'),
+     Output('ts_plot_series', 'options'),
+     Output('ts_plot_series', 'value')],
+    [Input('ts_detect_button', 'n_clicks')],
+    [State('dataset-id', 'data'),
+     State('column-names-dropdown', 'value'),
+     State('ts_timestamp_column', 'value'),
+     State('ts_series_column', 'value'),
+     State('ts_detector', 'value'),
+     State('ts_window', 'value'),
+     State('ts_threshold', 'value')],
+    background=True,
+    running=[(Output('ts_detect_button', 'disabled'), True, False),
+             (Output('ts-status', 'style'), {'display': 'block'}, {'display': 'none'})],
+    progress=[Output('ts-progress', 'value'), Output('ts-progress', 'max'), Output('ts-progress', 'label')],
+    cancel=[Input('ts_cancel_button', 'n_clicks')],
+    prevent_initial_call=True
+)
+def update_timeseries_anomalies(set_progress, n_clicks, dataset_id, value_column, timestamp_column,
+                                series_column, detector, window, threshold):
+    from downsample import ensure_pyramid
+    from timeseries import detect
+
+    if value_column is None or not store.exists(dataset_id):
+        return html.P('Upload a file and choose a column first.', className='text-danger'), None, [], None
+
+    progress = Progress(set_progress, 3)
+    progress('Loading data')
+    columns = list(dict.fromkeys(c for c in (value_column, timestamp_column, series_column) if c))
+    df = store.get(dataset_id, columns=columns)
+    window = int(window or 50)
+
+    progress('Detecting anomalies')
+    try:
+        # One knob for every detector: the rolling window, the EWMA span or the seasonal period
+        result = detect(df, value_column, timestamp_column, series_column, detector, threshold,
+                        window=window, alpha=2 / (window + 1), period=window)
+    except (ValueError, TypeError) as e:
+        return html.P(str(e), className='text-danger'), None, [], None
+
+    progress('Saving')
+    filename = store.get_meta(dataset_id).get('filename', 'data')
+    result_id = store.put(result.reset_index(drop=True), meta={
+        'filename': '{}_anomalies.{}'.format(filename.rsplit('.', 1)[0], 'parquet'),
+        'source': dataset_id,
+        'kind': 'timeseries_anomalies',
+        'detector': detector,
+    })
+    # Built here so that the chart and its zooms only read it, see downsample.py
+    ensure_pyramid(result_id, 'value', 'timestamp', 'series', ['expected'])
+    counts = result.groupby('series', sort=False)['anomaly'].agg(['size', 'sum'])
+    counts = counts.sort_values('sum', ascending=False)
+
+    counts_table = dash_table.DataTable(
+        columns=[{'name': 'Series', 'id': 'series'}, {'name': 'Points', 'id': 'size'},
+                 {'name': 'Anomalies', 'id': 'sum'}],
+        data=counts.reset_index().to_dict('records'),
+        page_size=10,
+        sort_action='native',
+        style_table={'overflowX': 'auto'},
+        style_cell={'textAlign': 'left'},
+    )
+    summary = html.Div([
+        html.P('{:,} anomalies in {:,} points of {:,} series.'.format(
+            int(result['anomaly'].sum()), len(result), len(counts))),
+        counts_table,
+        html.Br(),
+        dbc.Button("Download CSV", href='/api/datasets/{}/download?format=csv'.format(result_id),
+                   external_link=True, color="light", className="me-1"),
+        dbc.Button("Download Parquet", href='/api/datasets/{}/download?format=parquet'.format(result_id),
+                   external_link=True, color="light", className="me-1"),
+    ])
+    options = [{'label': s, 'value': s} for s in counts.index]
+    return summary, result_id, options, counts.index[0] if len(counts) else None
+
+# Callback to plot one series of the time-series anomalies
+@app.callback(
+    Output('ts-graph', 'figure'),
+    [Input('ts_plot_series', 'value')],
+    [State('ts-result-id', 'data'),
+     State('column-names-dropdown', 'value')],
+    prevent_initial_call=True
+)
+def update_timeseries_graph(series, result_id, value_column):
+    from downsample import points
+    from plots import anomaly_figure
+    from query import scan
+
+    if series is None or not store.exists(result_id):
+        return {}
+    lines = points(result_id, 'value', 'timestamp', 'series', series, extra=['expected'])
+    anomalies = scan(store.path(result_id), ['timestamp', 'value', 'score'],
+                     [{'column': 'series', 'op': '==', 'value': series},
+                      {'column': 'anomaly', 'op': '==', 'value': True}]).to_pandas()
+    fig = anomaly_figure(lines, anomalies, value_column or 'value')
+    fig.update_layout(title=series, title_x=0.5)
+    return fig
+
+# Callback to redraw the time-series lines at the resolution of the zoomed range
+@app.callback(
+    Output('ts-graph', 'figure', allow_duplicate=True),
+    [Input('ts-graph', 'relayoutData')],
+    [State('ts_plot_series', 'value'),
+     State('ts-result-id', 'data')],
+    prevent_initial_call=True
+)
+def zoom_timeseries_graph(relayout_data, series, result_id):
+    from downsample import points, zoom_range
+    from plots import zoom_patch
+
+    changed, x_range = zoom_range(relayout_data)
+    if not changed or series is None or not store.exists(result_id):
+        raise PreventUpdate
+    lines = points(result_id, 'value', 'timestamp', 'series', series, x_range, ['expected'])
+    return zoom_patch(lines, 'timestamp', ['value', 'expected'])
+
 if __name__ == "__main__":
     app.run_server(debug=True)
\ No newline at end of file
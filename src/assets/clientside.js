@@ -0,0 +1,207 @@
+/*
+ * Browser implementations of the calculator callbacks, used when the app is
+ * started with SSA_CLIENTSIDE_CALCULATORS=1. They mirror update_calculation
+ * and update_chart in app.py (and power_analysis.py) so that typing into the
+ * calculators does not need a round trip to the server.
+ */
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    stats: {
+        // Standard normal CDF, Hart (1968) as given by West (2005);
+        // accurate to double precision
+        normCdf: function (x) {
+            var xAbs = Math.abs(x);
+            var cdf;
+            if (xAbs > 37) {
+                cdf = 0;
+            } else {
+                var e = Math.exp(-xAbs * xAbs / 2);
+                if (xAbs < 7.07106781186547) {
+                    var num = 3.52624965998911e-02 * xAbs + 0.700383064443688;
+                    num = num * xAbs + 6.37396220353165;
+                    num = num * xAbs + 33.912866078383;
+                    num = num * xAbs + 112.079291497871;
+                    num = num * xAbs + 221.213596169931;
+                    num = num * xAbs + 220.206867912376;
+                    var den = 8.83883476483184e-02 * xAbs + 1.75566716318264;
+                    den = den * xAbs + 16.064177579207;
+                    den = den * xAbs + 86.7807322029461;
+                    den = den * xAbs + 296.564248779674;
+                    den = den * xAbs + 637.333633378831;
+                    den = den * xAbs + 793.826512519948;
+                    den = den * xAbs + 440.413735824752;
+                    cdf = e * num / den;
+                } else {
+                    var b = xAbs + 0.65;
+                    b = xAbs + 4 / b;
+                    b = xAbs + 3 / b;
+                    b = xAbs + 2 / b;
+                    b = xAbs + 1 / b;
+                    cdf = e / b / 2.506628274631;
+                }
+            }
+            return x > 0 ? 1 - cdf : cdf;
+        },
+
+        normSf: function (x) {
+            return window.dash_clientside.stats.normCdf(-x);
+        },
+
+        // Inverse standard normal CDF, Acklam's rational approximation
+        // followed by one Halley refinement step
+        normPpf: function (p) {
+            if (p <= 0) { return -Infinity; }
+            if (p >= 1) { return Infinity; }
+            var a = [-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+                     1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00];
+            var b = [-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+                     6.680131188771972e+01, -1.328068155288572e+01];
+            var c = [-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+                     -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00];
+            var d = [7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00,
+                     3.754408661907416e+00];
+            var pLow = 0.02425;
+            var q, r, x;
+            if (p < pLow) {
+                q = Math.sqrt(-2 * Math.log(p));
+                x = (((((c[0] * q + c[1]) * q + c[2]) * q + c[3]) * q + c[4]) * q + c[5]) /
+                    ((((d[0] * q + d[1]) * q + d[2]) * q + d[3]) * q + 1);
+            } else if (p <= 1 - pLow) {
+                q = p - 0.5;
+                r = q * q;
+                x = (((((a[0] * r + a[1]) * r + a[2]) * r + a[3]) * r + a[4]) * r + a[5]) * q /
+                    (((((b[0] * r + b[1]) * r + b[2]) * r + b[3]) * r + b[4]) * r + 1);
+            } else {
+                q = Math.sqrt(-2 * Math.log(1 - p));
+                x = -(((((c[0] * q + c[1]) * q + c[2]) * q + c[3]) * q + c[4]) * q + c[5]) /
+                    ((((d[0] * q + d[1]) * q + d[2]) * q + d[3]) * q + 1);
+            }
+            var err = window.dash_clientside.stats.normCdf(x) - p;
+            var u = err * Math.sqrt(2 * Math.PI) * Math.exp(x * x / 2);
+            return x - u / (1 + x * u / 2);
+        },
+
+        // Same as statsmodels' proportions_ztest for two samples with the
+        // default pooled variance; alternative is 'two-sided' or 'larger'
+        proportionsZtest: function (count, nobs, alternative) {
+            var p = (count[0] + count[1]) / (nobs[0] + nobs[1]);
+            var diff = count[0] / nobs[0] - count[1] / nobs[1];
+            var z = diff / Math.sqrt(p * (1 - p) * (1 / nobs[0] + 1 / nobs[1]));
+            var pval = alternative === 'larger' ?
+                window.dash_clientside.stats.normSf(z) :
+                2 * window.dash_clientside.stats.normSf(Math.abs(z));
+            return [z, pval];
+        },
+
+        // power_analysis.power_table for a single alpha/power pair
+        powerTable: function (mean, variance, traffic, nVariants, mde, population, alpha, power) {
+            var stats = window.dash_clientside.stats;
+            var z = stats.normPpf(1 - alpha / 2) + stats.normPpf(power);
+            var sampleSize = new Array(mde.length);
+            var duration = new Array(mde.length);
+            for (var i = 0; i < mde.length; i++) {
+                var effect = mde[i] * mean / 100;
+                var n = 2 * z * z * variance / (effect * effect);
+                var days = nVariants * n / traffic;
+                sampleSize[i] = isFinite(n) ? Math.floor(n) : null;
+                duration[i] = isFinite(days) ? population * Math.floor(days) : null;
+            }
+            return {mde: mde, sample_size: sampleSize, duration: duration};
+        },
+
+        mdeGrid: function (start, stop, step) {
+            var n = Math.max(Math.round((stop - start) / step) + 1, 1);
+            var grid = new Array(n);
+            for (var i = 0; i < n; i++) {
+                grid[i] = Math.round((start + step * i) * 1e10) / 1e10;
+            }
+            return grid;
+        }
+    },
+
+    calculators: {
+        update_calculation: function (usersA, usersB, conversionsA, conversionsB, hypothesis, config) {
+            var h = function (type, props, namespace) {
+                return {type: type, namespace: namespace || 'dash_html_components', props: props};
+            };
+            var card = function (children, width) {
+                return h('Col', {
+                    width: width,
+                    children: h('Card', {
+                        className: 'h-100',
+                        children: [h('CardBody', {children: children}, 'dash_bootstrap_components')]
+                    }, 'dash_bootstrap_components')
+                }, 'dash_bootstrap_components');
+            };
+
+            var rateA = conversionsA / usersA;
+            var rateB = conversionsB / usersB;
+            var percentageDifference = ((rateB - rateA) / rateA) * 100;
+            var alternative = hypothesis === 'Two-sided' ? 'two-sided' : 'larger';
+            // B against A, as ab_testing.pairwise_proportions_ztest does
+            var pval = window.dash_clientside.stats.proportionsZtest(
+                [conversionsB, conversionsA], [usersB, usersA], alternative)[1];
+
+            var className = percentageDifference > 0 ? 'text-success' : 'text-danger';
+            var conclusion = percentageDifference > 0 ? 'better' : 'worse';
+            var condition = pval < 0.05 ? 'can' : 'cannot';
+
+            return [
+                h('Row', {children: [
+                    card([
+                        h('H5', {children: 'Variant A Conversions', className: 'card-title'}),
+                        h('H2', {children: String(rateA) + '%', className: 'card-text'})
+                    ], 6),
+                    card([
+                        h('H5', {children: 'Variant B Conversions', className: 'card-title'}),
+                        h('H2', {children: String(rateB) + '%', className: 'card-text'}),
+                        h('P', {
+                            children: 'Compared to variant A: ' + percentageDifference.toFixed(1) + '%',
+                            className: className
+                        })
+                    ], 6)
+                ]}, 'dash_bootstrap_components'),
+                h('Br', {}),
+                h('Row', {className: 'g-4', children: [
+                    card([
+                        h('H5', {children: 'p value', className: 'card-title'}),
+                        h('H2', {children: pval.toFixed(4), className: 'card-text'}),
+                        h('P', {children: 'We ' + condition + ' conclude that the variant B is ' +
+                                          conclusion + ' than variant A'})
+                    ], 12)
+                ]}, 'dash_bootstrap_components')
+            ];
+        },
+
+        update_chart: function (mean, variance, traffic, nVariants, mdeRange, significance,
+                                power, percentagePopulation, config) {
+            var template = config.template;
+            var empty = {data: [], layout: {template: template}};
+            if ([mean, variance, traffic, nVariants].some(function (v) { return v === null || v === undefined; }) ||
+                    !mdeRange || !mdeRange.length) {
+                return [empty, empty];
+            }
+            var stats = window.dash_clientside.stats;
+            var result = stats.powerTable(
+                mean, variance, traffic, nVariants,
+                stats.mdeGrid(mdeRange[0], mdeRange[1], config.mde_step),
+                percentagePopulation / 100, 1 - significance / 100, power / 100);
+            var mode = result.mde.length <= 101 ? 'lines+markers' : 'lines';
+            // Fonts and title placement come from the template (chart_template.py)
+            var figure = function (y, title, yTitle) {
+                return {
+                    data: [{type: 'scatter', x: result.mde, y: y, mode: mode}],
+                    layout: {
+                        template: template,
+                        title: {text: title},
+                        xaxis: {title: {text: 'MDE (%)'}},
+                        yaxis: {title: {text: yTitle}}
+                    }
+                };
+            };
+            return [
+                figure(result.duration, 'Required Experiment Duration', 'Duration in Days'),
+                figure(result.sample_size, 'Required Sample Size', 'Number of Sample Size')
+            ];
+        }
+    }
+});
@@ -0,0 +1,46 @@
+"""Plotly template and partial updates for the power calculator charts.
+
+The fonts and title placement of the charts live in a registered template
+(``ssa``) and the titles in the static figures the page layout is built
+with, so they reach the browser once per page load. ``update_chart`` then
+returns a ``Patch`` that replaces only the trace's ``x``, ``y`` and
+``mode``.
+"""
+import plotly.graph_objs as go
+import plotly.io as pio
+
+TEMPLATE = 'ssa'
+TITLE_FONT = dict(family='Verdana', size=16, color='black')
+AXIS_FONT = dict(family='Verdana', size=12, color='black')
+
+
+def template_name():
+    """Name of the default template combined with ``ssa``, registering it on first use."""
+    if TEMPLATE not in pio.templates:
+        pio.templates[TEMPLATE] = go.layout.Template(layout={
+            'title': {'y': 0.9, 'x': 0.5, 'xanchor': 'center', 'yanchor': 'top', 'font': TITLE_FONT},
+            'xaxis': {'title': {'font': AXIS_FONT}},
+            'yaxis': {'title': {'font': AXIS_FONT}},
+        })
+    return '{}+{}'.format(pio.templates.default, TEMPLATE)
+
+
+def curve_figure(title, y_title, x_title='MDE (%)'):
+    """Line chart with one empty trace, filled in later by ``curve_patch``."""
+    return go.Figure(go.Scatter(x=[], y=[], mode='lines'), layout={
+        'template': template_name(),
+        'title': {'text': title},
+        'xaxis': {'title': {'text': x_title}},
+        'yaxis': {'title': {'text': y_title}},
+    })
+
+
+def curve_patch(x, y, mode='lines'):
+    """Update for a ``curve_figure`` that sends only the trace data."""
+    from dash import Patch
+
+    patch = Patch()
+    patch['data'][0]['x'] = x
+    patch['data'][0]['y'] = y
+    patch['data'][0]['mode'] = mode
+    return patch
@@ -0,0 +1,9 @@
+"""Settings shared by the app and the page layouts."""
+import os
+
+# Resolution of the MDE grid in the power calculator, in percentage points
+MDE_STEP = 0.01
+
+# Run the A/B and power calculators in the browser (assets/clientside.js)
+# instead of on the server
+CLIENTSIDE_CALCULATORS = os.environ.get('SSA_CLIENTSIDE_CALCULATORS', '').lower() in ('1', 'true', 'yes')
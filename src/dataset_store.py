@@ -0,0 +1,242 @@
+"""Server-side store for uploaded datasets.
+
+Uploads are written once as Parquet files under a shared directory so that
+any gunicorn worker can reopen them by ID, and each worker keeps a small
+in-memory LRU of recently used frames on top of that.
+
+``state_store`` holds the running state of the streaming APIs (sequential
+monitors, online anomaly detectors) in its own directory. Unlike datasets,
+that state cannot be recomputed, so it is never evicted.
+"""
+import contextlib
+import fcntl
+import json
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+
+DATA_FILE = 'data.parquet'
+META_FILE = 'meta.json'
+
+
+def _frame_nbytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class DatasetStore:
+    def __init__(self, root=None, memory_budget_mb=256, disk_budget_mb=2048):
+        self.root = root or os.path.join(tempfile.gettempdir(), 'ssa_tool_datasets')
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        # None keeps everything on disk
+        self.disk_budget = None if disk_budget_mb is None else int(disk_budget_mb * 1024 * 1024)
+        os.makedirs(self.root, exist_ok=True)
+
+        self._frames = OrderedDict()
+        self._memory_used = 0
+        self._lock = threading.RLock()
+
+    # paths
+
+    def _dir(self, dataset_id):
+        # IDs come back from the browser, so never let them escape the root
+        if not dataset_id or dataset_id in ('.', '..') or os.path.basename(dataset_id) != dataset_id:
+            raise KeyError(dataset_id)
+        return os.path.join(self.root, dataset_id)
+
+    def path(self, dataset_id, name=DATA_FILE):
+        return os.path.join(self._dir(dataset_id), name)
+
+    def exists(self, dataset_id):
+        try:
+            return os.path.exists(self.path(dataset_id))
+        except KeyError:
+            return False
+
+    # read / write
+
+    def put(self, df, dataset_id=None, meta=None):
+        dataset_id = dataset_id or uuid.uuid4().hex
+        directory = self._dir(dataset_id)
+        tmp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=self.root)
+        try:
+            df.to_parquet(os.path.join(tmp_dir, DATA_FILE), index=False)
+            with open(os.path.join(tmp_dir, META_FILE), 'w') as f:
+                json.dump(meta or {}, f, default=str)
+            # Publish atomically so other workers never see a half-written file
+            shutil.rmtree(directory, ignore_errors=True)
+            os.replace(tmp_dir, directory)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        self._remember(dataset_id, df)
+        self._enforce_disk_budget(keep=dataset_id)
+        return dataset_id
+
+    def get(self, dataset_id, columns=None, fresh=False):
+        """Return the stored frame, or None if the ID is unknown or evicted.
+
+        ``fresh=True`` skips the in-memory copy and rereads the file.
+        """
+        with self._lock:
+            df = None if fresh else self._frames.get(dataset_id)
+            if df is not None:
+                self._frames.move_to_end(dataset_id)
+        if df is None:
+            if not self.exists(dataset_id):
+                return None
+            import pandas as pd
+            df = pd.read_parquet(self.path(dataset_id), memory_map=True)
+            self._remember(dataset_id, df)
+        self.touch(dataset_id)
+        if columns is not None:
+            return df[list(columns)]
+        return df
+
+    def get_meta(self, dataset_id):
+        try:
+            with open(self.path(dataset_id, META_FILE)) as f:
+                return json.load(f)
+        except (KeyError, OSError, ValueError):
+            return {}
+
+    def update_meta(self, dataset_id, **values):
+        meta = self.get_meta(dataset_id)
+        meta.update(values)
+        tmp_path = self.path(dataset_id, META_FILE + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f, default=str)
+        os.replace(tmp_path, self.path(dataset_id, META_FILE))
+        return meta
+
+    def _lock_path(self, dataset_id):
+        self._dir(dataset_id)
+        return os.path.join(self.root, '.lock-' + dataset_id)
+
+    @contextlib.contextmanager
+    def lock(self, dataset_id):
+        """Exclusive lock across workers, for read-modify-write of a dataset.
+
+        Frames that change after being stored must then be read with
+        ``fresh=True``, since other workers' in-memory copies go stale.
+        """
+        path = self._lock_path(dataset_id)
+        while True:
+            with open(path, 'a') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    # delete() may have unlinked the file while we waited;
+                    # then lock the one now at the path instead
+                    if os.path.exists(path) and os.path.samestat(os.fstat(f.fileno()), os.stat(path)):
+                        yield
+                        return
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def touch(self, dataset_id):
+        try:
+            os.utime(self._dir(dataset_id))
+        except (KeyError, OSError):
+            pass
+
+    def delete(self, dataset_id):
+        with self._lock:
+            df = self._frames.pop(dataset_id, None)
+            if df is not None:
+                self._memory_used -= _frame_nbytes(df)
+        try:
+            shutil.rmtree(self._dir(dataset_id), ignore_errors=True)
+            self._remove_lock(self._lock_path(dataset_id))
+        except KeyError:
+            pass
+
+    def _remove_lock(self, path):
+        # Only when nobody holds or waits for it; a busy lock file is left
+        # for its holder
+        try:
+            f = open(path)
+        except OSError:
+            return
+        with f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return
+            try:
+                if os.path.exists(path) and os.path.samestat(os.fstat(f.fileno()), os.stat(path)):
+                    os.remove(path)
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    # eviction
+
+    def _remember(self, dataset_id, df):
+        nbytes = _frame_nbytes(df)
+        with self._lock:
+            old = self._frames.pop(dataset_id, None)
+            if old is not None:
+                self._memory_used -= _frame_nbytes(old)
+            if nbytes > self.memory_budget:
+                # Too big to cache; callers still get the frame, later reads go to disk
+                return
+            self._frames[dataset_id] = df
+            self._memory_used += nbytes
+            while self._memory_used > self.memory_budget and len(self._frames) > 1:
+                _, evicted = self._frames.popitem(last=False)
+                self._memory_used -= _frame_nbytes(evicted)
+
+    def _disk_usage(self):
+        entries = []
+        for name in os.listdir(self.root):
+            directory = os.path.join(self.root, name)
+            if name.startswith('.') or not os.path.isdir(directory):
+                continue
+            # Other workers may delete or evict a directory while it is scanned
+            try:
+                size = 0
+                for file_name in os.listdir(directory):
+                    try:
+                        size += os.path.getsize(os.path.join(directory, file_name))
+                    except OSError:
+                        pass
+                entries.append((os.path.getmtime(directory), name, size))
+            except FileNotFoundError:
+                continue
+        return entries
+
+    def _enforce_disk_budget(self, keep=None):
+        if self.disk_budget is None:
+            return
+        entries = sorted(self._disk_usage())
+        total = sum(size for _, _, size in entries)
+        for _, name, size in entries:
+            if total <= self.disk_budget:
+                break
+            if name == keep:
+                continue
+            self.delete(name)
+            total -= size
+
+    def stats(self):
+        with self._lock:
+            return {
+                'memory_items': len(self._frames),
+                'memory_bytes': self._memory_used,
+                'memory_budget': self.memory_budget,
+                'disk_budget': self.disk_budget,
+            }
+
+
+store = DatasetStore(
+    root=os.environ.get('SSA_DATA_DIR'),
+    memory_budget_mb=float(os.environ.get('SSA_STORE_MEMORY_MB', 256)),
+    disk_budget_mb=float(os.environ.get('SSA_STORE_DISK_MB', 2048)),
+)
+state_store = DatasetStore(
+    root=os.environ.get('SSA_STATE_DIR') or os.path.join(tempfile.gettempdir(), 'ssa_tool_state'),
+    memory_budget_mb=float(os.environ.get('SSA_STATE_MEMORY_MB', 64)),
+    disk_budget_mb=None,
+)
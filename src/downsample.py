@@ -0,0 +1,195 @@
+"""Downsampled line and scatter plots of large columns.
+
+A chart gets at most ``MAX_POINTS`` points per trace, picked with
+Largest-Triangle-Three-Buckets (LTTB), which keeps the visual shape of the
+line. LTTB runs on a min/max preselection of the range (MinMax-LTTB) so
+its cost does not grow with the rows behind the chart.
+
+To answer zoomed-in views without rescanning the data, each plotted column
+gets a pyramid stored next to the dataset (``pyramid-*.parquet``). Level
+``k`` keeps the min and max of every ``PYRAMID_FACTOR ** k / 2`` rows
+of each series, down to about ``MAX_POINTS`` rows per series. ``points``
+reads the coarsest level that still has ``OVERSAMPLE`` times the wanted
+points in the visible range, or the dataset itself (level 0) once zoomed in
+that far.
+"""
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+MAX_POINTS = 2000
+PYRAMID_FACTOR = 4
+# Points read per point drawn; enough for LTTB to choose from
+OVERSAMPLE = 4
+ROW_COLUMN = 'row'
+
+
+def _numeric(x):
+    x = np.asarray(x)
+    return x.astype('int64').astype(float) if np.issubdtype(x.dtype, np.datetime64) else x.astype(float)
+
+
+def minmax(y, buckets):
+    """Sorted indices of the minimum and maximum of ``y`` in each of ``buckets`` equal runs of rows."""
+    n = len(y)
+    if n <= 2 * buckets:
+        return np.arange(n)
+    size = -(-n // buckets)
+    buckets = -(-n // size)
+    padded = np.empty(buckets * size)
+    padded[:n] = y
+    padded[n:] = np.inf
+    lo = padded.reshape(buckets, size).argmin(axis=1)
+    padded[n:] = -np.inf
+    hi = padded.reshape(buckets, size).argmax(axis=1)
+    offsets = np.arange(buckets) * size
+    return np.unique(np.concatenate([lo + offsets, hi + offsets]))
+
+
+def lttb(x, y, n_out):
+    """Indices of the ``n_out`` points of ``(x, y)`` chosen by Largest-Triangle-Three-Buckets."""
+    n = len(x)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    x, y = _numeric(x), np.asarray(y, dtype=float)
+    # The first and last points are kept; the rest is split into n_out - 2 buckets
+    edges = (np.arange(n_out - 1) * (n - 2) / (n_out - 2)).astype(int) + 1
+    edges[-1] = n - 1
+    means_x = np.add.reduceat(x[1:-1], edges[:-1] - 1) / np.diff(edges)
+    means_y = np.add.reduceat(y[1:-1], edges[:-1] - 1) / np.diff(edges)
+    means_x = np.append(means_x[1:], x[-1])
+    means_y = np.append(means_y[1:], y[-1])
+
+    picked = np.empty(n_out, dtype=int)
+    picked[0], picked[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Twice the area of the triangle (point a, candidate, next bucket's mean)
+        area = np.abs((x[a] - means_x[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (means_y[i] - y[a]))
+        a = lo + int(area.argmax())
+        picked[i + 1] = a
+    return picked
+
+
+def downsample(x, y, n_out=MAX_POINTS):
+    """Indices of at most ``n_out`` points of ``(x, y)`` that draw like all of them."""
+    if len(x) <= n_out:
+        return np.arange(len(x))
+    keep = minmax(np.asarray(y, dtype=float), OVERSAMPLE * n_out // 2)
+    return keep[lttb(np.asarray(x)[keep], np.asarray(y)[keep], n_out)]
+
+
+def build_pyramid(df, x, y, series=None, factor=PYRAMID_FACTOR, min_points=MAX_POINTS):
+    """Levels 1, 2, ... of min/max rows of ``df`` (all columns), with a ``level`` column.
+
+    ``df`` must be sorted by ``series`` and ``x``, without missing ``y``.
+    """
+    groups = df.groupby(series, sort=False) if series else [(None, df)]
+    levels = []
+    for _, rows in groups:
+        values = rows[y].to_numpy(dtype=float)
+        keep = np.arange(len(rows))
+        level = 0
+        while len(keep) > min_points:
+            keep = keep[minmax(values[keep], -(-len(keep) // (2 * factor)))]
+            level += 1
+            levels.append(rows.iloc[keep].assign(level=level))
+    if not levels:
+        return df.iloc[:0].assign(level=pd.Series(dtype=int))
+    return pd.concat(levels, ignore_index=True)
+
+
+def pyramid_name(y, x=None, series=None, extra=()):
+    key = '\0'.join(str(c) for c in (y, x, series, *extra))
+    return 'pyramid-{}.parquet'.format(hashlib.sha1(key.encode()).hexdigest()[:16])
+
+
+def _source(dataset_id, y, x, series, extra=(), series_value=None):
+    """The dataset's rows to plot, sorted by series and x (the row number without ``x``).
+
+    With ``series_value``, only that series' rows.
+    """
+    from dataset_store import store
+
+    columns = [c for c in dict.fromkeys((series, x, y, *extra)) if c]
+    df = store.get(dataset_id, columns=columns)
+    if x is None:
+        df = df.assign(**{ROW_COLUMN: np.arange(len(df))})
+    if series_value is not None:
+        df = df[df[series] == series_value]
+    if x is not None:
+        df = df.sort_values([series, x] if series else x, kind='mergesort')
+    return df[df[y].notna()]
+
+
+def ensure_pyramid(dataset_id, y, x=None, series=None, extra=()):
+    """Path of the pyramid of ``y`` over ``x``, building it on first use.
+
+    ``extra`` columns are kept alongside, at the rows picked for ``y``.
+    """
+    from dataset_store import store
+
+    path = store.path(dataset_id, pyramid_name(y, x, series, extra))
+    if not os.path.exists(path):
+        with store.lock(dataset_id):
+            if not os.path.exists(path):
+                pyramid = build_pyramid(_source(dataset_id, y, x, series, extra), x or ROW_COLUMN, y, series)
+                pyramid.to_parquet(path + '.tmp', index=False)
+                os.replace(path + '.tmp', path)
+    return path
+
+
+def _in_range(df, x, x_range):
+    if x_range is None:
+        return df
+    lo, hi = (pd.Timestamp(v) if np.issubdtype(df[x].dtype, np.datetime64) else float(v) for v in x_range)
+    return df[(df[x] >= lo) & (df[x] <= hi)]
+
+
+def points(dataset_id, y, x=None, series=None, series_value=None, x_range=None, extra=(),
+           max_points=MAX_POINTS):
+    """At most ``max_points`` rows of ``series_value``'s ``(x, y)`` within ``x_range``, sorted by ``x``.
+
+    Without ``x`` the row number (column ``row``) is used. ``x_range`` is a
+    ``(low, high)`` pair as in a Plotly axis range, or None for everything.
+    ``extra`` columns come along with the rows picked for ``y``.
+    """
+    path = ensure_pyramid(dataset_id, y, x, series, extra)
+    x = x or ROW_COLUMN
+    filters = [(series, '==', series_value)] if series else []
+    pyramid = pd.read_parquet(path, filters=filters or None)
+
+    # The coarsest level with enough points in range, counted from the
+    # coarsest level of all (level 0 is the data itself)
+    levels = pyramid['level'].max() if len(pyramid) else 0
+    found = pd.DataFrame()
+    if levels:
+        top = len(_in_range(pyramid[pyramid['level'] == levels], x, x_range))
+        wanted = OVERSAMPLE * max_points
+        level = int(levels - np.ceil(np.log(max(wanted / max(top, 1), 1)) / np.log(PYRAMID_FACTOR)))
+        if level >= 1:
+            found = _in_range(pyramid[pyramid['level'] == level], x, x_range)
+    if len(found) < max_points:
+        source = _source(dataset_id, y, None if x == ROW_COLUMN else x, series, extra, series_value)
+        found = _in_range(source, x, x_range)
+    found = found.drop(columns='level', errors='ignore')
+    return found.iloc[downsample(found[x].to_numpy(), found[y].to_numpy(), max_points)]
+
+
+def zoom_range(relayout_data):
+    """``(changed, x_range)`` from a graph's ``relayoutData``.
+
+    ``changed`` is False for events that leave the x axis alone (the
+    initial autosize, y-only zooms); ``x_range`` is None after a reset.
+    """
+    relayout_data = relayout_data or {}
+    if 'xaxis.range[0]' in relayout_data:
+        return True, (relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]'])
+    if 'xaxis.range' in relayout_data:
+        return True, tuple(relayout_data['xaxis.range'])
+    if relayout_data.get('xaxis.autorange'):
+        return True, None
+    return False, None
@@ -0,0 +1,419 @@
+"""Streaming ingestion of uploaded CSV/Excel files.
+
+The upload is base64-decoded in slices straight into a temp file and the CSV
+is parsed in chunks, so we never hold the decoded bytes, a decoded string and
+a StringIO copy at the same time. Numeric columns are downcast chunk by chunk
+and low-cardinality text columns become categoricals, which keeps peak memory
+close to the size of the final frame.
+
+``ingest_uploads`` takes several files at once and parses every CSV and every
+sheet of every workbook in a process pool, each into its own dataset. Those
+datasets are stored under IDs derived from the file's SHA-256, which is
+computed in the same pass that decodes the bytes into the temp file.
+Uploading the same file again (in any session, under any name) finds the
+typed Parquet datasets and their column stats in the store and reuses them
+without parsing; they age out with the store's disk budget
+(``SSA_STORE_DISK_MB``, least recently used first).
+"""
+import base64
+import hashlib
+import importlib.util
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Multiple of 4 so every slice is a self-contained piece of base64
+DECODE_CHUNK_CHARS = 4 * 1024 * 1024
+CSV_CHUNK_ROWS = 100_000
+SAMPLE_ROWS = 10_000
+# Text columns whose sample has at most this share of distinct values are
+# stored as categoricals
+CATEGORY_RATIO = 0.5
+FINGERPRINT_BLOCK_BYTES = 1024 * 1024
+
+# calamine (Rust) reads workbooks several times faster than openpyxl
+EXCEL_ENGINE = 'calamine' if importlib.util.find_spec('python_calamine') else None
+
+UPLOAD_DIR = os.environ.get('SSA_UPLOAD_DIR') or os.path.join(tempfile.gettempdir(), 'ssa_tool_uploads')
+
+
+def decode_upload_to_file(contents, path, chunk_chars=DECODE_CHUNK_CHARS, digest=None):
+    """Decode a ``dcc.Upload`` data URL into ``path`` and return the byte count.
+
+    ``digest`` (a ``hashlib`` object) is updated with the decoded bytes.
+    """
+    start = contents.index(',') + 1
+    chunk_chars -= chunk_chars % 4
+    written = 0
+    with open(path, 'wb') as f:
+        for offset in range(start, len(contents), chunk_chars):
+            data = base64.b64decode(contents[offset:offset + chunk_chars])
+            f.write(data)
+            if digest is not None:
+                digest.update(data)
+            written += len(data)
+    return written
+
+
+def downcast_series(s):
+    """Return ``s`` in the smallest dtype that holds every value exactly."""
+    if pd.api.types.is_bool_dtype(s) or not pd.api.types.is_numeric_dtype(s):
+        return s
+    if pd.api.types.is_integer_dtype(s):
+        return pd.to_numeric(s, downcast='integer')
+    values = s.to_numpy()
+    if values.dtype == np.float64:
+        narrowed = values.astype(np.float32)
+        if np.array_equal(narrowed.astype(np.float64), values, equal_nan=True):
+            return pd.Series(narrowed, index=s.index, name=s.name)
+    return s
+
+
+def downcast_frame(df):
+    for col in df.columns:
+        df[col] = downcast_series(df[col])
+    return df
+
+
+def infer_dtypes(path, sample_rows=SAMPLE_ROWS, **read_kwargs):
+    """Pick per-column dtypes for the chunked reader from a sample of rows."""
+    sample = pd.read_csv(path, nrows=sample_rows, **read_kwargs)
+    dtypes = {}
+    for col in sample.columns:
+        s = sample[col]
+        if s.isna().all():
+            continue
+        if pd.api.types.is_float_dtype(s):
+            dtypes[col] = 'float64'
+        elif s.dtype == object:
+            if len(s) and s.nunique(dropna=True) <= CATEGORY_RATIO * len(s):
+                dtypes[col] = 'category'
+            else:
+                dtypes[col] = 'object'
+        # Integer and bool columns are left to the parser: a later chunk may
+        # contain blanks, which only the per-chunk inference can handle
+    return dtypes
+
+
+def _combine(pieces):
+    if all(isinstance(p.dtype, pd.CategoricalDtype) for p in pieces):
+        return pd.Series(union_categoricals(pieces), name=pieces[0].name)
+    if len(pieces) == 1:
+        return pieces[0].reset_index(drop=True)
+    return pd.concat(pieces, ignore_index=True, copy=False)
+
+
+def _read_chunks(path, dtypes, chunk_rows, **read_kwargs):
+    columns = None
+    pieces = {}
+    with pd.read_csv(path, dtype=dtypes, chunksize=chunk_rows, **read_kwargs) as reader:
+        for chunk in reader:
+            if columns is None:
+                columns = list(chunk.columns)
+                pieces = {col: [] for col in columns}
+            for col in columns:
+                pieces[col].append(downcast_series(chunk[col]))
+            del chunk
+    return columns, pieces
+
+
+def read_csv_chunked(path, chunk_rows=CSV_CHUNK_ROWS, sample_rows=SAMPLE_ROWS, **read_kwargs):
+    dtypes = infer_dtypes(path, sample_rows=sample_rows, **read_kwargs)
+    try:
+        columns, pieces = _read_chunks(path, dtypes, chunk_rows, **read_kwargs)
+    except (ValueError, TypeError):
+        # The sample was not representative (e.g. text further down a
+        # numeric-looking column); fall back to per-chunk inference
+        columns, pieces = _read_chunks(path, None, chunk_rows, **read_kwargs)
+
+    if columns is None:
+        return pd.read_csv(path, **read_kwargs)
+
+    # Assemble column by column and drop the pieces as we go, so at most one
+    # column is held twice
+    data = {}
+    for col in columns:
+        data[col] = downcast_series(_combine(pieces.pop(col)))
+    return pd.DataFrame(data, copy=False)
+
+
+def read_excel_file(path, **read_kwargs):
+    read_kwargs.setdefault('engine', EXCEL_ENGINE)
+    return downcast_frame(pd.read_excel(path, **read_kwargs))
+
+
+def excel_sheets(path):
+    if EXCEL_ENGINE == 'calamine':
+        from python_calamine import CalamineWorkbook
+
+        return list(CalamineWorkbook.from_path(path).sheet_names)
+    with pd.ExcelFile(path) as workbook:
+        return list(workbook.sheet_names)
+
+
+def read_upload_file(path, filename, **read_kwargs):
+    if 'csv' in filename:
+        return read_csv_chunked(path, **read_kwargs)
+    elif 'xls' in filename:
+        return read_excel_file(path, **read_kwargs)
+    raise ValueError('Unsupported file type: {}'.format(filename))
+
+
+def save_upload(contents, filename, digest=None):
+    """Decode a ``dcc.Upload`` payload into a file under ``UPLOAD_DIR``.
+
+    Returns ``(path, nbytes)``; the caller owns the file.
+    """
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=UPLOAD_DIR, suffix=os.path.splitext(filename)[1])
+    os.close(fd)
+    try:
+        nbytes = decode_upload_to_file(contents, path, digest=digest)
+    except Exception:
+        os.remove(path)
+        raise
+    return path, nbytes
+
+
+def ingest_upload(contents, filename):
+    """Parse a ``dcc.Upload`` payload; returns ``(df, info)``.
+
+    ``info`` has the decoded size and the time spent decoding and parsing.
+    """
+    started = time.perf_counter()
+    path, nbytes = save_upload(contents, filename)
+    try:
+        decoded = time.perf_counter()
+        df = read_upload_file(path, filename)
+        parsed = time.perf_counter()
+    finally:
+        os.remove(path)
+    info = {
+        'filename': filename,
+        'bytes': nbytes,
+        'rows': len(df),
+        'columns': df.shape[1],
+        'decode_seconds': decoded - started,
+        'parse_seconds': parsed - decoded,
+    }
+    return df, info
+
+
+def _parse_part(task):
+    """Parse one CSV or sheet into the dataset store, unless it is there already.
+
+    Runs in the pool; returns the dataset's info dict.
+    """
+    from dataset_store import store
+    from preview import column_stats
+
+    path, filename, sheet, dataset_id, info = task
+    # Held while parsing so the same file uploaded twice at once is parsed once
+    with store.lock(dataset_id):
+        meta = store.get_meta(dataset_id)
+        if store.exists(dataset_id) and 'column_stats' in meta:
+            if 'parts' not in meta:
+                meta = store.update_meta(dataset_id, parts=info['parts'])
+            return dict(meta, cached=True)
+        started = time.perf_counter()
+        df = read_upload_file(path, filename, **({'sheet_name': sheet} if sheet is not None else {}))
+        info = dict(info, rows=len(df), columns=df.shape[1], parse_seconds=time.perf_counter() - started,
+                    dataset_id=dataset_id)
+        store.put(df, dataset_id=dataset_id, meta=info)
+        # Kept with the dataset so the preview never recomputes them
+        meta = store.update_meta(dataset_id, column_stats=column_stats(df))
+    return dict(meta, cached=False)
+
+
+def fingerprint_file(path, block_bytes=FINGERPRINT_BLOCK_BYTES):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(block_bytes)
+            if not block:
+                break
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def part_id(content_hash, index):
+    """Dataset ID of the ``index``-th CSV or sheet of the file with ``content_hash``."""
+    return '{}-{}'.format(content_hash[:40], index)
+
+
+def cached_parts(content_hash):
+    """Info dicts of every dataset parsed from a file with ``content_hash``, or None.
+
+    None unless all of them are still in the store (a part may have been
+    evicted on its own). Reused datasets count as recently used.
+    """
+    from dataset_store import store
+
+    first = store.get_meta(part_id(content_hash, 0))
+    if 'column_stats' not in first or 'parts' not in first:
+        return None
+    parts = []
+    for i in range(first['parts']):
+        dataset_id = part_id(content_hash, i)
+        meta = store.get_meta(dataset_id) if i else first
+        if not store.exists(dataset_id) or 'column_stats' not in meta:
+            return None
+        store.touch(dataset_id)
+        parts.append(dict(meta, cached=True))
+    return parts
+
+
+def _parse_files(files, workers=None):
+    """Parse saved files ``(path, info)`` (``info`` has ``filename`` and
+    ``content_hash``) into one dataset per CSV or sheet; see ``ingest_uploads``."""
+    tasks = []
+    for path, info in files:
+        filename = info['filename']
+        if 'csv' in filename:
+            sheets = [None]
+        elif 'xls' in filename:
+            sheets = excel_sheets(path)
+        else:
+            raise ValueError('Unsupported file type: {}'.format(filename))
+        for i, sheet in enumerate(sheets):
+            tasks.append((path, filename, sheet, part_id(info['content_hash'], i),
+                          dict(info, sheet=sheet, parts=len(sheets))))
+
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1:
+        return [_parse_part(task) for task in tasks]
+    # Largest files first, so a big sheet does not start last
+    order = sorted(range(len(tasks)), key=lambda i: -tasks[i][4]['bytes'])
+    with ProcessPoolExecutor(workers) as pool:
+        parsed = dict(zip(order, pool.map(_parse_part, [tasks[i] for i in order])))
+    return [parsed[i] for i in range(len(tasks))]
+
+
+def ingest_uploads(contents, filenames, workers=None):
+    """Parse several ``dcc.Upload`` payloads, every sheet of a workbook separately.
+
+    Returns one info dict per CSV or sheet, in upload and sheet order, each
+    with the ``dataset_id`` it was stored under and ``cached=True`` when an
+    earlier upload of the same file was reused. Files are hashed while
+    they are decoded; known ones are not parsed again.
+    """
+    results = {}
+    files = []
+    try:
+        for i, (contents_i, filename) in enumerate(zip(contents, filenames)):
+            started = time.perf_counter()
+            digest = hashlib.sha256()
+            path, nbytes = save_upload(contents_i, filename, digest=digest)
+            cached = cached_parts(digest.hexdigest())
+            if cached is not None:
+                os.remove(path)
+                results[i] = [dict(info, filename=filename) for info in cached]
+                continue
+            files.append((i, path, {'filename': filename, 'bytes': nbytes, 'content_hash': digest.hexdigest(),
+                                    'decode_seconds': time.perf_counter() - started}))
+        parsed = iter(_parse_files([(path, info) for _, path, info in files], workers))
+        for i, _, info in files:
+            first = next(parsed)
+            parts = [first] + [next(parsed) for _ in range(first['parts'] - 1)]
+            results[i] = [dict(part, filename=info['filename']) for part in parts]
+        return [part for i in sorted(results) for part in results[i]]
+    finally:
+        for _, path, _ in files:
+            os.remove(path)
+
+
+def upload_path(name):
+    """Path of a file saved by ``save_upload``, from its base name."""
+    if not name or os.path.basename(name) != name:
+        raise KeyError(name)
+    return os.path.join(UPLOAD_DIR, name)
+
+
+def upload_columns(path, filename):
+    if 'csv' in filename:
+        return list(pd.read_csv(path, nrows=0).columns)
+    return list(pd.read_excel(path, nrows=0, engine=EXCEL_ENGINE).columns)
+
+
+def iter_upload_chunks(path, filename, usecols=None, chunk_rows=CSV_CHUNK_ROWS):
+    """Yield an uploaded file as frames of at most ``chunk_rows`` rows.
+
+    For consumers that only need one pass (e.g. streaming moments), so the
+    whole frame is never built. Excel files cannot be read incrementally and
+    come back as a single chunk.
+    """
+    if 'csv' in filename:
+        with pd.read_csv(path, usecols=usecols, chunksize=chunk_rows) as reader:
+            yield from reader
+    elif 'xls' in filename:
+        yield pd.read_excel(path, usecols=usecols, engine=EXCEL_ENGINE)
+    else:
+        raise ValueError('Unsupported file type: {}'.format(filename))
+
+
+def remove_stale_uploads(max_age_seconds=6 * 3600):
+    if not os.path.isdir(UPLOAD_DIR):
+        return
+    cutoff = time.time() - max_age_seconds
+    for name in os.listdir(UPLOAD_DIR):
+        path = os.path.join(UPLOAD_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+# Resumable chunked uploads: clients send raw bytes at an offset and can ask
+# how much has been received so far after a dropped connection.
+
+def _chunked_path(upload_id):
+    if not upload_id or os.path.basename(upload_id) != upload_id:
+        raise KeyError(upload_id)
+    return os.path.join(UPLOAD_DIR, upload_id + '.part')
+
+
+def received_bytes(upload_id):
+    path = _chunked_path(upload_id)
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def write_chunk(upload_id, offset, stream, buffer_size=1024 * 1024):
+    """Write ``stream`` at ``offset``; returns the total bytes received."""
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    path = _chunked_path(upload_id)
+    current = received_bytes(upload_id)
+    if offset > current:
+        raise ValueError('Chunk offset {} is past received size {}'.format(offset, current))
+    with open(path, 'r+b' if current else 'wb') as f:
+        f.seek(offset)
+        f.truncate()
+        while True:
+            data = stream.read(buffer_size)
+            if not data:
+                break
+            f.write(data)
+    return received_bytes(upload_id)
+
+
+def finish_chunked_upload(upload_id, filename):
+    """Parse a completed chunked upload like ``ingest_uploads`` parses one file."""
+    path = _chunked_path(upload_id)
+    if not os.path.exists(path):
+        raise KeyError(upload_id)
+    try:
+        started = time.perf_counter()
+        content_hash = fingerprint_file(path)
+        cached = cached_parts(content_hash)
+        if cached is not None:
+            return [dict(info, filename=filename) for info in cached]
+        info = {'filename': filename, 'bytes': os.path.getsize(path), 'content_hash': content_hash,
+                'decode_seconds': time.perf_counter() - started}
+        return _parse_files([(path, info)])
+    finally:
+        os.remove(path)
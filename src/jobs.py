@@ -0,0 +1,41 @@
+"""Background jobs for long-running callbacks.
+
+Callbacks registered with ``background=True`` are run by Dash's
+``DiskcacheManager``: the web worker starts the job in a separate process and
+returns at once, and the browser polls for progress and the result. Job
+state, progress and results live in a SQLite-backed ``diskcache`` directory
+(``SSA_JOBS_PATH``), so every gunicorn worker sees every job and a cancelled
+job's process is terminated.
+
+Jobs read their input from ``dataset_store`` by ID rather than receiving the
+data as callback arguments.
+"""
+import os
+import tempfile
+
+JOBS_PATH = os.environ.get('SSA_JOBS_PATH', os.path.join(tempfile.gettempdir(), 'ssa_jobs'))
+# Seconds a finished job's result is kept for the browser to collect
+RESULT_EXPIRE = int(os.environ.get('SSA_JOB_EXPIRE', 3600))
+
+
+def create_manager(path=JOBS_PATH, expire=RESULT_EXPIRE):
+    import diskcache
+    from dash import DiskcacheManager
+
+    return DiskcacheManager(diskcache.Cache(path), expire=expire)
+
+
+class Progress:
+    """Report ``step`` of ``total`` named stages through ``set_progress``.
+
+    The progress outputs of a job callback are ``(value, max, label)``.
+    """
+
+    def __init__(self, set_progress, total):
+        self.set_progress = set_progress
+        self.total = total
+        self.step = 0
+
+    def __call__(self, label):
+        self.set_progress((self.step, self.total, label))
+        self.step += 1
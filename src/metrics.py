@@ -0,0 +1,287 @@
+"""Callback instrumentation and a Prometheus ``/metrics`` endpoint.
+
+``instrument_app`` wraps every ``app.callback`` so that each call records its
+latency, the change in the process's resident memory and errors, and hooks
+the Dash dispatch route to record request and response payload sizes per
+callback. Samples are kept in SQLite (``SSA_METRICS_PATH``) so that all
+gunicorn workers and background job processes add to the same histograms;
+``/metrics`` renders them in the Prometheus text format together with the
+result cache and dataset store counters.
+
+Setting ``SSA_PROFILE_SLOW_SECONDS`` turns on a sampling profiler: every
+callback's thread is sampled every ``SSA_PROFILE_INTERVAL`` seconds and calls
+slower than the threshold leave a folded-stack file (the input of
+flamegraph.pl and speedscope) in ``SSA_PROFILE_DIR``.
+"""
+import collections
+import functools
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+BYTES_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9)
+MEMORY_BUCKETS = (0, 1e6, 1e7, 1e8, 1e9)
+
+# name: (type, help, buckets)
+METRICS = {
+    'ssa_callback_duration_seconds': ('histogram', 'Callback run time', LATENCY_BUCKETS),
+    'ssa_callback_rss_delta_bytes': ('histogram', 'Change in resident memory over a callback', MEMORY_BUCKETS),
+    'ssa_callback_errors_total': ('counter', 'Callbacks that raised or reported an error', None),
+    'ssa_callback_request_bytes': ('histogram', 'Size of the callback request body', BYTES_BUCKETS),
+    'ssa_callback_response_bytes': ('histogram', 'Size of the callback response body', BYTES_BUCKETS),
+    'ssa_upload_bytes': ('histogram', 'Decoded size of uploaded files', BYTES_BUCKETS),
+    'ssa_upload_parse_seconds': ('histogram', 'Time to decode and parse an upload', LATENCY_BUCKETS),
+    'ssa_slow_profiles_total': ('counter', 'Profiles written for slow callbacks', None),
+}
+
+DISPATCH_PATH = '_dash-update-component'
+
+# Profiling is off unless a slowness threshold is set
+PROFILE_SLOW_SECONDS = (float(os.environ['SSA_PROFILE_SLOW_SECONDS'])
+                        if os.environ.get('SSA_PROFILE_SLOW_SECONDS') else None)
+PROFILE_INTERVAL = float(os.environ.get('SSA_PROFILE_INTERVAL', 0.005))
+PROFILE_DIR = os.environ.get('SSA_PROFILE_DIR') or os.path.join(tempfile.gettempdir(), 'ssa_profiles')
+
+logger = logging.getLogger(__name__)
+
+
+def _labels(labels):
+    return ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+                    for k, v in sorted(labels.items()))
+
+
+def _series(name, labels, extra=''):
+    labels = ','.join(filter(None, (labels, extra)))
+    return '{}{{{}}}'.format(name, labels) if labels else name
+
+
+def _format(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _rss():
+    import psutil
+
+    return psutil.Process().memory_info().rss
+
+
+class Metrics:
+    def __init__(self, path=None, enabled=True):
+        self.path = path or os.path.join(tempfile.gettempdir(), 'ssa_metrics.sqlite3')
+        self.enabled = enabled
+        self._local = threading.local()
+        if enabled:
+            conn = self._connect()
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS samples ('
+                ' name TEXT, labels TEXT, key TEXT, value REAL, PRIMARY KEY (name, labels, key))')
+
+    def _connect(self):
+        # Per thread and per process: job processes are forked from the
+        # web worker and must not reuse its connection
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _add(self, rows):
+        if not self.enabled:
+            return
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute('BEGIN')
+                conn.executemany(
+                    'INSERT INTO samples (name, labels, key, value) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT(name, labels, key) DO UPDATE SET value = value + excluded.value', rows)
+        except sqlite3.Error:
+            # Metrics are diagnostics only; never fail the request
+            logger.warning('Could not record metrics', exc_info=True)
+
+    def inc(self, name, value=1, **labels):
+        self._add([(name, _labels(labels), 'total', value)])
+
+    def observe(self, name, value, **labels):
+        label_str = _labels(labels)
+        buckets = METRICS[name][2]
+        rows = [(name, label_str, 'sum', value), (name, label_str, 'count', 1)]
+        rows += [(name, label_str, _format(le), 1) for le in buckets if value <= le]
+        self._add(rows)
+
+    def clear(self):
+        self._connect().execute('DELETE FROM samples')
+
+    def render(self):
+        """All samples in the Prometheus text exposition format."""
+        samples = collections.defaultdict(lambda: collections.defaultdict(dict))
+        if self.enabled:
+            for name, labels, key, value in self._connect().execute(
+                    'SELECT name, labels, key, value FROM samples ORDER BY name, labels'):
+                samples[name][labels][key] = value
+
+        lines = []
+        for name, (kind, help_text, buckets) in METRICS.items():
+            lines += ['# HELP {} {}'.format(name, help_text), '# TYPE {} {}'.format(name, kind)]
+            for labels, values in samples[name].items():
+                if kind == 'counter':
+                    lines.append('{} {}'.format(_series(name, labels), _format(values['total'])))
+                    continue
+                for le in buckets:
+                    lines.append('{} {}'.format(_series(name + '_bucket', labels, 'le="{}"'.format(_format(le))),
+                                                _format(values.get(_format(le), 0))))
+                lines.append('{} {}'.format(_series(name + '_bucket', labels, 'le="+Inf"'), _format(values['count'])))
+                lines.append('{} {}'.format(_series(name + '_sum', labels), _format(values['sum'])))
+                lines.append('{} {}'.format(_series(name + '_count', labels), _format(values['count'])))
+        return '\n'.join(lines) + '\n'
+
+
+class SamplingProfiler:
+    """Folded stacks of one thread, sampled from a background thread."""
+
+    def __init__(self, thread_id=None, interval=0.005):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append('{} ({}:{})'.format(code.co_name, os.path.basename(code.co_filename),
+                                                 code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write('{} {}\n'.format(stack, count))
+
+
+def instrument(func, name=None):
+    """Record latency, memory delta and errors of every call of ``func``."""
+    name = name or func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not metrics.enabled:
+            return func(*args, **kwargs)
+        rss = _rss()
+        started = time.perf_counter()
+        profiler = SamplingProfiler(interval=PROFILE_INTERVAL) if PROFILE_SLOW_SECONDS is not None else None
+        try:
+            if profiler is None:
+                return func(*args, **kwargs)
+            with profiler:
+                return func(*args, **kwargs)
+        except Exception as e:
+            # Dash's PreventUpdate is control flow, not an error
+            if type(e).__name__ != 'PreventUpdate':
+                metrics.inc('ssa_callback_errors_total', callback=name)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.observe('ssa_callback_duration_seconds', elapsed, callback=name)
+            metrics.observe('ssa_callback_rss_delta_bytes', _rss() - rss, callback=name)
+            if profiler is not None and elapsed >= PROFILE_SLOW_SECONDS:
+                os.makedirs(PROFILE_DIR, exist_ok=True)
+                profiler.write(os.path.join(PROFILE_DIR, '{}-{}-{}.folded'.format(
+                    name, time.strftime('%Y%m%d-%H%M%S'), os.getpid())))
+                metrics.inc('ssa_slow_profiles_total', callback=name)
+
+    return wrapper
+
+
+def callback_error(name, error):
+    """Log an error that callback ``name`` handled itself and count it in
+    ``ssa_callback_errors_total`` like one it raised."""
+    logger.warning('Callback %s failed: %s', name, error, exc_info=error)
+    metrics.inc('ssa_callback_errors_total', callback=name)
+
+
+def observe_upload(info):
+    """Record the size and parse time from an ``ingestion`` info dict."""
+    metrics.observe('ssa_upload_bytes', info['bytes'])
+    metrics.observe('ssa_upload_parse_seconds', info['decode_seconds'] + info['parse_seconds'])
+
+
+def _store_metrics():
+    from dataset_store import store
+    from result_cache import cache
+
+    lines = []
+    stats = cache.stats()
+    for counter in ('hits', 'misses'):
+        name = 'ssa_result_cache_{}_total'.format(counter)
+        lines += ['# HELP {} Result cache {}'.format(name, counter), '# TYPE {} counter'.format(name)]
+        lines += ['{} {}'.format(_series(name, _labels({'callback': callback})), values[counter])
+                  for callback, values in sorted(stats['callbacks'].items())]
+    lines += ['# HELP ssa_result_cache_entries Entries in the result cache',
+              '# TYPE ssa_result_cache_entries gauge',
+              'ssa_result_cache_entries {}'.format(stats['entries'])]
+    stats = store.stats()
+    lines += ['# HELP ssa_dataset_store_memory_bytes Bytes of datasets held in this worker',
+              '# TYPE ssa_dataset_store_memory_bytes gauge',
+              'ssa_dataset_store_memory_bytes {}'.format(stats['memory_bytes'])]
+    return '\n'.join(lines) + '\n'
+
+
+def instrument_app(app):
+    """Instrument every callback registered on ``app`` from now on and serve ``/metrics``."""
+    import flask
+
+    register = app.callback
+
+    @functools.wraps(register)
+    def callback(*args, **kwargs):
+        decorator = register(*args, **kwargs)
+        return lambda func: decorator(instrument(func))
+
+    app.callback = callback
+    server = app.server
+
+    @server.after_request
+    def record_payload(response):
+        if metrics.enabled and flask.request.path.endswith(DISPATCH_PATH):
+            body = flask.request.get_json(silent=True) or {}
+            entry = app.callback_map.get(body.get('output'), {})
+            name = getattr(entry.get('callback'), '__name__', 'unknown')
+            metrics.observe('ssa_callback_request_bytes', flask.request.content_length or 0, callback=name)
+            if not response.is_streamed:
+                metrics.observe('ssa_callback_response_bytes', response.calculate_content_length() or 0,
+                                callback=name)
+        return response
+
+    @server.route('/metrics')
+    def metrics_endpoint():
+        return flask.Response(metrics.render() + _store_metrics(),
+                              mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+    return app
+
+
+metrics = Metrics(
+    path=os.environ.get('SSA_METRICS_PATH'),
+    enabled=os.environ.get('SSA_METRICS', '1').lower() not in ('0', 'false', 'no'),
+)
@@ -0,0 +1,116 @@
+"""Streaming per-group moments for raw per-user uploads.
+
+``GroupMoments`` keeps the count, means, sums of squared deviations and the
+co-moment of a metric ``y`` and an optional covariate ``x`` for every group.
+Each chunk is summarized with ``np.bincount`` and folded into the running
+totals with the parallel (Chan et al.) update, so a file of any size is
+processed in one pass with memory proportional to the number of groups.
+"""
+import numpy as np
+import pandas as pd
+
+COLUMNS = ['n', 'mean_y', 'm2_y', 'mean_x', 'm2_x', 'c_xy']
+
+
+def _merge(a, b):
+    """Combine two moment frames indexed by group."""
+    index = a.index.union(b.index)
+    a = a.reindex(index, fill_value=0.0)
+    b = b.reindex(index, fill_value=0.0)
+    n = a['n'] + b['n']
+    safe_n = n.where(n > 0, 1)
+    dy = b['mean_y'] - a['mean_y']
+    dx = b['mean_x'] - a['mean_x']
+    w = a['n'] * b['n'] / safe_n
+    return pd.DataFrame({
+        'n': n,
+        'mean_y': a['mean_y'] + dy * b['n'] / safe_n,
+        'm2_y': a['m2_y'] + b['m2_y'] + dy * dy * w,
+        'mean_x': a['mean_x'] + dx * b['n'] / safe_n,
+        'm2_x': a['m2_x'] + b['m2_x'] + dx * dx * w,
+        'c_xy': a['c_xy'] + b['c_xy'] + dx * dy * w,
+    }, index=index)
+
+
+def chunk_moments(groups, y, x=None):
+    """Moments of one chunk, one row per group."""
+    y = np.asarray(y, dtype=float)
+    x = np.zeros_like(y) if x is None else np.asarray(x, dtype=float)
+    keep = ~(np.isnan(y) | np.isnan(x))
+    codes, labels = pd.factorize(np.asarray(groups)[keep])
+    y, x = y[keep], x[keep]
+    k = len(labels)
+
+    n = np.bincount(codes, minlength=k).astype(float)
+    mean_y = np.bincount(codes, weights=y, minlength=k) / np.maximum(n, 1)
+    mean_x = np.bincount(codes, weights=x, minlength=k) / np.maximum(n, 1)
+    dy = y - mean_y[codes]
+    dx = x - mean_x[codes]
+    return pd.DataFrame({
+        'n': n,
+        'mean_y': mean_y,
+        'm2_y': np.bincount(codes, weights=dy * dy, minlength=k),
+        'mean_x': mean_x,
+        'm2_x': np.bincount(codes, weights=dx * dx, minlength=k),
+        'c_xy': np.bincount(codes, weights=dx * dy, minlength=k),
+    }, index=pd.Index(labels, name='group'))
+
+
+class GroupMoments:
+    def __init__(self):
+        self.moments = pd.DataFrame(columns=COLUMNS, dtype=float)
+
+    def update(self, groups, y, x=None):
+        self.moments = _merge(self.moments, chunk_moments(groups, y, x))
+        return self
+
+    def merge(self, other):
+        self.moments = _merge(self.moments, other.moments)
+        return self
+
+    def total(self):
+        """Moments of all groups pooled together, as a Series."""
+        m = self.moments
+        n = m['n'].sum()
+        mean_y = (m['n'] * m['mean_y']).sum() / n if n else 0.0
+        mean_x = (m['n'] * m['mean_x']).sum() / n if n else 0.0
+        dy = m['mean_y'] - mean_y
+        dx = m['mean_x'] - mean_x
+        return pd.Series({
+            'n': n,
+            'mean_y': mean_y,
+            'm2_y': m['m2_y'].sum() + (m['n'] * dy * dy).sum(),
+            'mean_x': mean_x,
+            'm2_x': m['m2_x'].sum() + (m['n'] * dx * dx).sum(),
+            'c_xy': m['c_xy'].sum() + (m['n'] * dx * dy).sum(),
+        })
+
+    def summary(self):
+        """Per-group n, mean, variance and covariate statistics (ddof=1)."""
+        m = self.moments
+        dof = (m['n'] - 1).where(m['n'] > 1)
+        return pd.DataFrame({
+            'n': m['n'],
+            'mean': m['mean_y'],
+            'var': m['m2_y'] / dof,
+            'mean_x': m['mean_x'],
+            'var_x': m['m2_x'] / dof,
+            'cov_xy': m['c_xy'] / dof,
+        })
+
+    def cuped(self):
+        """Per-group CUPED-adjusted mean and variance of ``y``.
+
+        ``theta = cov(x, y) / var(x)`` is estimated on all groups pooled, and
+        each group's mean is shifted by ``theta`` times its covariate
+        imbalance against the pooled covariate mean.
+        """
+        m = self.moments
+        total = self.total()
+        theta = total['c_xy'] / total['m2_x'] if total['m2_x'] > 0 else 0.0
+        dof = (m['n'] - 1).where(m['n'] > 1)
+        return pd.DataFrame({
+            'n': m['n'],
+            'mean': m['mean_y'] - theta * (m['mean_x'] - total['mean_x']),
+            'var': (m['m2_y'] - 2 * theta * m['c_xy'] + theta ** 2 * m['m2_x']) / dof,
+        }), theta
@@ -0,0 +1,263 @@
+"""Outlier detection over all numeric columns of an uploaded dataset.
+
+Supported methods:
+
+* ``iqr`` -- outside ``[Q1 - k * IQR, Q3 + k * IQR]`` (``k`` defaults to 1.5)
+* ``zscore`` -- ``|x - mean| / std`` above the threshold (default 3)
+* ``mad`` -- modified z-score ``0.6745 * |x - median| / MAD`` above the
+  threshold (default 3.5); columns whose MAD is 0 (mostly one repeated
+  value) use ``0.7979 * |x - median| / MeanAD`` instead
+* ``isolation_forest`` -- rows whose isolation-forest anomaly score is in the
+  top ``contamination`` share (multivariate, flags whole rows)
+
+The univariate methods reduce to per-column ``(low, high)`` bounds, computed
+for every column at once on a 2-D array. On large frames the quantiles come
+from ``QuantileSketch``, a mergeable t-digest-style summary built chunk by
+chunk, so they need memory for one chunk instead of a second full copy of
+the data (which ``np.nanquantile`` makes).
+"""
+import numpy as np
+import pandas as pd
+
+METHODS = ('iqr', 'zscore', 'mad', 'isolation_forest')
+DEFAULT_THRESHOLDS = {'iqr': 1.5, 'zscore': 3.0, 'mad': 3.5, 'isolation_forest': 0.01}
+# Frames with more rows than this use sketched quantiles
+EXACT_QUANTILE_ROWS = 2_000_000
+CHUNK_ROWS = 500_000
+SCORE_BLOCK_ROWS = 16_384
+# Mean absolute deviation to standard deviation, for columns whose MAD is 0
+MEAN_AD_SCALE = 1.2533
+
+
+class QuantileSketch:
+    """Mergeable approximate quantiles (t-digest with the k1 scale function).
+
+    Centroids near the tails are kept small, so extreme quantiles such as
+    those used for outlier fences stay accurate.
+    """
+
+    def __init__(self, compression=500):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+
+    @property
+    def count(self):
+        return self.weights.sum()
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        return self._add(values, np.ones_like(values))
+
+    def merge(self, other):
+        return self._add(other.means, other.weights)
+
+    def _add(self, means, weights):
+        means = np.concatenate([self.means, means])
+        weights = np.concatenate([self.weights, weights])
+        if means.size == 0:
+            return self
+        order = np.argsort(means, kind='mergesort')
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        # Quantile at the centre of each centroid, mapped through k1; each
+        # unit of k becomes one output centroid
+        q = (np.cumsum(weights) - weights / 2) / total
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q - 1)
+        bins = np.floor(k - k[0]).astype(np.int64)
+        # bins is non-decreasing; renumber it densely from zero
+        bins = np.concatenate([[0], np.cumsum(np.diff(bins) > 0)])
+        merged_weights = np.bincount(bins, weights=weights)
+        self.means = np.bincount(bins, weights=means * weights) / merged_weights
+        self.weights = merged_weights
+        return self
+
+    def quantile(self, q):
+        q = np.asarray(q, dtype=float)
+        if self.means.size == 0:
+            return np.full(q.shape, np.nan)
+        if self.means.size == 1:
+            return np.full(q.shape, self.means[0])
+        cumulative = (np.cumsum(self.weights) - self.weights / 2) / self.weights.sum()
+        return np.interp(q, cumulative, self.means)
+
+
+def _chunks(values, chunk_rows=CHUNK_ROWS):
+    for start in range(0, len(values), chunk_rows):
+        yield values[start:start + chunk_rows]
+
+
+def _quantiles(values, q, center=None):
+    """Per-column quantiles of a 2-D array, or of ``|values - center|``."""
+    if len(values) <= EXACT_QUANTILE_ROWS:
+        return np.nanquantile(values if center is None else np.abs(values - center), q, axis=0)
+    sketches = [QuantileSketch() for _ in range(values.shape[1])]
+    for chunk in _chunks(values):
+        if center is not None:
+            chunk = np.abs(chunk - center)
+        for j, sketch in enumerate(sketches):
+            sketch.update(chunk[:, j])
+    return np.column_stack([sketch.quantile(q) for sketch in sketches])
+
+
+def _mean_deviation(values, center):
+    """Per-column mean of ``|values - center|``, one chunk at a time."""
+    total = np.zeros(values.shape[1])
+    count = np.zeros(values.shape[1])
+    for chunk in _chunks(values):
+        deviation = np.abs(chunk - center)
+        total += np.nansum(deviation, axis=0)
+        count += np.count_nonzero(~np.isnan(deviation), axis=0)
+    with np.errstate(invalid='ignore'):
+        return total / count
+
+
+def _float_values(df, columns):
+    """``df[columns]`` as one float array, filled column by column so no
+    intermediate frame is made."""
+    values = np.empty((len(df), len(columns)))
+    for j, column in enumerate(columns):
+        values[:, j] = df[column].to_numpy(dtype=float, na_value=np.nan)
+    return values
+
+
+def numeric_columns(df):
+    return list(df.select_dtypes(include=['number']).columns)
+
+
+def _fit_bounds(values, method, threshold):
+    """``(low, high)`` arrays for the columns of a 2-D float array."""
+    if method == 'iqr':
+        q1, q3 = _quantiles(values, [0.25, 0.75])
+        iqr = q3 - q1
+        return q1 - threshold * iqr, q3 + threshold * iqr
+    if method == 'zscore':
+        mean = np.nanmean(values, axis=0)
+        std = np.nanstd(values, axis=0, ddof=1)
+        return mean - threshold * std, mean + threshold * std
+    median = _quantiles(values, [0.5])[0]
+    mad = _quantiles(values, [0.5], center=median)[0]
+    scale = mad / 0.6745
+    if (mad == 0).any():
+        # Otherwise the fences close on the median and flag every other value
+        scale = np.where(mad > 0, scale, MEAN_AD_SCALE * _mean_deviation(values, median))
+    spread = threshold * scale
+    return median - spread, median + spread
+
+
+def fit_bounds(df, columns=None, method='iqr', threshold=None):
+    """Per-column ``(low, high)`` bounds for a univariate method."""
+    if method not in METHODS or method == 'isolation_forest':
+        raise ValueError('method must be one of iqr, zscore or mad')
+    columns = numeric_columns(df) if columns is None else list(columns)
+    threshold = DEFAULT_THRESHOLDS[method] if threshold is None else threshold
+    low, high = _fit_bounds(_float_values(df, columns), method, threshold)
+    return pd.DataFrame({'low': low, 'high': high}, index=columns)
+
+
+# Isolation forest. Trees are stored as flat arrays with leaves pointing back
+# at themselves, so all rows are routed through a tree together, one level
+# per vectorized step, and end on a leaf holding their path length.
+
+def _average_path_length(n):
+    n = np.asarray(n, dtype=float)
+    safe_n = np.maximum(n, 2)
+    c = 2 * (np.log(safe_n - 1) + np.euler_gamma) - 2 * (safe_n - 1) / safe_n
+    return np.where(n > 2, c, np.where(n == 2, 1.0, 0.0))
+
+
+def _build_tree(sample, max_depth, rng):
+    feature, threshold, children, path_length = [], [], [], []
+
+    def grow(rows, depth):
+        node = len(feature)
+        feature.append(0)
+        threshold.append(np.inf)
+        children.append([node, node])
+        path_length.append(depth + float(_average_path_length(len(rows))))
+        if depth >= max_depth or len(rows) <= 1:
+            return node
+        lo, hi = rows.min(axis=0), rows.max(axis=0)
+        candidates = np.flatnonzero(hi > lo)
+        if candidates.size == 0:
+            return node
+        f = rng.choice(candidates)
+        t = rng.uniform(lo[f], hi[f])
+        feature[node] = f
+        threshold[node] = t
+        children[node] = [grow(rows[rows[:, f] < t], depth + 1),
+                          grow(rows[rows[:, f] >= t], depth + 1)]
+        return node
+
+    grow(sample, 0)
+    return (np.array(feature, dtype=np.int64), np.array(threshold),
+            np.array(children, dtype=np.int64).ravel(), np.array(path_length))
+
+
+def isolation_forest_scores(values, n_trees=100, sample_size=256, seed=0):
+    """Anomaly scores in ``(0, 1]``; higher means easier to isolate."""
+    values = np.asarray(values, dtype=float)
+    # Missing values are isolated like typical ones
+    values = np.where(np.isnan(values), np.nanmedian(values, axis=0), values)
+    n, n_features = values.shape
+    sample_size = min(sample_size, n)
+    max_depth = int(np.ceil(np.log2(max(sample_size, 2))))
+    rng = np.random.default_rng(seed)
+
+    trees = [_build_tree(values[rng.choice(n, sample_size, replace=False)], max_depth, rng)
+             for _ in range(n_trees)]
+
+    # Rows go through the forest in cache-sized blocks
+    path_sum = np.zeros(n)
+    for start in range(0, n, SCORE_BLOCK_ROWS):
+        block = values[start:start + SCORE_BLOCK_ROWS]
+        flat = block.ravel()
+        row_offset = np.arange(len(block), dtype=np.int64) * n_features
+        for feature, threshold, children, path_length in trees:
+            node = np.zeros(len(block), dtype=np.int64)
+            for _ in range(max_depth):
+                go_right = flat[row_offset + feature[node]] >= threshold[node]
+                node = children[2 * node + go_right]
+            path_sum[start:start + len(block)] += path_length[node]
+    return 2 ** (-path_sum / n_trees / _average_path_length(sample_size))
+
+
+def detect_outliers(df, columns=None, method='iqr', threshold=None):
+    """Boolean frame flagging outlying values, one column per input column.
+
+    For ``isolation_forest`` a row is flagged in every column when its score
+    is in the top ``threshold`` (contamination) share of rows.
+    """
+    if method not in METHODS:
+        raise ValueError('method must be one of {}'.format(METHODS))
+    columns = numeric_columns(df) if columns is None else list(columns)
+    if not columns or df.empty:
+        return pd.DataFrame(False, index=df.index, columns=columns)
+
+    values = _float_values(df, columns)
+    if method == 'isolation_forest':
+        contamination = DEFAULT_THRESHOLDS[method] if threshold is None else threshold
+        scores = isolation_forest_scores(values)
+        flagged = scores > np.quantile(scores, 1 - contamination)
+        return pd.DataFrame(np.repeat(flagged[:, None], len(columns), axis=1),
+                            index=df.index, columns=columns)
+
+    # The same array as above, so the frame is converted to floats once
+    threshold = DEFAULT_THRESHOLDS[method] if threshold is None else threshold
+    low, high = _fit_bounds(values, method, threshold)
+    flags = values < low
+    flags |= values > high
+    return pd.DataFrame(flags, index=df.index, columns=columns)
+
+
+def remove_outliers(df, columns=None, method='iqr', threshold=None):
+    """Drop rows with an outlier in any of ``columns``.
+
+    Returns ``(filtered_df, counts)`` where ``counts`` maps each column to
+    the number of outlying values found in it.
+    """
+    flags = detect_outliers(df, columns, method, threshold)
+    counts = flags.sum().astype(int).to_dict()
+    keep = ~flags.to_numpy().any(axis=1)
+    return df.loc[keep].reset_index(drop=True), counts
@@ -0,0 +1,34 @@
+"""Page layouts.
+
+Each page lives in its own module with a ``layout()`` function. A module is
+imported the first time its URL is visited and its layout is built once per
+worker, then reused for every later visit.
+"""
+import importlib
+import threading
+
+PAGES = {
+    '/': 'home',
+    '/power-analysis-calculator-page': 'power_calculator',
+    '/ab-testing-calculator-page': 'ab_testing_calculator',
+    '/continuous-ab-testing-page': 'continuous_ab_testing',
+    '/outlier-detection': 'outlier_detection',
+}
+
+_layouts = {}
+_lock = threading.Lock()
+
+
+def get_layout(pathname):
+    """Layout for ``pathname``, or None for an unknown page."""
+    name = PAGES.get(pathname)
+    if name is None:
+        return None
+    layout = _layouts.get(name)
+    if layout is None:
+        with _lock:
+            layout = _layouts.get(name)
+            if layout is None:
+                layout = importlib.import_module('pages.' + name).layout()
+                _layouts[name] = layout
+    return layout
@@ -0,0 +1,149 @@
+"""A/B testing calculator page for proportion metrics."""
+from dash import dcc, html
+import dash_bootstrap_components as dbc
+
+
+def layout():
+    return dbc.Container([
+    dbc.Row([
+        dbc.Col(html.H1("A/B Testing Calculator",className='text-primary my-4 text-center'), width=10)
+    ],  justify="center"),
+
+    dbc.Row([
+    dbc.Col([
+        dbc.Card([
+            dbc.CardBody([
+              dbc.Row([
+                    html.Div([
+                        dbc.Row([
+                            dbc.Col([
+                                html.Div(html.H1("A", className="mt-3"), className="text-center")  # Align "A" with inputs
+                            ], width=1, className="d-flex align-items-center"),  # Centering "A"
+
+                            dbc.Col([
+                                html.Label('Users'),
+                                dbc.Input(type="number", id="users_varA", min=0, value=1000),
+                            ], width=5),  # Adjusted to 5 for equal spacing
+                            dbc.Col([
+                                html.Label('Conversions'),
+                                dbc.Input(type="number", id="conversions_varA", min=0, value=100),
+                            ], width=5)  # Adjusted to 5 for equal spacing
+                        ])
+                    ], className="mb-3")
+                ]), #row for group A
+
+              dbc.Row([
+                    html.Div([
+                        dbc.Row([
+                            dbc.Col([
+                                html.Div(html.H1("B", className="mt-3"), className="text-center")  # Align "B" with inputs
+                            ], width=1, className="d-flex align-items-center"),  # Centering "B"
+
+                            dbc.Col([
+                                html.Label('Users'),
+                                dbc.Input(type="number", id="users_varB", min=0, value=1000),
+                            ], width=5),  # Adjusted to 5 for equal spacing
+                            dbc.Col([
+                                html.Label('Conversions'),
+                                dbc.Input(type="number", id="conversions_varB", min=0, value=90),
+                            ], width=5)  # Adjusted to 5 for equal spacing
+                        ])
+                    ], className="mb-3")
+                ]), #row for group B
+
+              # rows for variants C, D, ... added by the "Add Variant" button
+              html.Div(id='extra-variants', children=[]),
+
+              dbc.Row([
+                    dbc.Col([
+                      dbc.Button("Add Variant", id="add_variant_button", color="light", className="me-1"),
+                      dcc.Upload(
+                          id='variants-upload',
+                          children=dbc.Button("Upload Variants", color="light", className="me-1"),
+                          style={'display': 'inline-block'}
+                      ),
+                      dcc.Store(id='variant-table')
+                    ])
+              ], className="mb-3"), # Variant buttons
+
+              dbc.Row([
+                    dbc.Col([
+                      dcc.RadioItems(options=[
+                          {'label': 'One-sided', 'value': 'One-sided'},
+                          {'label': 'Two-sided', 'value': 'Two-sided'}
+                          ],
+                          id='hypothesis',
+                          value='Two-sided',  # Default selected value
+                          inline=True,
+                          labelStyle={'margin-right': '20px'}  # Increase spacing between the options
+                    )
+                  ])
+              ], className="mb-3"), #Hypothesis
+
+              dbc.Row([
+                    dbc.Col([
+                      html.Label('Compare'),
+                      dcc.RadioItems(options=[
+                          {'label': 'Against A', 'value': 'control'},
+                          {'label': 'All pairs', 'value': 'all'}
+                          ],
+                          id='comparison_pairs',
+                          value='control',
+                          inline=True,
+                          labelStyle={'margin-right': '20px'}
+                      )
+                    ]),
+                    dbc.Col([
+                      html.Label('Correction'),
+                      dcc.Dropdown(
+                          id='correction',
+                          options=[
+                              {'label': 'None', 'value': 'none'},
+                              {'label': 'Bonferroni', 'value': 'bonferroni'},
+                              {'label': 'Holm', 'value': 'holm'}],
+                          value='holm',
+                          clearable=False
+                      )
+                    ])
+              ]), #Multi-variant options
+
+              dbc.Row([
+                    dbc.Col([
+                      html.Label('Analysis'),
+                      dcc.RadioItems(options=[
+                          {'label': 'Frequentist', 'value': 'frequentist'},
+                          {'label': 'Frequentist + Bayesian', 'value': 'bayesian'}
+                          ],
+                          id='analysis_mode',
+                          value='frequentist',
+                          inline=True,
+                          labelStyle={'margin-right': '20px'}
+                      )
+                    ])
+              ], className="mt-3"), #Analysis mode
+
+              # html.Br(),
+
+              # dbc.Row([
+              #       dbc.Col([
+              #         dbc.Button("Calculate", id="calculate_button", className="btn btn-primary", style={"color": "white"})
+              #       ])
+              # ]), # Button row
+
+            ])
+        ])
+    ]),
+
+    dbc.Col([
+            dbc.Row(id='results-row', children=[
+            # This row will be populated by the callback
+          ]),
+            html.Br(),
+            # Table of pairwise comparisons once there are more than two variants
+            html.Div(id='variant-comparison'),
+            html.Br(),
+            # Posterior summaries of every variant against A (Bayesian mode)
+            html.Div(id='bayesian-results')
+        ])
+      ])
+    ]) #container
@@ -0,0 +1,91 @@
+"""A/B testing calculator page for continuous metrics."""
+from dash import dcc, html
+import dash_bootstrap_components as dbc
+
+
+def summary_row(label):
+    return dbc.Row([
+        dbc.Col([
+            html.Div(html.H1(label, className="mt-3"), className="text-center")
+        ], width=1, className="d-flex align-items-center"),
+        dbc.Col([
+            html.Label('Users'),
+            dbc.Input(type="number", id="users_cont" + label, min=0),
+        ], width=3),
+        dbc.Col([
+            html.Label('Mean'),
+            dbc.Input(type="number", id="mean_cont" + label),
+        ], width=4),
+        dbc.Col([
+            html.Label('Std Dev'),
+            dbc.Input(type="number", id="std_cont" + label, min=0),
+        ], width=4)
+    ], className="mb-3")
+
+
+def layout():
+    return dbc.Container([
+        dbc.Row([
+            dbc.Col(html.H1("A/B Testing Calculator (Continuous)",className='text-primary my-4 text-center'), width=10)
+        ],  justify="center"),
+
+        dbc.Row([
+        dbc.Col([
+            dbc.Card([
+                dbc.CardBody([
+                  dbc.Row([
+                        dbc.Col([
+                          dcc.RadioItems(options=[
+                              {'label': 'Summary statistics', 'value': 'summary'},
+                              {'label': 'Raw per-user data', 'value': 'raw'}
+                              ],
+                              id='continuous_input',
+                              value='summary',
+                              inline=True,
+                              labelStyle={'margin-right': '20px'}
+                        )
+                      ])
+                  ], className="mb-3"), #Input mode
+
+                  html.Div([
+                      summary_row('A'),
+                      summary_row('B'),
+                  ], id='continuous-summary-inputs'),
+
+                  html.Div([
+                      dcc.Upload(
+                          id='continuous-upload',
+                          children=dbc.Button("Upload File", color="light", className="me-1"),
+                      ),
+                      html.Div(id='continuous-upload-name', className='text-muted small mb-2'),
+                      dcc.Store(id='continuous-upload-file'),
+                      html.Label('Variant column'),
+                      dcc.Dropdown(id='continuous_group_column'),
+                      html.Label('Metric column'),
+                      dcc.Dropdown(id='continuous_metric_column'),
+                      html.Label('Pre-experiment covariate (CUPED, optional)'),
+                      dcc.Dropdown(id='continuous_covariate_column'),
+                  ], id='continuous-raw-inputs', className="mb-3", style={'display': 'none'}),
+
+                  dbc.Row([
+                        dbc.Col([
+                          dcc.RadioItems(options=[
+                              {'label': 'One-sided', 'value': 'One-sided'},
+                              {'label': 'Two-sided', 'value': 'Two-sided'}
+                              ],
+                              id='continuous_hypothesis',
+                              value='Two-sided',
+                              inline=True,
+                              labelStyle={'margin-right': '20px'}
+                        )
+                      ])
+                  ]), #Hypothesis
+                ])
+            ])
+        ]),
+
+        dbc.Col([
+                html.Div(id='continuous-results')
+            ])
+          ])
+        ]) #container
@@ -0,0 +1,16 @@
+"""Home page."""
+from dash import html
+import dash_bootstrap_components as dbc
+
+
+def layout():
+    return dbc.Container([
+          html.H1(children='Welcome!'),
+        	html.P("Here you can find a simple self-service analytics tools."),
+          html.P("The tools include:"),
+          html.P("1. Power analysis calculator for sample size and experiment duration estimation."),
+					html.P("2. Post-experiment analysis calculator for A/B testing experiment analysis, for proportion metrics such as conversion rate and for continuous metrics such as revenue per user."),
+          html.P("3. Coming soon!"),
+
+        # dbc.Button(' Ahmad Nur Aziz',className="bi bi-linkedin",href="https://www.linkedin.com/in/ahmadnuraziz/")])
+    ])
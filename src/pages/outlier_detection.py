@@ -0,0 +1,219 @@
+"""Outlier detection page."""
+from dash import dcc, html
+import dash_bootstrap_components as dbc
+
+
+def layout():
+    return dbc.Container([
+  dbc.Row([
+  	dbc.Col(html.H1("Outlier Detection",className='text-primary my-4 text-center'), width=10)
+  ], justify="center"),
+
+	#Body Input
+  dbc.Row([
+		dbc.Col(
+      dbc.Card([
+        html.Div(html.H4("Input Data", className="mt-3"), className="text-center"),  # Align "A" with inputs
+      	dbc.CardBody([
+          dbc.Row([
+          html.Div([
+          	html.Label('Data Type'),
+             
+            dcc.Dropdown(
+            id='data_type',
+							multi=False,
+              value = 'cross_sectional',
+							options=[
+                {'label': 'Cross-sectional','value': 'cross_sectional'},
+                {'label': 'Time-series', 'value': 'time_series'}]
+              )
+          ],style={'width': '30%'}),
+          
+          #upload button
+					dcc.Upload(
+						id='upload-data',
+						multiple=True,
+						children=html.Div([
+							# html.Button('Upload File')
+              dbc.Button("Upload Files", color="light", className="me-1")
+							]),
+							
+							style={
+								'width': '100%',
+								'height': '60px',
+								'lineHeight': '60px',
+								# 'textAlign': 'center',
+								'margin': '10px'
+							},
+						),
+
+					# Shown while the upload is parsed in the background
+					html.Div([
+						dbc.Progress(id='upload-progress', value=0, max=1, striped=True, animated=True, className="mb-2"),
+						dbc.Button("Cancel", id="upload_cancel_button", color="secondary", size="sm", outline=True)
+					], id='upload-status', style={'display': 'none'}),
+
+					# One entry per uploaded CSV and per workbook sheet
+					html.Div([
+						html.Label('File / sheet'),
+						dcc.Dropdown(id='upload-picker', clearable=False)
+					], id='upload-picker-row', style={'display': 'none'})
+					])
+				]),
+        
+				dbc.CardBody([
+				dbc.Row([
+          dbc.Col(
+    			# Div to display the DataFrame's head
+          html.Div(id='df-head')
+					)
+				])]),
+            
+				dbc.CardBody([
+				dbc.Row([
+          dbc.Col(
+          html.Div([
+          # Div to display the DataFrame's column
+            html.Label('Choose a column'),
+          	dcc.Dropdown(id='column-names-dropdown'),
+            dcc.RadioItems(
+              id='plot_type',
+              value='box',
+              inline=True,
+              options=[
+                {'label': 'Box', 'value': 'box'},
+                {'label': 'Histogram', 'value': 'histogram'},
+                {'label': 'Violin', 'value': 'violin'},
+                {'label': 'Points', 'value': 'points'}],
+              labelStyle={'margin-right': '20px'},
+              className="mt-2"
+            )
+					])
+          )
+					], style={'width':'30%'})
+      	]),
+        
+				dbc.CardBody([
+					dbc.Row(
+          	dbc.Col(
+          	# Placeholder for the boxplot
+    				dcc.Graph(id='boxplot')
+						)
+					),
+
+					# Segments of the selected column, computed in Arrow (see query.py)
+					dbc.Row([
+						dbc.Col([
+          	html.H5("Segments", className="mt-3"),
+          	html.Label('Group by'),
+          	dcc.Dropdown(id='segment_column'),
+          	html.Div(id='filter-rows', children=[], className="mt-2"),
+          	dbc.Button("Add Filter", id="add_filter_button", color="light", className="me-1 mt-2")
+          	], width=6)
+        	]),
+
+					dbc.Row(
+						dbc.Col([
+          	html.Div(id='segment-summary', className="mt-3"),
+          	dcc.Graph(id='segment-boxplot')
+						])
+					),
+          
+					dbc.Row([
+						dbc.Col([
+          	dcc.Dropdown(
+              id='outlier_method',
+              value='iqr',
+              clearable=False,
+              options=[
+                {'label': 'IQR (1.5 x IQR fences)', 'value': 'iqr'},
+                {'label': 'Z-score (|z| > 3)', 'value': 'zscore'},
+                {'label': 'Modified z-score / MAD (> 3.5)', 'value': 'mad'},
+                {'label': 'Isolation Forest (top 1%)', 'value': 'isolation_forest'}]
+            )
+          	], width=4),
+						dbc.Col([
+          	dbc.Button("Outlier Removal", id="outlier_removal_button", color="dark", className="me-1")
+          	])
+        	]), # Button row
+
+					dbc.Row(
+						dbc.Col(
+          	# Shown while outliers are removed in the background
+          	html.Div([
+							dbc.Progress(id='outlier-progress', value=0, max=1, striped=True, animated=True, className="mb-2"),
+							dbc.Button("Cancel", id="outlier_cancel_button", color="secondary", size="sm", outline=True)
+						], id='outlier-status', style={'display': 'none'}, className="mt-3")
+						)
+					),
+
+					dbc.Row(
+						dbc.Col(
+          	# Removal counts and download links
+          	html.Div(id='outlier-result', className="mt-3")
+						)
+					),
+      	]),
+
+				# Anomalies over time of the chosen column, see timeseries.py
+				dbc.CardBody([
+					dbc.Row([
+						dbc.Col([
+          	html.H5("Time-series Anomalies", className="mt-3"),
+          	html.Label('Timestamp column'),
+          	dcc.Dropdown(id='ts_timestamp_column'),
+          	html.Label('Series column (optional)', className="mt-2"),
+          	dcc.Dropdown(id='ts_series_column')
+          	], width=4),
+						dbc.Col([
+          	html.Label('Detector', className="mt-5"),
+          	dcc.Dropdown(
+              id='ts_detector',
+              value='rolling_mad',
+              clearable=False,
+              options=[
+                {'label': 'Rolling median / MAD (> 3.5)', 'value': 'rolling_mad'},
+                {'label': 'EWMA (> 3)', 'value': 'ewma'},
+                {'label': 'Seasonal-trend residual (> 3.5)', 'value': 'stl'}]
+            ),
+          	html.Label('Window / span / period (points)', className="mt-2"),
+          	dbc.Input(type="number", id="ts_window", min=2, value=50)
+          	], width=4),
+						dbc.Col([
+          	html.Label('Threshold', className="mt-5"),
+          	dbc.Input(type="number", id="ts_threshold", min=0, step=0.1, placeholder='Default'),
+          	dbc.Button("Detect Anomalies", id="ts_detect_button", color="dark", className="me-1 mt-3")
+          	], width=4)
+        	]),
+
+					dbc.Row(
+						dbc.Col(
+          	html.Div([
+							dbc.Progress(id='ts-progress', value=0, max=1, striped=True, animated=True, className="mb-2"),
+							dbc.Button("Cancel", id="ts_cancel_button", color="secondary", size="sm", outline=True)
+						], id='ts-status', style={'display': 'none'}, className="mt-3")
+						)
+					),
+
+					dbc.Row(
+						dbc.Col([
+          	# Counts per series and download links
+          	html.Div(id='ts-result', className="mt-3"),
+          	dcc.Store(id='ts-result-id'),
+          	dcc.Dropdown(id='ts_plot_series', placeholder='Series to plot', className="mt-2"),
+          	dcc.Graph(id='ts-graph')
+						])
+					),
+      	], id='timeseries-section', style={'display': 'none'}),
+           
+			]))
+    ]), #body
+    
+		# dbc.Row(
+    #   dbc.Col(
+    #   	dbc.Card([
+		# 			html.Div(html.H3("Output", className="mt-3"), className="text-center"),  # Align "A" with inputs
+		# 	])
+		# 	)
+		# )
+  ]) #container
@@ -0,0 +1,254 @@
+"""Power analysis calculator page."""
+from dash import dcc, html
+import dash_bootstrap_components as dbc
+
+from chart_template import curve_figure
+from config import MDE_STEP
+
+
+def layout():
+    return dbc.Container([
+    dbc.Row([
+        dbc.Col(html.H1("Power Analysis Calculator",className='text-primary my-4 text-center'), width=10)
+    ],  justify="center"),
+
+    dbc.Row([
+        dbc.Col([
+            dbc.Card([
+            dbc.CardHeader("Input Parameters", className="text-center"),
+            dbc.CardBody([
+            dbc.Row([
+                html.Div([
+                    html.Label('Metric Type'),
+                    dcc.Dropdown(
+                        id='metric_type',
+                        multi=False,
+                        # value = 'Proportion',
+                        options=[
+                            {'label': 'Proportion',
+                             'value': 'proportion'},
+                            {'label': 'Continuous', 'value': 'continuous'}]
+                    )
+                ])
+            ], className="mb-3", style={'width': '60%'}),
+
+            dbc.Row([
+                html.Div([
+                    html.Label('Metric Mean'),
+                    dbc.Input(type="number", id="metric_mean",min=0)]),
+
+                html.Div(id='metric_type_note')
+            ], className="mb-3", style={'width': '60%'}),
+
+            dbc.Row([
+                html.Div([
+                    html.Label('Metric Variance'),
+                    dbc.Input(type="number", id="metric_variance",min=0)])
+            ], className="mb-3", style={'width': '60%'}),
+
+            dbc.Row([
+                html.Div([
+                    html.Label('Daily Traffic'),
+                    dbc.Input(type="number", id="daily_traffic",min=0)])
+            ], className="mb-3", style={'width': '60%'}),
+
+            dbc.Row([
+                dbc.Col([
+                    html.Label( 'Percentage Population'),
+                    dbc.InputGroup([
+                        dbc.Input(type="number",
+                                  value=100,
+                                  min=0,
+                                  max=100,  step=1, id="percentage_population"),
+                        dbc.InputGroupText("%")
+                    ])
+                ]),
+
+                dbc.Col([
+                    html.Br(),
+                    html.I(
+                        id="info-population", className="fas fa-info-circle"),
+
+                    dbc.Tooltip(
+                        "The percentage population",
+                        target="info-population",
+                        placement="right"
+                    )
+                ])
+            ], className="mb-3", style={'width': '70%'}),
+
+            dbc.Row([
+                dbc.Col([
+                    html.Label('Number of Variants'),
+                    dbc.Input(type="number",value=2, id="n_variants",min=1)]),
+
+                dbc.Col([
+                    html.Br(),
+                    html.I(
+                        id="info-variants", className="fas fa-info-circle"),
+
+                    dbc.Tooltip(
+                        "Including control variant",
+                        target="info-variants",
+                        placement="right"
+                    )
+                ])
+            ], className="mb-3", style={'width': '60%'}),
+
+            dbc.Row([
+                dbc.Col([
+                    html.Label(
+                        'Statistical Significance'),
+                    dbc.InputGroup([
+                        dbc.Input(type="number",
+                                  value=95,
+                                  min=0,
+                                  max=100,  step=1, id="statistical_significance"),
+                        dbc.InputGroupText("%")
+                    ])
+                ]),
+
+                dbc.Col([
+                    html.Br(),
+                    html.I(
+                        id="info-statistical-significance", className="fas fa-info-circle"),
+
+                    dbc.Tooltip(
+                        "The default value is 95%",
+                        target="info-statistical-significance",
+                        placement="right"
+                    )
+                ])
+            ], className="mb-3", style={'width': '70%'}),
+
+            dbc.Row([
+                dbc.Col([
+                    html.Label(
+                        'Statistical Power'),
+                    dbc.InputGroup([
+                        dbc.Input(type="number",
+                                  value=80,
+                                  min=0,
+                                  max=100,  step=1, id="statistical_power"),
+                        dbc.InputGroupText(
+                            "%")
+                    ])
+                ]),
+
+                dbc.Col([
+                    html.Br(),
+                    html.I(
+                        id="info-statistical-power", className="fas fa-info-circle"),
+
+                    dbc.Tooltip(
+                        "The default value is 80%",
+                        target="info-statistical-power",
+                        placement="right"
+                    )
+                ])
+            ], className="mb-3", style={'width': '70%'}),
+
+            dbc.Row([
+                dbc.Col([
+                    html.Label(
+                        'Minimum Detectable Effect'),
+                    html.Br(),
+                    dcc.RangeSlider(
+                        id='mde_slider',
+                        min=0,  # Minimum value of the slider
+                        max=100,  # Maximum value of the slider
+                        # value=5,  # Default value of the slider
+                        value=[1, 10],
+                        step=MDE_STEP,  # Step size
+                        marks={
+                            i: {'label': str(i) + '%'} for i in range(0, 101, 10)
+                        },
+                        tooltip={
+                            "placement": "bottom", "always_visible": True},
+                    )
+                ], width={"size": 8})
+            ])
+					])
+        ])
+			]), # Row 2, column 1
+
+      dbc.Col([
+        dbc.Card([
+            dbc.CardHeader("Output", className="text-center py-2"),
+            dbc.CardBody([
+            # Static layout sent once; update_chart patches only the data
+            dcc.Graph(id='duration_chart', figure=curve_figure('Required Experiment Duration', 'Duration in Days'),
+                      style={'margin-bottom': '15px'}),
+
+            dcc.Graph(id='sample_size_chart', figure=curve_figure('Required Sample Size', 'Number of Sample Size'),
+                      style={'margin-top': '15px'})
+					])])
+				])  # Row 2, column 1
+    	]),  # Row 2
+
+    dbc.Row([
+      dbc.Col([
+        dbc.Card([
+            dbc.CardHeader("Power Curves", className="text-center py-2"),
+            dbc.CardBody([
+            dbc.Row([
+                dbc.Col([
+                    dcc.RadioItems(options=[
+                        {'label': 'Simulation', 'value': 'simulation'},
+                        {'label': 'Exact', 'value': 'exact'}
+                        ],
+                        id='power_method',
+                        value='simulation',
+                        inline=True,
+                        labelStyle={'margin-right': '20px'}
+                    )
+                ], width=6),
+                dbc.Col([
+                    dbc.Button("Compute Power Curves", id="power_curves_button", color="dark", className="me-1"),
+                    dbc.Button("Cancel", id="power_curves_cancel_button", color="secondary", outline=True,
+                               className="me-1", style={'display': 'none'})
+                ], width=6, className="text-end")
+            ], className="mb-3"),
+
+            dcc.Graph(id='power_surface_chart', style={'margin-bottom': '15px'}),
+
+            dcc.Graph(id='power_curve_chart', style={'margin-top': '15px'})
+					])])
+				])
+    	], className="my-4"),  # Row 3
+
+    dbc.Row([
+      dbc.Col([
+        dbc.Card([
+            dbc.CardHeader("Detectable MDE", className="text-center py-2"),
+            dbc.CardBody([
+            dbc.Row([
+                dbc.Col([
+                    html.Label('Maximum Duration'),
+                    dbc.InputGroup([
+                        dbc.Input(type="number", value=28, min=1, step=1, id="max_duration"),
+                        dbc.InputGroupText("days")
+                    ])
+                ], width=4),
+
+                dbc.Col([
+                    html.Br(),
+                    html.I(
+                        id="info-max-duration", className="fas fa-info-circle"),
+
+                    dbc.Tooltip(
+                        "The smallest effect detectable with the inputs above, "
+                        "for up to this many days of traffic",
+                        target="info-max-duration",
+                        placement="right"
+                    )
+                ])
+            ], className="mb-3"),
+
+            dcc.Graph(id='mde_traffic_chart', style={'margin-bottom': '15px'}),
+
+            dcc.Graph(id='mde_alpha_power_chart', style={'margin-top': '15px'})
+					])])
+				])
+    	], className="my-4")  # Row 4
+		])  # container
@@ -0,0 +1,176 @@
+"""Figures for uploaded columns whose size does not depend on the row count.
+
+Instead of handing every value to Plotly (``px.box`` serializes the whole
+column into the figure JSON), the statistics are computed on the server and
+only the summary is sent: box quartiles and fences plus a capped sample of
+outlier points, or binned counts/densities for histograms and violins.
+"""
+import numpy as np
+import plotly.graph_objs as go
+
+MAX_OUTLIER_POINTS = 1000
+BINS = 100
+
+
+def _finite(values):
+    values = np.asarray(values, dtype=float)
+    return values[np.isfinite(values)]
+
+
+def sample_points(values, max_points=MAX_OUTLIER_POINTS, seed=0):
+    """At most ``max_points`` of ``values``, always keeping the extremes."""
+    if len(values) <= max_points:
+        return values
+    rng = np.random.default_rng(seed)
+    picked = rng.choice(len(values), max_points - 2, replace=False)
+    return np.concatenate([[values.min(), values.max()], values[picked]])
+
+
+def box_stats(values):
+    """Quartiles, Tukey whiskers and the outlying values of ``values``."""
+    values = _finite(values)
+    if values.size == 0:
+        return None
+    q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    return {
+        'q1': q1,
+        'median': median,
+        'q3': q3,
+        'mean': values.mean(),
+        'lowerfence': inside.min(),
+        'upperfence': inside.max(),
+        'outliers': values[(values < inside.min()) | (values > inside.max())],
+        'count': values.size,
+    }
+
+
+def box_traces(values, name, max_points=MAX_OUTLIER_POINTS):
+    stats = box_stats(values)
+    if stats is None:
+        return []
+    points = sample_points(stats['outliers'], max_points)
+    return [
+        go.Box(
+            name=name, x=[name],
+            q1=[stats['q1']], median=[stats['median']], q3=[stats['q3']],
+            lowerfence=[stats['lowerfence']], upperfence=[stats['upperfence']],
+            mean=[stats['mean']], boxpoints=False, marker_color='#636efa', showlegend=False,
+        ),
+        go.Scatter(
+            x=[name] * len(points), y=points, mode='markers', name='outliers',
+            marker={'color': '#636efa', 'size': 4}, showlegend=False,
+            hovertemplate='%{y}<extra>outlier</extra>',
+        ),
+    ]
+
+
+def segment_box_traces(summary, name):
+    """One box per row of a ``query.segment_summary`` frame.
+
+    Whiskers are the Tukey fences clipped to the segment's min and max;
+    individual outliers are not drawn.
+    """
+    iqr = summary['q3'] - summary['q1']
+    lower = (summary['q1'] - 1.5 * iqr).clip(lower=summary['min'])
+    upper = (summary['q3'] + 1.5 * iqr).clip(upper=summary['max'])
+    return [
+        go.Box(
+            name=str(row.segment), x=[str(row.segment)],
+            q1=[row.q1], median=[row.median], q3=[row.q3], mean=[row.mean],
+            lowerfence=[low], upperfence=[high], boxpoints=False, showlegend=False,
+            hovertemplate='{}<extra>n={:,}</extra>'.format(name, int(row.count)),
+        )
+        for row, low, high in zip(summary.itertuples(), lower, upper)
+    ]
+
+
+def histogram_traces(values, name, bins=BINS):
+    values = _finite(values)
+    if values.size == 0:
+        return []
+    counts, edges = np.histogram(values, bins=bins)
+    return [go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges),
+        name=name, marker_color='#636efa', showlegend=False,
+    )]
+
+
+def violin_traces(values, name, bins=BINS):
+    """A violin outline drawn from a lightly smoothed binned density."""
+    values = _finite(values)
+    if values.size == 0:
+        return []
+    counts, edges = np.histogram(values, bins=bins, density=True)
+    kernel = np.array([1, 4, 6, 4, 1]) / 16
+    density = np.convolve(counts, kernel, mode='same')
+    width = density / density.max() * 0.4 if density.max() > 0 else density
+    centers = (edges[:-1] + edges[1:]) / 2
+    stats = box_stats(values)
+    return [
+        go.Scatter(
+            x=np.concatenate([-width, width[::-1]]), y=np.concatenate([centers, centers[::-1]]),
+            fill='toself', mode='lines', line={'color': '#636efa'}, name=name,
+            showlegend=False, hoverinfo='skip',
+        ),
+        go.Box(
+            x=[0], q1=[stats['q1']], median=[stats['median']], q3=[stats['q3']],
+            lowerfence=[stats['lowerfence']], upperfence=[stats['upperfence']],
+            boxpoints=False, width=0.1, marker_color='#2a3f5f', name=name, showlegend=False,
+        ),
+    ]
+
+
+def distribution_figure(values, name, plot_type='box'):
+    if plot_type == 'histogram':
+        fig = go.Figure(histogram_traces(values, name))
+        fig.update_layout(xaxis_title=name, yaxis_title='Count', bargap=0)
+    elif plot_type == 'violin':
+        fig = go.Figure(violin_traces(values, name))
+        fig.update_layout(yaxis_title=name, xaxis={'visible': False})
+    else:
+        fig = go.Figure(box_traces(values, name))
+        fig.update_layout(yaxis_title=name)
+    return fig
+
+
+def anomaly_figure(lines, anomalies, name):
+    """Values, expected values and anomalies of one series from ``timeseries.detect``.
+
+    ``lines`` are the (downsampled) rows drawn as lines; ``anomalies`` are
+    drawn individually, up to ``MAX_OUTLIER_POINTS`` of the largest scores.
+    """
+    if len(anomalies) > MAX_OUTLIER_POINTS:
+        anomalies = anomalies.loc[anomalies['score'].abs().nlargest(MAX_OUTLIER_POINTS).index]
+    fig = go.Figure([
+        go.Scattergl(x=lines['timestamp'].to_numpy(), y=lines['value'].to_numpy(), mode='lines', name=name,
+                     line={'color': '#636efa', 'width': 1}),
+        go.Scattergl(x=lines['timestamp'].to_numpy(), y=lines['expected'].to_numpy(), mode='lines',
+                     name='expected', line={'color': '#2a3f5f', 'width': 1, 'dash': 'dot'}),
+        go.Scattergl(x=anomalies['timestamp'].to_numpy(), y=anomalies['value'].to_numpy(), mode='markers',
+                     name='anomalies', marker={'color': '#ef553b', 'size': 6}, customdata=anomalies['score'].to_numpy(),
+                     hovertemplate='%{x}<br>%{y}<br>score %{customdata:.2f}<extra>anomaly</extra>'),
+    ])
+    # Keeps the zoom when zoom_patch swaps in finer points
+    fig.update_layout(yaxis_title=name, legend={'orientation': 'h'}, uirevision=name)
+    return fig
+
+
+def points_figure(points, name, x='row'):
+    """Scatter of the (downsampled) values of one column against ``x``."""
+    fig = go.Figure(go.Scattergl(x=points[x].to_numpy(), y=points[name].to_numpy(), mode='markers', name=name,
+                                 marker={'color': '#636efa', 'size': 3}, showlegend=False))
+    fig.update_layout(xaxis_title=x, yaxis_title=name, uirevision=name)
+    return fig
+
+
+def zoom_patch(points, x, columns):
+    """Update of traces ``0, 1, ...`` with ``points[x]`` against each of ``columns``."""
+    from dash import Patch
+
+    patch = Patch()
+    for i, column in enumerate(columns):
+        patch['data'][i]['x'] = points[x].to_numpy()
+        patch['data'][i]['y'] = points[column].to_numpy()
+    return patch
@@ -0,0 +1,58 @@
+"""Vectorized sample size and duration calculations for the power calculator.
+
+Every function broadcasts over its arguments, so a whole MDE grid -- and
+several significance/power combinations at once -- is evaluated in a single
+NumPy pass. Pass ``alpha``/``power`` as column vectors (shape ``(k, 1)``)
+against an MDE grid of shape ``(m,)`` to get ``(k, m)`` results.
+"""
+import numpy as np
+from scipy.special import ndtri
+
+
+def mde_grid(start, stop, step=0.01):
+    """MDE values in percent from ``start`` to ``stop`` inclusive."""
+    n = int(round((stop - start) / step)) + 1
+    return np.round(start + step * np.arange(max(n, 1)), 10)
+
+
+def z_scores(alpha, power, two_sided=True):
+    alpha = np.asarray(alpha, dtype=float)
+    power = np.asarray(power, dtype=float)
+    z_alpha = ndtri(1 - alpha / 2) if two_sided else ndtri(1 - alpha)
+    z_beta = ndtri(power)
+    return z_alpha, z_beta
+
+
+def sample_size(mde_pct, mean, variance, alpha=0.05, power=0.8, two_sided=True):
+    """Required sample size per variant (truncated to whole users).
+
+    ``mde_pct`` is the relative minimum detectable effect in percent of
+    ``mean``. Entries with a zero effect have no finite answer and are NaN.
+    """
+    z_alpha, z_beta = z_scores(alpha, power, two_sided)
+    effect = np.asarray(mde_pct, dtype=float) * mean / 100
+    with np.errstate(divide='ignore', invalid='ignore'):
+        n = 2 * (z_alpha + z_beta) ** 2 * variance / effect ** 2
+    return np.where(np.isfinite(n), np.floor(n), np.nan)
+
+
+def duration(mde_pct, mean, variance, traffic, n_variants, population=1.0,
+             alpha=0.05, power=0.8, two_sided=True):
+    """Experiment duration in days for each MDE, matching ``sample_size``."""
+    z_alpha, z_beta = z_scores(alpha, power, two_sided)
+    effect = np.asarray(mde_pct, dtype=float) * mean / 100
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days = n_variants * 2 * (z_alpha + z_beta) ** 2 * variance / effect ** 2 / traffic
+    return np.where(np.isfinite(days), population * np.floor(days), np.nan)
+
+
+def power_table(mean, variance, traffic, n_variants, mde_pct, population=1.0,
+                alpha=0.05, power=0.8, two_sided=True):
+    """Sample size and duration over ``mde_pct`` in one call."""
+    mde_pct = np.asarray(mde_pct, dtype=float)
+    return {
+        'mde': mde_pct,
+        'sample_size': sample_size(mde_pct, mean, variance, alpha, power, two_sided),
+        'duration': duration(mde_pct, mean, variance, traffic, n_variants, population,
+                             alpha, power, two_sided),
+    }
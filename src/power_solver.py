@@ -0,0 +1,97 @@
+"""Inverse power calculations: what MDE or power a test can reach.
+
+``power_analysis`` answers "how many users for this MDE"; the functions here
+go the other way and broadcast over their arguments, so whole grids (e.g.
+duration x traffic, or alpha x power) are solved in one NumPy pass:
+
+* ``users_per_variant`` -- users available per variant, consistent with
+  ``power_analysis.duration``
+* ``detectable_mde`` -- smallest relative MDE reaching the target power.
+  Closed form for the equal-variance formula used by ``power_analysis``;
+  for proportions, where the variant's variance depends on the effect, the
+  root of ``proportion_power`` is found by vectorized bisection.
+* ``achievable_power`` -- power for a given MDE and sample size
+"""
+import numpy as np
+from scipy.special import ndtr
+
+from power_analysis import z_scores
+
+BISECTION_STEPS = 60
+
+
+def users_per_variant(days, traffic, n_variants, population=1.0):
+    """Inverse of ``power_analysis.duration`` (before rounding to whole days)."""
+    days, traffic = np.asarray(days, dtype=float), np.asarray(traffic, dtype=float)
+    return np.floor(days * traffic / (n_variants * population))
+
+
+def proportion_power(n, mean, mde_pct, alpha=0.05, two_sided=True):
+    """Normal-approximation power of the pooled two-proportion z-test.
+
+    Unlike the sample size formula, the variance under the alternative uses
+    both groups' own rates.
+    """
+    z_alpha, _ = z_scores(alpha, 0.5, two_sided)
+    n = np.asarray(n, dtype=float)
+    rate = np.clip(mean * (1 + np.asarray(mde_pct, dtype=float) / 100), 0, 1)
+    pooled = (mean + rate) / 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        se0 = np.sqrt(2 * pooled * (1 - pooled) / n)
+        se1 = np.sqrt((mean * (1 - mean) + rate * (1 - rate)) / n)
+        diff = np.abs(rate - mean)
+        power = ndtr((diff - z_alpha * se0) / se1)
+        if two_sided:
+            power = power + ndtr((-diff - z_alpha * se0) / se1)
+    return power
+
+
+def achievable_power(n, mean, mde_pct, variance=None, alpha=0.05, two_sided=True):
+    """Power with ``n`` users per variant.
+
+    With ``variance`` this is the inverse of ``power_analysis.sample_size``;
+    without it the metric is a proportion and ``proportion_power`` is used.
+    """
+    if variance is None:
+        return proportion_power(n, mean, mde_pct, alpha, two_sided)
+    z_alpha, _ = z_scores(alpha, 0.5, two_sided)
+    effect = np.abs(np.asarray(mde_pct, dtype=float) * mean / 100)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return ndtr(effect / np.sqrt(2 * variance / np.asarray(n, dtype=float)) - z_alpha)
+
+
+def detectable_mde(n, mean, variance=None, alpha=0.05, power=0.8, two_sided=True):
+    """Smallest relative MDE (in percent) detected with ``power`` at ``n`` users per variant.
+
+    With ``variance`` this inverts ``power_analysis.sample_size`` exactly;
+    without it the metric is a proportion and the MDE is solved for with
+    ``proportion_power``. Unreachable cells (e.g. ``n`` of 0, or a rate
+    that would have to exceed 1) are NaN.
+    """
+    n = np.asarray(n, dtype=float)
+    if variance is not None:
+        z_alpha, z_beta = z_scores(alpha, power, two_sided)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mde = 100 * (z_alpha + z_beta) * np.sqrt(2 * variance / n) / mean
+        return np.where(np.isfinite(mde) & (n > 0), mde, np.nan)
+
+    # Power increases with the lift, so bisect on [0, hi] where hi takes
+    # the variant's rate to 1
+    shape = np.broadcast_shapes(n.shape, np.shape(alpha), np.shape(power))
+    lo = np.zeros(shape)
+    hi = np.full(shape, 100 * (1 - mean) / mean)
+    reachable = proportion_power(n, mean, hi, alpha, two_sided) >= power
+    for _ in range(BISECTION_STEPS):
+        mid = (lo + hi) / 2
+        enough = proportion_power(n, mean, mid, alpha, two_sided) >= power
+        hi = np.where(enough, mid, hi)
+        lo = np.where(enough, lo, mid)
+    return np.where(reachable, hi, np.nan)
+
+
+def mde_surface(days, traffic, mean, variance=None, n_variants=2, population=1.0,
+                alpha=0.05, power=0.8, two_sided=True):
+    """Detectable MDE over a duration (rows) x daily traffic (columns) grid."""
+    n = users_per_variant(np.asarray(days, dtype=float)[:, None], np.asarray(traffic, dtype=float)[None, :],
+                          n_variants, population)
+    return detectable_mde(n, mean, variance, alpha, power, two_sided)
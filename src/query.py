@@ -0,0 +1,142 @@
+"""Filter, group-by and per-segment statistics over stored datasets.
+
+Queries run with Arrow's dataset scanner and compute kernels directly on the
+dataset's Parquet file: only the referenced columns are read, filters are
+pushed into the scan, and grouping and aggregation happen in Arrow, so no
+pandas copy of the full frame is made and only the per-segment summary is
+returned.
+
+Filters are dicts ``{'column': ..., 'op': ..., 'value': ...}`` with ``op``
+one of ``FILTER_OPS``; ``in`` / ``not in`` take a list of values and
+``is null`` / ``not null`` take none.
+"""
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+FILTER_OPS = ('==', '!=', '<', '<=', '>', '>=', 'in', 'not in', 'contains', 'starts with',
+              'is null', 'not null')
+# Segments beyond the largest MAX_SEGMENTS (by row count) are dropped
+MAX_SEGMENTS = 50
+# Columns with at most this many distinct values are offered for grouping
+MAX_GROUP_VALUES = 50
+SUMMARY_COLUMNS = ['count', 'mean', 'std', 'min', 'q1', 'median', 'q3', 'max']
+
+
+def open_dataset(path):
+    return ds.dataset(path, format='parquet')
+
+
+def _is_numeric(arrow_type):
+    return pa.types.is_integer(arrow_type) or pa.types.is_floating(arrow_type)
+
+
+def numeric_columns(path):
+    return [f.name for f in open_dataset(path).schema if _is_numeric(f.type)]
+
+
+def group_columns(stats, max_values=MAX_GROUP_VALUES):
+    """Non-float columns with few enough distinct values to group by.
+
+    Taken from the ``preview.column_stats`` stored with the dataset, so
+    nothing is read from the file.
+    """
+    return [s['column'] for s in stats if not s['dtype'].lower().startswith('float') and s['distinct'] <= max_values]
+
+
+def _coerce(value, arrow_type):
+    # Values come from text inputs; compare numeric columns with numbers
+    if value is None or not _is_numeric(arrow_type) or not isinstance(value, str):
+        return value
+    return float(value) if pa.types.is_floating(arrow_type) or '.' in value else int(value)
+
+
+def build_filter(filters, schema):
+    """One Arrow expression for all ``filters`` (combined with AND), or None."""
+    expression = None
+    for f in filters or []:
+        column, op, value = f.get('column'), f.get('op', '=='), f.get('value')
+        if column is None:
+            continue
+        if column not in schema.names:
+            raise ValueError('Unknown column: {}'.format(column))
+        if op not in FILTER_OPS:
+            raise ValueError('op must be one of {}'.format(FILTER_OPS))
+        arrow_type = schema.field(column).type
+        if pa.types.is_dictionary(arrow_type):
+            arrow_type = arrow_type.value_type
+        field = pc.field(column)
+        if op in ('contains', 'starts with'):
+            # The string kernels need plain (not dictionary-encoded) strings
+            match = pc.match_substring if op == 'contains' else pc.starts_with
+            condition = match(field.cast(pa.string()), str(value))
+        elif op == 'is null':
+            condition = field.is_null()
+        elif op == 'not null':
+            condition = field.is_valid()
+        elif op in ('in', 'not in'):
+            values = value if isinstance(value, (list, tuple)) else [v.strip() for v in str(value).split(',')]
+            condition = field.isin([_coerce(v, arrow_type) for v in values])
+            if op == 'not in':
+                condition = ~condition
+        else:
+            value = _coerce(value, arrow_type)
+            condition = {
+                '==': field == value, '!=': field != value,
+                '<': field < value, '<=': field <= value,
+                '>': field > value, '>=': field >= value,
+            }[op]
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def scan(path, columns, filters=None):
+    """Arrow table of ``columns`` for the rows matching ``filters``."""
+    dataset = open_dataset(path)
+    return dataset.to_table(columns=list(columns), filter=build_filter(filters, dataset.schema))
+
+
+def segment_summary(path, value_column, group_by=None, filters=None, max_segments=MAX_SEGMENTS):
+    """Per-segment count, mean, std, min, quartiles and max of ``value_column``.
+
+    Returns a pandas frame with one row per value of ``group_by`` (largest
+    segments first), or a single ``'All'`` row without grouping. Quartiles
+    are t-digest estimates.
+    """
+    import pandas as pd
+
+    columns = [value_column] + ([group_by] if group_by else [])
+    table = scan(path, columns, filters)
+    quartile_options = pc.TDigestOptions(q=[0.25, 0.5, 0.75])
+    if not group_by:
+        values = table.column(value_column)
+        min_max = pc.min_max(values).as_py()
+        quartiles = pc.tdigest(values, options=quartile_options).to_pylist() or [None] * 3
+        return pd.DataFrame([{
+            'segment': 'All',
+            'count': pc.count(values).as_py(),
+            'mean': pc.mean(values).as_py(),
+            'std': pc.stddev(values, ddof=1).as_py(),
+            'min': min_max['min'],
+            'q1': quartiles[0],
+            'median': quartiles[1],
+            'q3': quartiles[2],
+            'max': min_max['max'],
+        }], columns=['segment'] + SUMMARY_COLUMNS)
+
+    result = table.group_by(group_by).aggregate([
+        (value_column, 'count'),
+        (value_column, 'mean'),
+        (value_column, 'stddev', pc.VarianceOptions(ddof=1)),
+        (value_column, 'min'),
+        (value_column, 'max'),
+        (value_column, 'tdigest', quartile_options),
+    ]).to_pandas()
+
+    quartiles = result.pop(value_column + '_tdigest')
+    result.columns = [c.replace(value_column + '_', '') for c in result.columns]
+    result = result.rename(columns={'stddev': 'std', group_by: 'segment'})
+    for i, name in enumerate(('q1', 'median', 'q3')):
+        result[name] = [q[i] if q is not None and len(q) else None for q in quartiles]
+    result = result.sort_values('count', ascending=False).head(max_segments)
+    return result[['segment'] + SUMMARY_COLUMNS].reset_index(drop=True)
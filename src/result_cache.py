@@ -0,0 +1,172 @@
+"""Memoization for pure callbacks, shared by all workers through SQLite.
+
+Results are keyed on a hash of the callback name and its normalized inputs,
+expire after a TTL and are evicted least-recently-used beyond
+``max_entries``. Hit and miss counters live in the same database so they
+cover every gunicorn worker.
+"""
+import functools
+import hashlib
+import json
+import numbers
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+
+
+def normalize(value):
+    """Canonical, JSON-serializable form of callback inputs.
+
+    Integral floats collapse onto ints and sequences onto lists, so ``5``,
+    ``5.0`` and ``np.int64(5)`` share a cache entry.
+    """
+    # Checked through the numbers ABCs and tolist() so that NumPy scalars and
+    # arrays are covered without importing NumPy here
+    if isinstance(value, dict):
+        return {str(k): normalize(v) for k, v in sorted(value.items())}
+    if hasattr(value, 'tolist') and not isinstance(value, numbers.Number):
+        value = value.tolist()
+    if isinstance(value, (list, tuple)):
+        return [normalize(v) for v in value]
+    if type(value).__name__ in ('bool', 'bool_'):
+        return bool(value)
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    if isinstance(value, numbers.Real):
+        value = float(value)
+        return int(value) if value.is_integer() else value
+    return value
+
+
+def make_key(namespace, args, kwargs):
+    payload = json.dumps([namespace, normalize(args), normalize(kwargs)],
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _plain(value):
+    from plotly.basedatatypes import BaseFigure
+
+    # Figures are stored as dicts: unpickling a go.Figure re-runs validation
+    # of every trace, which costs as much as building it
+    if isinstance(value, BaseFigure):
+        return value.to_dict()
+    if isinstance(value, tuple):
+        return tuple(_plain(v) for v in value)
+    return value
+
+
+class ResultCache:
+    def __init__(self, path=None, ttl=3600, max_entries=2000):
+        self.path = path or os.path.join(tempfile.gettempdir(), 'ssa_tool_cache.sqlite3')
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS results ('
+                ' key TEXT PRIMARY KEY, value BLOB, created REAL, accessed REAL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS counters ('
+                ' namespace TEXT PRIMARY KEY, hits INTEGER DEFAULT 0, misses INTEGER DEFAULT 0)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def _count(self, namespace, column):
+        self._connect().execute(
+            'INSERT INTO counters (namespace, {0}) VALUES (?, 1) '
+            'ON CONFLICT(namespace) DO UPDATE SET {0} = {0} + 1'.format(column),
+            (namespace,))
+
+    def get(self, key):
+        """Return ``(True, value)`` on a hit and ``(False, None)`` otherwise."""
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute(
+            'SELECT value FROM results WHERE key = ? AND created > ?',
+            (key, now - self.ttl)).fetchone()
+        if row is None:
+            return False, None
+        conn.execute('UPDATE results SET accessed = ? WHERE key = ?', (now, key))
+        return True, pickle.loads(row[0])
+
+    def set(self, key, value):
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            'INSERT OR REPLACE INTO results (key, value, created, accessed) VALUES (?, ?, ?, ?)',
+            (key, sqlite3.Binary(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)), now, now))
+        conn.execute('DELETE FROM results WHERE created <= ?', (now - self.ttl,))
+        conn.execute(
+            'DELETE FROM results WHERE key IN ('
+            ' SELECT key FROM results ORDER BY accessed DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,))
+
+    def clear(self):
+        conn = self._connect()
+        conn.execute('DELETE FROM results')
+        conn.execute('DELETE FROM counters')
+
+    def stats(self):
+        conn = self._connect()
+        counters = {
+            namespace: {'hits': hits, 'misses': misses}
+            for namespace, hits, misses in conn.execute('SELECT namespace, hits, misses FROM counters')
+        }
+        entries = conn.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+        return {
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'ttl': self.ttl,
+            'hits': sum(c['hits'] for c in counters.values()),
+            'misses': sum(c['misses'] for c in counters.values()),
+            'callbacks': counters,
+        }
+
+    def memoize(self, namespace=None):
+        def decorator(func):
+            name = namespace or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                key = make_key(name, args, kwargs)
+                try:
+                    hit, value = self.get(key)
+                except sqlite3.Error:
+                    # The cache is an optimization only; never fail the callback
+                    return func(*args, **kwargs)
+                if hit:
+                    try:
+                        self._count(name, 'hits')
+                    except sqlite3.Error:
+                        pass
+                    return value
+                value = _plain(func(*args, **kwargs))
+                try:
+                    self.set(key, value)
+                    self._count(name, 'misses')
+                except (sqlite3.Error, pickle.PicklingError, TypeError):
+                    pass
+                return value
+
+            wrapper.uncached = func
+            return wrapper
+
+        return decorator
+
+
+cache = ResultCache(
+    path=os.environ.get('SSA_CACHE_PATH'),
+    ttl=float(os.environ.get('SSA_CACHE_TTL', 3600)),
+    max_entries=int(os.environ.get('SSA_CACHE_MAX_ENTRIES', 2000)),
+)
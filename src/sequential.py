@@ -0,0 +1,141 @@
+"""Sequential (always-valid) A/B testing with the mixture SPRT.
+
+The fixed-horizon z-test is only valid when it is looked at once. The
+mixture sequential probability ratio test (mSPRT, Johari et al. 2017) gives
+p-values that stay valid however often the experiment is checked: for the
+difference in conversion rates ``d`` with estimated variance ``V`` and a
+normal mixing distribution ``N(0, tau^2)`` over the true difference,
+
+    Lambda_n = sqrt(V / (V + tau^2)) * exp(tau^2 * d^2 / (2 * V * (V + tau^2)))
+
+and the always-valid p-value is the running minimum of ``1 / Lambda_n``.
+
+``SequentialMonitor`` keeps the cumulative counts and the running p-value of
+every comparison, so folding in a new batch of per-day counts costs O(1) per
+comparison of the experiments in the batch, independent of how much
+history there is.
+"""
+import numpy as np
+import pandas as pd
+
+from ab_testing import control_mask
+
+# Standard deviation of the mixing distribution over the absolute
+# difference in conversion rates; roughly the size of effect expected
+TAU = 0.01
+KEY = ['experiment', 'variant']
+COUNT_COLUMNS = ['users', 'conversions', 'control_users', 'control_conversions']
+STATE_COLUMNS = KEY + ['control'] + COUNT_COLUMNS + ['log_lr', 'p_value', 'batches']
+
+
+def msprt_log_lr(count1, nobs1, count2, nobs2, tau=TAU):
+    """Log mixture likelihood ratio of ``count1/nobs1`` against ``count2/nobs2``.
+
+    Broadcasts over arrays; comparisons with zero variance give 0 (no evidence).
+    """
+    count1, nobs1, count2, nobs2 = (np.asarray(a, dtype=float) for a in (count1, nobs1, count2, nobs2))
+    tau2 = tau ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate1 = count1 / nobs1
+        rate2 = count2 / nobs2
+        v = rate1 * (1 - rate1) / nobs1 + rate2 * (1 - rate2) / nobs2
+        diff = rate1 - rate2
+        log_lr = 0.5 * np.log(v / (v + tau2)) + tau2 * diff * diff / (2 * v * (v + tau2))
+    return np.where(v > 0, log_lr, 0.0)
+
+
+def always_valid_pvalue(log_lr, previous=1.0):
+    """``min(previous, 1 / Lambda)``, clipped to ``[0, 1]``."""
+    return np.minimum(previous, np.minimum(np.exp(-np.asarray(log_lr, dtype=float)), 1.0))
+
+
+def _batch_counts(table, experiment, variant, users, conversions, control, known_controls=None):
+    """Count deltas of one batch: ``(variants, controls)``.
+
+    ``variants`` is indexed by experiment and non-control variant,
+    ``controls`` by experiment with the control's name and counts. Several
+    rows for the same variant are summed. ``known_controls`` (experiment to
+    control variant) keeps the control of experiments seen before.
+    """
+    df = pd.DataFrame(table)
+    missing = [c for c in (experiment, variant, users, conversions) if c not in df.columns]
+    if missing:
+        raise ValueError('Missing columns: {}'.format(', '.join(missing)))
+    df = df.rename(columns={experiment: 'experiment', variant: 'variant',
+                            users: 'users', conversions: 'conversions'})
+    names = df.loc[control_mask(df, 'experiment', 'variant', control)].drop_duplicates('experiment')
+    names = names.set_index('experiment')['variant']
+    if known_controls is not None:
+        names.update(known_controls)
+    # Every row of the control variant counts, not only the one that picked it
+    is_control = (df['variant'].astype(str) == df['experiment'].map(names).astype(str)).to_numpy()
+    controls = df[is_control].groupby('experiment', sort=False).agg(
+        control=('variant', 'first'), control_users=('users', 'sum'),
+        control_conversions=('conversions', 'sum'))
+    variants = df[~is_control].groupby(KEY, sort=False)[['users', 'conversions']].sum()
+    orphans = variants.index.get_level_values('experiment').difference(controls.index)
+    if len(orphans):
+        raise ValueError('No control row for experiments: {}'.format(', '.join(map(str, orphans))))
+    return variants, controls
+
+
+class SequentialMonitor:
+    """Running mSPRT state for many experiments, updated from count deltas."""
+
+    def __init__(self, state=None, tau=TAU):
+        self.tau = tau
+        if state is None:
+            state = pd.DataFrame({c: pd.Series(dtype=float) for c in STATE_COLUMNS})
+        self.state = pd.DataFrame(state, columns=STATE_COLUMNS).set_index(KEY)
+
+    def update(self, deltas, experiment='experiment', variant='variant', users='users',
+               conversions='conversions', control=None):
+        """Add one batch of new users and conversions.
+
+        ``deltas`` has one row per experiment and variant with the counts
+        observed since the previous batch (e.g. one day), control included;
+        the control is picked as in ``ab_testing.control_mask`` the first
+        time an experiment is seen. Every comparison of an experiment in the
+        batch is recomputed, including variants without rows of their own,
+        which still get the control's new counts. Variants whose experiment
+        has no control row in the batch raise ``ValueError``.
+        """
+        known_controls = self.state['control'].groupby(level='experiment').first()
+        variants, controls = _batch_counts(deltas, experiment, variant, users, conversions, control,
+                                           known_controls)
+        experiments = self.state.index.get_level_values('experiment')
+        tracked = self.state.index[experiments.isin(controls.index)]
+        new = variants.index.difference(self.state.index)
+
+        if len(new):
+            names = controls['control'].reindex(new.get_level_values('experiment')).to_numpy()
+            added = pd.DataFrame({'control': names}, index=new).assign(
+                **{c: 0.0 for c in COUNT_COLUMNS}, log_lr=0.0, p_value=1.0, batches=0.0)
+            self.state = added if self.state.empty else pd.concat([self.state, added])
+
+        touched = tracked.append(new)
+        rows = self.state.loc[touched]
+        control_delta = controls.reindex(touched.get_level_values('experiment'))
+        delta = np.column_stack([variants.reindex(touched, fill_value=0).to_numpy(dtype=float),
+                                 control_delta[['control_users', 'control_conversions']].to_numpy(dtype=float)])
+        totals = rows[COUNT_COLUMNS].to_numpy(dtype=float) + delta
+        log_lr = msprt_log_lr(totals[:, 1], totals[:, 0], totals[:, 3], totals[:, 2], self.tau)
+        self.state.loc[touched, COUNT_COLUMNS] = totals
+        self.state.loc[touched, 'log_lr'] = log_lr
+        self.state.loc[touched, 'p_value'] = always_valid_pvalue(log_lr, rows['p_value'].to_numpy())
+        self.state.loc[touched, 'batches'] = rows['batches'].to_numpy() + 1
+        return self
+
+    def results(self, alpha=0.05):
+        """Current rates, lift and always-valid p-value of every comparison."""
+        out = self.state.reset_index()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out['control_rate'] = out['control_conversions'] / out['control_users']
+            out['rate'] = out['conversions'] / out['users']
+            out['lift_pct'] = (out['rate'] - out['control_rate']) / out['control_rate'] * 100
+        out['significant'] = out['p_value'] < alpha
+        return out
+
+    def to_frame(self):
+        """Flat state frame; ``SequentialMonitor(frame)`` restores it."""
+        return self.state.reset_index()
@@ -0,0 +1,309 @@
+"""Anomaly detection for time series, in batch and online.
+
+Every detector turns a series into an ``expected`` value and a ``score``
+(the deviation from it in robust standard deviations). Points with
+``|score| > threshold`` are anomalies.
+
+* ``rolling_mad`` -- median and MAD of the previous ``window`` points, as in
+  ``outliers``' modified z-score. The windows are strided views
+  (``sliding_window_view``) reduced a block at a time.
+* ``ewma`` -- exponentially weighted mean and variance of the previous
+  points. The recursions are linear filters (``scipy.signal.lfilter``), and
+  the filter state doubles as the online state.
+* ``stl`` -- residual of a seasonal-trend decomposition with period
+  ``period``, STL-style. The trend is a centered moving average over one
+  period. The seasonal part is a moving average of each cycle-subseries
+  over ``seasonal_cycles`` cycles. Box kernels replace STL's loess (the
+  robustness reweighting is kept), so each step is a vectorized
+  convolution or cumulative sum; statsmodels' STL takes tens of seconds per
+  million points.
+
+``detect`` scores whole frames. Series are independent, so large frames
+with many series are split into groups of whole series, scored in a
+process pool. ``OnlineDetector`` keeps a small per-series state (the last
+``window`` or ``history`` points, or the EWMA filter state). Appended rows
+are then scored without revisiting the history.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import lfilter
+
+DETECTORS = ('rolling_mad', 'ewma', 'stl')
+DEFAULT_THRESHOLDS = {'rolling_mad': 3.5, 'ewma': 3.0, 'stl': 3.5}
+WINDOW = 50
+EWMA_ALPHA = 0.05
+SEASONAL_CYCLES = 7
+ROBUST_ITERATIONS = 1
+# Window elements copied at once when reducing strided windows
+BLOCK_ELEMENTS = 4_000_000
+# Frames smaller than this are scored in-process
+PARALLEL_MIN_ROWS = 1_000_000
+RESULT_COLUMNS = ['series', 'timestamp', 'value', 'expected', 'score', 'anomaly']
+STATE_COLUMNS = ['series', 'timestamp', 'value', 'ewma_mean', 'ewma_var', 'count']
+MAD_SCALE = 1.4826
+# Mean absolute deviation to standard deviation, for windows whose MAD is 0
+MEAN_AD_SCALE = 1.2533
+
+
+def _scores(values, expected, scale):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        score = (values - expected) / scale
+    # A flat baseline: any change is infinitely unusual, no change is not
+    return np.where((scale == 0) & (values == expected), 0.0, score)
+
+
+def rolling_mad(values, window=WINDOW):
+    """Expected value and score of each point from the median and MAD of the ``window`` before it."""
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    expected = np.full(n, np.nan)
+    scale = np.full(n, np.nan)
+    if n > window:
+        windows = sliding_window_view(values[:-1], window)
+        rows = max(1, BLOCK_ELEMENTS // window)
+        for start in range(0, len(windows), rows):
+            block = windows[start:start + rows]
+            median = np.median(block, axis=1)
+            deviation = np.abs(block - median[:, None])
+            mean_ad = deviation.mean(axis=1)
+            mad = np.median(deviation, axis=1, overwrite_input=True)
+            expected[window + start:window + start + len(block)] = median
+            scale[window + start:window + start + len(block)] = np.where(
+                mad > 0, MAD_SCALE * mad, MEAN_AD_SCALE * mean_ad)
+    return expected, _scores(values, expected, scale)
+
+
+def ewma(values, alpha=EWMA_ALPHA, state=None):
+    """Expected value and score from the EWMA mean and variance of the points before each one.
+
+    ``state`` is ``(mean, var, count)`` after the previous points, or None
+    for a new series. Returns ``(expected, score, state)``. The first
+    ``1 / alpha`` points of a series are not scored.
+    """
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        return values, values, state
+    mean, var, count = state if state is not None else (values[0], 0.0, 0)
+    # m_t = alpha * x_t + (1 - alpha) * m_{t-1}; the expected value of x_t is m_{t-1}
+    means, _ = lfilter([alpha], [1, alpha - 1], values, zi=[(1 - alpha) * mean])
+    expected = np.concatenate([[mean], means[:-1]])
+    deviation = values - expected
+    # v_t = (1 - alpha) * (v_{t-1} + alpha * d_t^2), the EW variance
+    variances, _ = lfilter([(1 - alpha) * alpha], [1, alpha - 1], deviation ** 2, zi=[(1 - alpha) * var])
+    scale = np.sqrt(np.concatenate([[var], variances[:-1]]))
+    score = _scores(values, expected, scale)
+    seen = count + np.arange(len(values))
+    score = np.where(seen >= 1 / alpha, score, np.nan)
+    return expected, score, (means[-1], variances[-1], count + len(values))
+
+
+def _centered_mean(values, window, weights):
+    """Weighted centered moving average of each point's neighbours; the ends average over the points available."""
+    if window % 2:
+        kernel = np.ones(window)
+    else:
+        # 2 x m moving average, the usual one for even periods
+        kernel = np.concatenate([[0.5], np.ones(window - 1), [0.5]])
+    totals = np.convolve(values * weights, kernel, mode='same') - values * weights
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return totals / (np.convolve(weights, kernel, mode='same') - weights)
+
+
+def _subseries_mean(values, weights, period, cycles):
+    """Weighted mean of the other points of each point's cycle-subseries, over the ``cycles`` cycles around it."""
+    n = len(values)
+    rows = -(-n // period)
+    # One row per cycle, so each column is a cycle-subseries; padding has weight 0
+    grid = np.zeros(rows * period)
+    grid[:n] = values * weights
+    mass = np.zeros(rows * period)
+    mass[:n] = weights
+    sums = np.vstack([np.zeros(period), np.cumsum(grid.reshape(rows, period), axis=0)])
+    counts = np.vstack([np.zeros(period), np.cumsum(mass.reshape(rows, period), axis=0)])
+    half = cycles // 2
+    lo = np.clip(np.arange(rows) - half, 0, rows)
+    hi = np.clip(np.arange(rows) + half + 1, 0, rows)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (((sums[hi] - sums[lo]).ravel()[:n] - values * weights)
+                / ((counts[hi] - counts[lo]).ravel()[:n] - weights))
+
+
+def _robust_scale(residual):
+    center = np.median(residual)
+    deviation = np.abs(residual - center)
+    mad = np.median(deviation)
+    return center, MAD_SCALE * mad if mad > 0 else MEAN_AD_SCALE * deviation.mean()
+
+
+def stl(values, period, seasonal_cycles=SEASONAL_CYCLES, robust_iterations=ROBUST_ITERATIONS):
+    """Expected value (trend + seasonal) and robust residual score of each point.
+
+    Each point is compared with the trend and seasonal averages of its
+    neighbours, not including itself. As in STL, each robustness iteration
+    refits with points downweighted by the bisquare of their residual, so
+    anomalies do not leak into the estimates of their neighbours.
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    if period < 2:
+        raise ValueError('period must be at least 2')
+    if n < 2 * period:
+        return np.full(n, np.nan), np.full(n, np.nan)
+    weights = np.ones(n)
+    for _ in range(robust_iterations + 1):
+        trend = _centered_mean(values, period, weights)
+        seasonal = _subseries_mean(values - trend, weights, period, seasonal_cycles)
+        expected = trend + seasonal
+        # Neighbours that all have weight 0: nothing to compare with
+        expected = np.where(np.isfinite(expected), expected, np.nan)
+        residual = values - expected
+        center, scale = _robust_scale(residual[np.isfinite(residual)])
+        if scale == 0:
+            break
+        weights = np.nan_to_num(np.clip(1 - ((residual - center) / (6 * scale / MAD_SCALE)) ** 2, 0, None) ** 2)
+    return expected, _scores(residual, center, scale)
+
+
+def _score_series(values, bounds, detector, window, alpha, period):
+    """Expected values and scores of consecutive series ``values[bounds[i]:bounds[i + 1]]``."""
+    expected = np.empty(len(values))
+    score = np.empty(len(values))
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        x = values[start:stop]
+        if detector == 'rolling_mad':
+            expected[start:stop], score[start:stop] = rolling_mad(x, window)
+        elif detector == 'ewma':
+            expected[start:stop], score[start:stop], _ = ewma(x, alpha)
+        else:
+            expected[start:stop], score[start:stop] = stl(x, period)
+    return expected, score
+
+
+def _score_task(args):
+    return _score_series(*args)
+
+
+def _prepare(df, value, timestamp=None, series=None):
+    """``series``, ``timestamp``, ``value`` frame sorted by series and time, without missing values."""
+    missing = [c for c in (value, timestamp, series) if c is not None and c not in df.columns]
+    if missing:
+        raise ValueError('Missing columns: {}'.format(', '.join(missing)))
+    out = pd.DataFrame({
+        'series': df[series].astype(str).to_numpy() if series else 'All',
+        'timestamp': pd.to_datetime(df[timestamp]) if timestamp else np.arange(len(df)),
+        'value': pd.to_numeric(df[value], errors='coerce'),
+    }, index=df.index)
+    out = out.dropna(subset=['timestamp', 'value'])
+    return out.sort_values(['series', 'timestamp'], kind='mergesort')
+
+
+def _check(detector, period):
+    if detector not in DETECTORS:
+        raise ValueError('detector must be one of {}'.format(DETECTORS))
+    if detector == 'stl' and not period:
+        raise ValueError('period is required for the stl detector')
+
+
+def detect(df, value, timestamp=None, series=None, detector='rolling_mad', threshold=None,
+           window=WINDOW, alpha=EWMA_ALPHA, period=None, workers=None):
+    """Score every row of ``df``; one independent series per value of ``series``.
+
+    Rows are ordered by ``timestamp`` (row order without one). Returns a
+    frame with ``RESULT_COLUMNS``, indexed like ``df`` and sorted by series
+    and time; rows without a value or timestamp are dropped.
+    """
+    _check(detector, period)
+    threshold = DEFAULT_THRESHOLDS[detector] if threshold is None else threshold
+    out = _prepare(df, value, timestamp, series)
+    values = out['value'].to_numpy(dtype=float)
+    codes = out['series'].to_numpy()
+    bounds = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1], True]) if len(codes) else np.array([0])
+
+    workers = min(workers or os.cpu_count() or 1, len(bounds) - 1)
+    if workers > 1 and len(values) >= PARALLEL_MIN_ROWS:
+        # Groups of whole series with about the same number of rows each
+        cuts = np.unique(np.searchsorted(bounds, np.linspace(0, len(values), workers + 1)))
+        groups = [bounds[a:b + 1] for a, b in zip(cuts[:-1], cuts[1:]) if b > a]
+        tasks = [(values[g[0]:g[-1]], g - g[0], detector, window, alpha, period) for g in groups]
+        with ProcessPoolExecutor(len(tasks)) as pool:
+            parts = list(pool.map(_score_task, tasks))
+        expected = np.concatenate([p[0] for p in parts])
+        score = np.concatenate([p[1] for p in parts])
+    else:
+        expected, score = _score_series(values, bounds, detector, window, alpha, period)
+
+    out['expected'] = expected
+    out['score'] = score
+    out['anomaly'] = np.abs(score) > threshold
+    return out[RESULT_COLUMNS]
+
+
+class OnlineDetector:
+    """Per-series detector state, updated with appended rows only.
+
+    ``rolling_mad`` keeps the last ``window`` points of each series, ``stl``
+    the last ``history`` points (``seasonal_cycles + 2`` periods by
+    default) and ``ewma`` the filter state. Rows at or before a series'
+    last timestamp are ignored. For ``stl`` the newest points only have the
+    trailing side of the trend and seasonal windows. Without a timestamp
+    column, rows are numbered on from the previous batches.
+    """
+
+    def __init__(self, detector='rolling_mad', state=None, threshold=None, window=WINDOW,
+                 alpha=EWMA_ALPHA, period=None, history=None):
+        _check(detector, period)
+        self.detector = detector
+        self.threshold = DEFAULT_THRESHOLDS[detector] if threshold is None else threshold
+        self.window = window
+        self.alpha = alpha
+        self.period = period
+        self.history = history or ((SEASONAL_CYCLES + 2) * period if detector == 'stl' else window)
+        if state is None:
+            state = pd.DataFrame({c: pd.Series(dtype=float) for c in STATE_COLUMNS})
+        self.state = pd.DataFrame(state, columns=STATE_COLUMNS)
+
+    def update(self, df, value, timestamp=None, series=None):
+        """Scores (``RESULT_COLUMNS``) of the new rows of ``df``."""
+        new = _prepare(df, value, timestamp, series)
+        last = self.state.groupby('series')['timestamp'].max()
+        if timestamp is None and len(last):
+            # Row positions carry on from the previous batches
+            new['timestamp'] += new['series'].map(last + 1).fillna(0).astype(int).to_numpy()
+        elif len(last):
+            cutoff = new['series'].map(last)
+            new = new[cutoff.isna() | (new['timestamp'] > cutoff)]
+
+        results, states = [], []
+        tails = dict(tuple(self.state.groupby('series', sort=False)))
+        for name, rows in new.groupby('series', sort=False):
+            tail = tails.pop(name, self.state.iloc[:0])
+            x = rows['value'].to_numpy(dtype=float)
+            if self.detector == 'ewma':
+                previous = None if tail.empty else tuple(tail[['ewma_mean', 'ewma_var', 'count']].iloc[-1])
+                expected, score, (mean, var, count) = ewma(x, self.alpha, previous)
+                states.append(rows.iloc[-1:].assign(ewma_mean=mean, ewma_var=var, count=count))
+            else:
+                history = np.concatenate([tail['value'].to_numpy(dtype=float), x])
+                if self.detector == 'rolling_mad':
+                    expected, score = rolling_mad(history, self.window)
+                else:
+                    expected, score = stl(history, self.period)
+                expected, score = expected[-len(x):], score[-len(x):]
+                combined = rows if tail.empty else pd.concat([tail[rows.columns], rows])
+                states.append(combined.iloc[-self.history:])
+            results.append(rows.assign(expected=expected, score=score))
+
+        self.state = pd.concat([*tails.values(), *states], ignore_index=True).reindex(columns=STATE_COLUMNS)
+        if not results:
+            return pd.DataFrame(columns=RESULT_COLUMNS)
+        out = pd.concat(results)
+        out['anomaly'] = np.abs(out['score']) > self.threshold
+        return out[RESULT_COLUMNS]
+
+    def to_frame(self):
+        """Flat state frame; ``OnlineDetector(detector, frame, ...)`` restores it."""
+        return self.state.copy()
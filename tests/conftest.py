@@ -0,0 +1,5 @@
+"""Shared setup for the tests; the app modules are imported from ``src``."""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
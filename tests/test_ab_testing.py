@@ -0,0 +1,68 @@
+"""ab_testing against statsmodels."""
+import numpy as np
+import pytest
+from statsmodels.stats.multitest import multipletests
+from statsmodels.stats.proportion import proportions_ztest as sm_proportions_ztest
+
+from ab_testing import adjust_pvalues, pairwise_proportions_ztest
+
+USERS = [1000, 1200, 950, 5000]
+CONVERSIONS = [100, 138, 80, 540]
+METHODS = ['holm', 'bonferroni', 'fdr_bh']
+
+
+@pytest.mark.parametrize('alternative', ['two-sided', 'larger'])
+@pytest.mark.parametrize('pairs', ['control', 'all'])
+def test_pairwise_proportions_ztest(alternative, pairs):
+    result = pairwise_proportions_ztest(list('ABCD'), CONVERSIONS, USERS, pairs=pairs,
+                                        alternative=alternative, correction='none')
+    index = {label: i for i, label in enumerate('ABCD')}
+    for row in result.itertuples():
+        base, other = index[row.baseline], index[row.variant]
+        # Each comparison tests the variant against its baseline
+        z, pvalue = sm_proportions_ztest([CONVERSIONS[other], CONVERSIONS[base]],
+                                         [USERS[other], USERS[base]], alternative=alternative)
+        assert row.z == pytest.approx(z, rel=1e-12)
+        assert row.p_value == pytest.approx(pvalue, rel=1e-12)
+        assert row.p_value_adjusted == row.p_value
+    assert len(result) == (3 if pairs == 'control' else 6)
+
+
+def test_one_sided_asks_whether_the_variant_is_better():
+    better = pairwise_proportions_ztest(['A', 'B'], [100, 130], [1000, 1000], alternative='larger')
+    worse = pairwise_proportions_ztest(['A', 'B'], [130, 100], [1000, 1000], alternative='larger')
+    assert better['p_value'].iloc[0] < 0.05 < worse['p_value'].iloc[0]
+    assert np.isclose(better['p_value'].iloc[0] + worse['p_value'].iloc[0], 1)
+
+
+@pytest.mark.parametrize('method', METHODS)
+def test_adjust_pvalues(method):
+    pvalues = np.random.default_rng(0).uniform(0, 0.1, 50)
+    # Ties and exact zeros go through the same ranking
+    pvalues[[3, 7]] = pvalues[5]
+    pvalues[10] = 0.0
+    expected = multipletests(pvalues, method=method)[1]
+    np.testing.assert_allclose(adjust_pvalues(pvalues, method), expected, rtol=1e-12)
+
+
+@pytest.mark.parametrize('method', METHODS)
+def test_adjust_pvalues_per_group(method):
+    rng = np.random.default_rng(1)
+    pvalues = rng.uniform(0, 0.2, 60)
+    groups = rng.choice(['e1', 'e2', 'e3'], 60)
+    pvalues[[2, 20]] = np.nan
+    adjusted = adjust_pvalues(pvalues, method, groups)
+    for group in ('e1', 'e2', 'e3'):
+        # Each family on its own, without its NaNs
+        family = (groups == group) & ~np.isnan(pvalues)
+        expected = multipletests(pvalues[family], method=method)[1]
+        np.testing.assert_allclose(adjusted[family], expected, rtol=1e-12)
+    assert np.isnan(adjusted[[2, 20]]).all()
+
+
+@pytest.mark.parametrize('method', METHODS)
+@pytest.mark.parametrize('pairs', ['control', 'all'])
+def test_pairwise_proportions_ztest_correction(method, pairs):
+    result = pairwise_proportions_ztest(list('ABCD'), CONVERSIONS, USERS, pairs=pairs, correction=method)
+    expected = multipletests(result['p_value'], method=method)[1]
+    np.testing.assert_allclose(result['p_value_adjusted'], expected, rtol=1e-12)
@@ -0,0 +1,55 @@
+"""Closed-form Bayesian summaries against Monte Carlo over the same posteriors."""
+import numpy as np
+import pytest
+
+from bayesian import compare, compare_variants, posterior
+
+SAMPLES = 2_000_000
+# (conversions, users) of the variant and the control: small, large,
+# lopsided and nearly identical samples
+CASES = [
+    ((3, 40), (5, 50)),
+    ((1_150, 10_000), (1_000, 10_000)),
+    ((60, 500), (9_800, 100_000)),
+    ((50_020, 500_000), (50_000, 500_000)),
+]
+
+
+def monte_carlo(variant, control, rng):
+    p_t = rng.beta(*posterior(*variant), SAMPLES)
+    p_c = rng.beta(*posterior(*control), SAMPLES)
+    return p_t, p_c
+
+
+@pytest.mark.parametrize('variant, control', CASES)
+def test_compare_matches_monte_carlo(variant, control):
+    p_t, p_c = monte_carlo(variant, control, np.random.default_rng(0))
+    result = compare(variant[0], variant[1], control[0], control[1], draws=200_000, seed=1)
+
+    prob = np.mean(p_t > p_c)
+    # Four Monte Carlo standard errors
+    assert result['prob_beat_control'] == pytest.approx(prob, abs=4 * np.sqrt(prob * (1 - prob) / SAMPLES) + 1e-9)
+    for name, loss in (('expected_loss', np.maximum(p_c - p_t, 0)),
+                       ('control_expected_loss', np.maximum(p_t - p_c, 0))):
+        assert result[name] == pytest.approx(loss.mean(), abs=4 * loss.std() / np.sqrt(SAMPLES) + 1e-12)
+
+    lift = (p_t / p_c - 1) * 100
+    low, high = np.quantile(lift, [0.025, 0.975])
+    tolerance = 0.02 * (high - low)
+    assert result['lift_ci_low'] == pytest.approx(low, abs=tolerance)
+    assert result['lift_ci_high'] == pytest.approx(high, abs=tolerance)
+
+
+def test_compare_variants_is_compare_per_variant():
+    counts, nobs = [100, 120, 90], [1_000, 1_000, 1_000]
+    table = compare_variants(['A', 'B', 'C'], counts, nobs)
+    assert table['variant'].tolist() == ['B', 'C']
+    for i, row in enumerate(table.itertuples(), start=1):
+        single = compare(counts[i], nobs[i], counts[0], nobs[0])
+        assert row.prob_beat_control == pytest.approx(single['prob_beat_control'][()], rel=1e-12)
+        assert row.expected_loss == pytest.approx(single['expected_loss'][()], rel=1e-12)
+
+
+def test_compare_rejects_impossible_counts():
+    with pytest.raises(ValueError):
+        compare(11, 10, 5, 10)
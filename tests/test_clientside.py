@@ -0,0 +1,119 @@
+"""Parity of the browser calculators (assets/clientside.js) with the server.
+
+clientside.js is run under Node over a grid of inputs and every result is
+compared with scipy, statsmodels and power_analysis. Skipped without Node.
+"""
+import itertools
+import json
+import os
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+from scipy.special import ndtr, ndtri
+from statsmodels.stats.proportion import proportions_ztest
+
+from ab_testing import pairwise_proportions_ztest
+from power_analysis import mde_grid, power_table
+
+NODE = shutil.which('node')
+CLIENTSIDE_JS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'assets', 'clientside.js')
+
+pytestmark = pytest.mark.skipif(NODE is None, reason='needs Node.js')
+
+# Loads clientside.js as the browser would, then answers one
+# [function, args] call per input line under window.dash_clientside.stats
+# (or .calculators).
+# Non-finite numbers are sent back as strings, which JSON cannot carry.
+RUNNER = '''
+var fs = require('fs');
+global.window = {};
+eval(fs.readFileSync(process.argv[1], 'utf8'));
+var stats = window.dash_clientside.stats;
+var calls = JSON.parse(fs.readFileSync(0, 'utf8'));
+process.stdout.write(JSON.stringify(calls.map(function (call) {
+    var fn = stats[call[0]] || window.dash_clientside.calculators[call[0]];
+    return fn.apply(null, call[1]);
+}), function (key, value) {
+    return typeof value === 'number' && !isFinite(value) ? String(value) : value;
+}));
+'''
+
+
+def run_js(calls):
+    """Results of ``[(function, args), ...]`` from clientside.js, in one Node process."""
+    result = subprocess.run([NODE, '-e', RUNNER, CLIENTSIDE_JS], input=json.dumps(calls),
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+def as_float(values):
+    return np.array([np.nan if v is None else float(v) for v in values])
+
+
+def test_norm_cdf():
+    x = np.concatenate([np.linspace(-40, 40, 801), [-7.5, -7.07, 7.07, 7.5, 0.0]])
+    got = as_float(run_js([('normCdf', [v]) for v in x.tolist()]))
+    np.testing.assert_allclose(got, ndtr(x), rtol=1e-9, atol=1e-15)
+
+
+def test_norm_ppf():
+    p = np.concatenate([np.logspace(-12, -1, 45), np.linspace(0.02, 0.98, 97), 1 - np.logspace(-12, -1, 45)])
+    got = as_float(run_js([('normPpf', [v]) for v in p.tolist()]))
+    # Acklam plus one Halley step; the far tails are good to about 1e-9
+    np.testing.assert_allclose(got, ndtri(p), rtol=1e-8, atol=1e-12)
+    assert as_float(run_js([('normPpf', [0]), ('normPpf', [1])])).tolist() == [-np.inf, np.inf]
+
+
+def test_proportions_ztest():
+    cases = [([ca, cb], [na, nb], alternative)
+             for na, nb in [(100, 100), (1000, 1200), (50000, 49000)]
+             for ca, cb in [(0.05, 0.05), (0.10, 0.12), (0.30, 0.25), (0.02, 0.035)]
+             for alternative in ['two-sided', 'larger']]
+    cases = [([round(ca * na), round(cb * nb)], [na, nb], alternative)
+             for (ca, cb), (na, nb), alternative in cases]
+    got = run_js([('proportionsZtest', list(case)) for case in cases])
+    for (count, nobs, alternative), (z, pval) in zip(cases, got):
+        expected_z, expected_pval = proportions_ztest(np.array(count), np.array(nobs), alternative=alternative)
+        assert z == pytest.approx(expected_z, rel=1e-9, abs=1e-12)
+        assert pval == pytest.approx(expected_pval, rel=1e-8, abs=1e-15)
+
+
+def test_power_table():
+    [mde] = run_js([('mdeGrid', [0, 20, 0.05])])
+    np.testing.assert_allclose(mde, mde_grid(0, 20, 0.05), rtol=0, atol=1e-12)
+    cases = list(itertools.product([0.1, 25.0], [0.09, 400.0], [1000, 250000], [2, 4],
+                                   [1.0, 0.5], [0.05, 0.1], [0.8, 0.95]))
+    got = run_js([('powerTable', [mean, variance, traffic, n_variants, mde, population, alpha, power])
+                  for mean, variance, traffic, n_variants, population, alpha, power in cases])
+    for (mean, variance, traffic, n_variants, population, alpha, power), table in zip(cases, got):
+        expected = power_table(mean, variance, traffic, n_variants, np.array(mde), population=population,
+                               alpha=alpha, power=power)
+        # Both sides floor, so a value on an integer boundary may differ by one step
+        for key, step in [('sample_size', 1), ('duration', population)]:
+            got_values, expected_values = as_float(table[key]), expected[key]
+            np.testing.assert_array_equal(np.isnan(got_values), np.isnan(expected_values))
+            finite = ~np.isnan(expected_values)
+            np.testing.assert_allclose(got_values[finite], expected_values[finite], rtol=1e-9, atol=step)
+
+
+def _texts(component):
+    """Text children of a serialized component tree, in document order."""
+    if isinstance(component, list):
+        return [text for child in component for text in _texts(child)]
+    if isinstance(component, dict):
+        return _texts(component.get('props', {}).get('children'))
+    return [] if component is None else [str(component)]
+
+
+@pytest.mark.parametrize('hypothesis', ['Two-sided', 'One-sided'])
+def test_update_calculation_direction(hypothesis):
+    cases = [(1000, 1000, 100, 130), (1000, 1000, 130, 100), (5000, 4800, 400, 420)]
+    got = run_js([('update_calculation', list(case) + [hypothesis, {}]) for case in cases])
+    for (users_a, users_b, conversions_a, conversions_b), layout in zip(cases, got):
+        texts = _texts(layout)
+        expected = pairwise_proportions_ztest(
+            ['A', 'B'], [conversions_a, conversions_b], [users_a, users_b],
+            alternative='two-sided' if hypothesis == 'Two-sided' else 'larger')['p_value'].iloc[0]
+        assert texts[texts.index('p value') + 1] == '{:.4f}'.format(expected)
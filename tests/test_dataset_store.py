@@ -0,0 +1,64 @@
+"""DatasetStore locking and eviction with directories changing underneath."""
+import os
+
+import pandas as pd
+import pytest
+
+from dataset_store import DatasetStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return DatasetStore(root=str(tmp_path), disk_budget_mb=1)
+
+
+def frame(rows=10):
+    return pd.DataFrame({'x': range(rows)})
+
+
+def lock_files(store):
+    return sorted(name for name in os.listdir(store.root) if name.startswith('.lock-'))
+
+
+def test_delete_removes_lock_file(store):
+    with store.lock('a'):
+        store.put(frame(), dataset_id='a')
+    assert lock_files(store) == ['.lock-a']
+    store.delete('a')
+    assert lock_files(store) == []
+
+
+def test_delete_keeps_a_held_lock(store):
+    store.put(frame(), dataset_id='a')
+    with store.lock('a'):
+        store.delete('a')
+        assert lock_files(store) == ['.lock-a']
+    # Still usable afterwards, and removed with the next delete
+    with store.lock('a'):
+        pass
+    store.delete('a')
+    assert lock_files(store) == []
+
+
+def test_eviction_removes_lock_files(store):
+    for i in range(20):
+        with store.lock(str(i)):
+            store.put(frame(20_000), dataset_id=str(i))
+    kept = {name for name in os.listdir(store.root) if not name.startswith('.')}
+    assert '19' in kept and len(kept) < 20
+    assert lock_files(store) == sorted('.lock-' + name for name in kept)
+
+
+def test_disk_usage_skips_vanished_directories(store, monkeypatch):
+    for name in 'abc':
+        store.put(frame(), dataset_id=name)
+    getmtime = os.path.getmtime
+
+    def deleted_meanwhile(path):
+        if os.path.basename(path) == 'b':
+            raise FileNotFoundError(path)
+        return getmtime(path)
+
+    monkeypatch.setattr(os.path, 'getmtime', deleted_meanwhile)
+    assert sorted(name for _, name, _ in store._disk_usage()) == ['a', 'c']
+    store.put(frame(), dataset_id='d')
@@ -0,0 +1,61 @@
+"""GroupMoments folded chunk by chunk against pandas on the whole frame."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from moments import GroupMoments
+
+ROWS = 20_000
+CHUNK_ROWS = 3_000
+
+
+@pytest.fixture(scope='module')
+def frame():
+    rng = np.random.default_rng(0)
+    group = rng.choice(['A', 'B', 'C'], ROWS, p=[0.5, 0.3, 0.2])
+    x = rng.gamma(2.0, 50.0, ROWS) + 1e6
+    # A large common offset makes naive sum-of-squares formulas lose digits
+    y = 0.8 * x + rng.normal(0, 10, ROWS) + (group == 'B') * 3
+    df = pd.DataFrame({'group': group, 'y': y, 'x': x})
+    df.loc[rng.choice(ROWS, 50, replace=False), 'y'] = np.nan
+    return df
+
+
+def folded(df):
+    moments = GroupMoments()
+    for start in range(0, len(df), CHUNK_ROWS):
+        chunk = df.iloc[start:start + CHUNK_ROWS]
+        moments.update(chunk['group'], chunk['y'], chunk['x'])
+    return moments
+
+
+def test_summary_matches_pandas(frame):
+    summary = folded(frame).summary().sort_index()
+    complete = frame.dropna()
+    grouped = complete.groupby('group')
+    np.testing.assert_array_equal(summary['n'], grouped.size())
+    np.testing.assert_allclose(summary['mean'], grouped['y'].mean(), rtol=1e-12)
+    np.testing.assert_allclose(summary['var'], grouped['y'].var(), rtol=1e-9)
+    np.testing.assert_allclose(summary['mean_x'], grouped['x'].mean(), rtol=1e-12)
+    np.testing.assert_allclose(summary['var_x'], grouped['x'].var(), rtol=1e-9)
+    cov = grouped[['x', 'y']].apply(lambda g: g['x'].cov(g['y']))
+    np.testing.assert_allclose(summary['cov_xy'], cov, rtol=1e-9)
+
+
+def test_merge_matches_one_pass(frame):
+    half = len(frame) // 2
+    merged = folded(frame.iloc[:half]).merge(folded(frame.iloc[half:]))
+    pd.testing.assert_frame_equal(merged.summary().sort_index(), folded(frame).summary().sort_index(),
+                                  rtol=1e-9)
+
+
+def test_cuped_matches_pandas(frame):
+    adjusted, theta = folded(frame).cuped()
+    complete = frame.dropna()
+    expected_theta = complete['x'].cov(complete['y']) / complete['x'].var()
+    assert theta == pytest.approx(expected_theta, rel=1e-9)
+    complete = complete.assign(y_cuped=complete['y'] - theta * (complete['x'] - complete['x'].mean()))
+    grouped = complete.groupby('group')['y_cuped']
+    adjusted = adjusted.sort_index()
+    np.testing.assert_allclose(adjusted['mean'], grouped.mean(), rtol=1e-9)
+    np.testing.assert_allclose(adjusted['var'], grouped.var(), rtol=1e-6)
@@ -0,0 +1,64 @@
+"""Outlier fences: the sketched quantiles used above ``EXACT_QUANTILE_ROWS``
+rows against exact ``np.nanquantile``, and the memory ``detect_outliers`` needs."""
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import outliers
+from outliers import detect_outliers, fit_bounds
+
+ROWS = outliers.EXACT_QUANTILE_ROWS + 100_000
+
+
+@pytest.fixture(scope='module')
+def frame():
+    rng = np.random.default_rng(0)
+    values = rng.normal(10, 2, ROWS)
+    values[rng.random(ROWS) < 0.001] = np.nan
+    return pd.DataFrame({
+        'normal': values,
+        'skewed': rng.lognormal(3, 1, ROWS),
+        'counts': rng.poisson(4, ROWS).astype('int16'),
+        # Mostly one value, so its MAD is 0 and the mean deviation is used
+        'tied': np.where(rng.random(ROWS) < 0.8, 0, rng.integers(1, 5, ROWS)).astype('int8'),
+    })
+
+
+@pytest.mark.parametrize('method', ['iqr', 'mad'])
+def test_sketched_bounds_match_exact(frame, method, monkeypatch):
+    sketched = fit_bounds(frame, method=method)
+    monkeypatch.setattr(outliers, 'EXACT_QUANTILE_ROWS', ROWS)
+    exact = fit_bounds(frame, method=method)
+    # Within 0.2% of each column's spread
+    error = (sketched - exact).abs().div(frame.std(), axis=0)
+    assert (error < 0.002).all().all(), error
+
+
+def test_mad_falls_back_to_mean_deviation(frame):
+    bounds = fit_bounds(frame, ['tied'], method='mad')
+    values = frame['tied'].to_numpy(dtype=float)
+    spread = 3.5 * outliers.MEAN_AD_SCALE * np.abs(values).mean()
+    np.testing.assert_allclose(bounds.loc['tied'].to_numpy(), [-spread, spread], rtol=1e-9)
+    # Only the rarer large values are flagged, not everything off the median
+    flagged = detect_outliers(frame[['tied']], method='mad')['tied']
+    assert flagged.mean() < 0.2 and not flagged[values == 0].any()
+
+
+def test_constant_column_flags_nothing():
+    df = pd.DataFrame({'x': np.ones(1000)})
+    assert not detect_outliers(df, method='mad')['x'].any()
+
+
+@pytest.mark.parametrize('method', ['iqr', 'mad'])
+def test_detect_outliers_converts_once(frame, method):
+    detect_outliers(frame.iloc[:1000], method=method)
+    tracemalloc.start()
+    try:
+        detect_outliers(frame, method=method)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    # One float copy of the frame plus the flags, never a second float copy
+    assert peak < 1.8 * ROWS * frame.shape[1] * 8
@@ -0,0 +1,61 @@
+"""SequentialMonitor over batch shapes: repeated rows, missing variants and
+missing controls."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from sequential import COUNT_COLUMNS, SequentialMonitor, msprt_log_lr
+
+
+def batch(rows):
+    return pd.DataFrame(rows, columns=['experiment', 'variant', 'users', 'conversions'])
+
+
+def counts(monitor):
+    return monitor.to_frame().set_index(['experiment', 'variant'])[['control'] + COUNT_COLUMNS]
+
+
+def test_repeated_rows_are_summed():
+    split = SequentialMonitor().update(batch([
+        ('e', 'A', 600, 60), ('e', 'B', 400, 50), ('e', 'A', 400, 40), ('e', 'B', 600, 70)]))
+    whole = SequentialMonitor().update(batch([('e', 'A', 1000, 100), ('e', 'B', 1000, 120)]))
+    pd.testing.assert_frame_equal(counts(split), counts(whole))
+    assert split.state.loc[('e', 'B'), 'log_lr'] == pytest.approx(msprt_log_lr(120, 1000, 100, 1000))
+
+
+def test_variant_missing_from_batch_gets_control_delta():
+    monitor = SequentialMonitor()
+    monitor.update(batch([('e', 'A', 1000, 100), ('e', 'B', 1000, 120), ('e', 'C', 1000, 90)]))
+    # C has no rows today, but the control's new users still count for it
+    monitor.update(batch([('e', 'A', 500, 50), ('e', 'B', 500, 60)]), control='A')
+    state = counts(monitor)
+    assert state.loc[('e', 'C')].tolist() == ['A', 1000, 90, 1500, 150]
+    assert state.loc[('e', 'B')].tolist() == ['A', 1500, 180, 1500, 150]
+    assert monitor.state['batches'].tolist() == [2, 2]
+
+
+def test_known_control_is_kept_whatever_the_row_order():
+    monitor = SequentialMonitor().update(batch([('e', 'A', 1000, 100), ('e', 'B', 1000, 120)]))
+    # Without a control argument a new experiment's first row is its control;
+    # e already has one, so B listed first is still a variant
+    monitor.update(batch([('e', 'B', 100, 12), ('e', 'A', 100, 10)]))
+    assert counts(monitor).loc[('e', 'B')].tolist() == ['A', 1100, 132, 1100, 110]
+
+
+def test_variant_without_control_raises():
+    monitor = SequentialMonitor().update(batch([('e', 'A', 1000, 100), ('e', 'B', 1000, 120)]))
+    with pytest.raises(ValueError, match='No control row'):
+        monitor.update(batch([('e', 'B', 100, 12), ('f', 'A', 10, 1)]), control='A')
+    # Nothing was applied
+    assert counts(monitor).loc[('e', 'B')].tolist() == ['A', 1000, 120, 1000, 100]
+
+
+def test_batches_add_up_to_one_batch():
+    rng = np.random.default_rng(0)
+    days = [batch([(e, v, int(rng.integers(100, 200)), int(rng.integers(5, 20)))
+                   for e in ('e', 'f') for v in ('A', 'B', 'C')]) for _ in range(10)]
+    monitor = SequentialMonitor()
+    for day in days:
+        monitor.update(day, control='A')
+    once = SequentialMonitor().update(pd.concat(days), control='A')
+    pd.testing.assert_frame_equal(counts(monitor), counts(once))